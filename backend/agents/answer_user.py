@@ -2,80 +2,31 @@ from typing import Dict, Any
 from datetime import datetime, timezone
 import json
 import uuid
-import os
 from backend.shared_services.llm import call_llm_api, call_llm_api_openrouter, call_llm_api_ollama
 from backend.shared_services.shared_types import MainState
-from backend.shared_services.extract_and_parse_json import extract_and_parse_json
+from backend.shared_services.agent_schemas import call_llm_structured, ANSWER_ENVELOPES
+from backend.shared_services.streaming import stream_response_to_user
+from backend.shared_services.document_chunks import format_citation
 from backend.shared_services.logger_setup import setup_logger
 from backend.shared_services.handoff_parameters import get_unanalyzed_handoffs, mark_handoffs_as_analyzed
 
 
 logger = setup_logger()
 
-def load_documents(relevant_docs: list) -> dict:
-    """ 
-    Load specified documents from the parsed directory
+def format_doc_chunks(doc_chunks: list) -> str:
     """
-    docs = {}
-    docs_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "document_processing", "parsed")  # Go up one level to backend, then into document_processing
-    
-    try:
-        logger.info(f"Looking for documents in: {docs_path}")
-        if not os.path.exists(docs_path):
-            logger.error(f"Parsed directory not found at: {docs_path}")
-            return {}
-            
-        for doc_name in relevant_docs:
-            file_path = os.path.join(docs_path, doc_name)
-            logger.info(f"Attempting to load document from: {file_path}")
-            if os.path.exists(file_path):
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    docs[doc_name] = file.read()
-                    logger.info(f"Successfully loaded document: {doc_name}")
-            else:
-                logger.warning(f"Document not found: {file_path}")
-        return docs
-    except Exception as e:
-        logger.error(f"Error loading documents: {str(e)}")
-        return {}
-
-def load_all_documents() -> dict:
-    """
-    Load all documents from the parsed directory
+    Render retrieved chunks as numbered excerpts headed by their citation
     """
-    docs = {}
-    docs_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "document_processing", "parsed")  # Go up one level to backend, then into document_processing
-    
-    try:
-        logger.info(f"Looking for all documents in: {docs_path}")
-        if not os.path.exists(docs_path):
-            logger.error(f"Parsed directory not found at: {docs_path}")
-            return {}
-            
-        files_found = os.listdir(docs_path)
-        logger.info(f"Files found in directory: {files_found}")
-        
-        for filename in files_found:
-            if filename.endswith(('.txt', '.md', '.json')):
-                file_path = os.path.join(docs_path, filename)
-                logger.info(f"Attempting to load document from: {file_path}")
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as file:
-                        docs[filename] = file.read()
-                        logger.info(f"Successfully loaded document: {filename}")
-                except Exception as e:
-                    logger.error(f"Error loading file {filename}: {str(e)}")
-                    
-        if not docs:
-            logger.warning(f"No documents loaded from {docs_path}")
-        return docs
-    except Exception as e:
-        logger.error(f"Error loading all documents: {str(e)}")
-        return {}
+    excerpts = []
+    for number, chunk in enumerate(doc_chunks, 1):
+        citation = chunk.get("citation") or format_citation(chunk)
+        heading = f" — {chunk['heading']}" if chunk.get("heading") else ""
+        excerpts.append(f"[{number}] {citation}{heading}\n{chunk.get('text', '')}")
+    return "\n\n".join(excerpts)
 
 async def answer_user(state: MainState) -> MainState:
     """
-    Agent that crafts detailed responses using document paths and/or web results
+    Agent that crafts detailed responses using retrieved document chunks and/or web results
     """
     try:
         response_id = str(uuid.uuid4())
@@ -91,10 +42,10 @@ async def answer_user(state: MainState) -> MainState:
         # Get the latest handoff parameters
         latest_handoff = handoff_parameters[-1]
         tavily_content = latest_handoff.get("content", [])
-        doc_paths = latest_handoff.get("doc_paths", {})
+        doc_chunks = latest_handoff.get("doc_chunks", [])
         
         # Check if we have any content to work with
-        if not tavily_content and not doc_paths:
+        if not tavily_content and not doc_chunks:
             return handoff_to_welcome_user(
                 state,
                 "No relevant information found",
@@ -114,10 +65,8 @@ REMEMBER:
 
 Available Information Sources:
 
-{f'''Document Locations:
-1. Document Directory: {doc_paths.get('docs_path', 'parsed')}
-2. Specific Files: {doc_paths.get('specific_files', [])}
-Please read and analyze the content from these locations.''' if doc_paths else ''}
+{f'''Document Excerpts:
+{format_doc_chunks(doc_chunks)}''' if doc_chunks else ''}
 
 {f'''Web Search Results:
 {json.dumps(tavily_content, indent=2)}''' if tavily_content else ''}
@@ -129,7 +78,7 @@ Comprehensive Query: {comprehensive_query}
 
 Your task is to:
 1. Read and analyze all available information sources:
-   {' - Read documents from the provided paths' if doc_paths else ''}
+   {' - Use the document excerpts, citing the document and page given with each one' if doc_chunks else ''}
    {' - Consider web search results' if tavily_content else ''}
 2. Craft a comprehensive response that:
    - Directly answers the user's question
@@ -267,10 +216,14 @@ Instructions for Response Format:
 
         # Try OpenRouter first, fallback to regular LLM API if it fails
         #llm_response = await call_llm_api_openrouter(messages)
-        llm_response = await call_llm_api(messages)
-        
-
-        parsed_response = extract_and_parse_json(llm_response)
+        if state.get("stream") and state.get("websocket_manager"):
+            # Forward message_to_user to the client while the rest of the JSON is generated
+            llm_response, streamed_response = await stream_response_to_user(messages, state["websocket_manager"], state["session_id"])
+            parsed_response = await call_llm_structured(
+                messages, ANSWER_ENVELOPES, llm_response=llm_response, parsed_response=streamed_response
+            )
+        else:
+            parsed_response = await call_llm_structured(messages, ANSWER_ENVELOPES)
 
         print(json.dumps(parsed_response, indent=2))
         if not parsed_response:
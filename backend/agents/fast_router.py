@@ -0,0 +1,237 @@
+import os
+import re
+import json
+import math
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+from backend.shared_services.shared_types import MainState
+from backend.shared_services.handoffs import handoff_to_respond_to_human
+from backend.shared_services.message_store import reads_normalized
+from backend.shared_services.db import acquire_connection
+from backend.shared_services.logger_setup import setup_logger
+
+logger = setup_logger()
+
+# Fast-path router configuration (override via environment)
+FAST_ROUTER_ENABLED = os.getenv("FAST_ROUTER_ENABLED", "true").lower() == "true"
+FAST_ROUTER_THRESHOLD = float(os.getenv("FAST_ROUTER_THRESHOLD", "0.9"))        # classifier confidence needed to route
+FAST_ROUTER_MIN_TRAINING = int(os.getenv("FAST_ROUTER_MIN_TRAINING", "50"))     # examples before the classifier is used
+FAST_ROUTER_TRAINING_LIMIT = int(os.getenv("FAST_ROUTER_TRAINING_LIMIT", "5000"))
+
+GREETING_RE = re.compile(
+    r"^(hi+|hello+|hey+|hallo|habari|jambo|sasa|good (morning|afternoon|evening|day))"
+    r"( (there|simba|team|all|everyone))?$"
+)
+THANKS_RE = re.compile(r"^((thanks|thank you|thank u|thx|asante)( (so much|a lot|very much|simba))?|(ok|okay|great|cool|perfect),? thanks?)$")
+GOODBYE_RE = re.compile(r"^(bye|goodbye|good bye|see you|see ya|kwaheri|that s all|that is all)( (simba|for now|then))?$")
+WEB_INTENT_RE = re.compile(
+    r"\b(latest news|in the news|news (about|on)|today s|this week s|exchange rates?|forex rates?|"
+    r"share price|stock price|nse|weather|search (the )?(web|internet|online)|google (it|this|that))\b"
+)
+
+CANNED_REPLIES = {
+    "greeting": (
+        "Hello! I'm Simba, KCB Bank's product information assistant. What would you like to know about our products and services?",
+        ["What can you help me with?"]
+    ),
+    "thanks": ("You're welcome! Let me know if there is anything else I can help with.", []),
+    "goodbye": ("Goodbye! Come back any time you have a question about KCB products.", []),
+}
+
+# welcome_user decisions the classifier may take on its own; chitchat needs the LLM to write the reply
+ROUTABLE_LABELS = {"extract_docs_tool", "tavily_tool"}
+
+TRAINING_SNAPSHOTS_SQL = """
+    SELECT state->>'user_input' AS user_input, state->'node_history' AS node_history
+    FROM andika.andika_conversations
+    WHERE state->>'user_input' IS NOT NULL
+    ORDER BY log_timestamp DESC
+    LIMIT $1
+"""
+
+TRAINING_TURNS_SQL = """
+    SELECT user_input, node_history
+    FROM andika.andika_turns
+    WHERE user_input IS NOT NULL
+    ORDER BY log_timestamp DESC
+    LIMIT $1
+"""
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase words only, with list numbering ("3. ") stripped"""
+    text = re.sub(r"^\s*\d+\s*[.)]\s*", "", text or "")
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def _tokens(text: str) -> List[str]:
+    words = normalize_text(text).split()
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+def label_from_node_history(node_history: Any) -> Optional[str]:
+    """The first routing decision welcome_user made in a logged turn"""
+    if isinstance(node_history, str):
+        node_history = json.loads(node_history)
+    for entry in node_history or []:
+        if not isinstance(entry, dict) or entry.get("node") != "welcome_user":
+            continue
+        content = entry.get("content") or {}
+        if content.get("response_type") == "tool_call" and content.get("tools"):
+            return content["tools"][0].get("tool")
+        if content.get("response_type") == "handoff" and content.get("agents"):
+            agent = content["agents"][0]
+            return agent.get("agent_name") or agent.get("agent")
+        return None
+    return None
+
+
+class NaiveBayesRouter:
+    """Multinomial naive Bayes over word unigrams and bigrams, with Laplace smoothing"""
+
+    def __init__(self):
+        self.examples = 0
+        self._label_counts: Counter = Counter()
+        self._token_counts: Dict[str, Counter] = defaultdict(Counter)
+        self._token_totals: Counter = Counter()
+        self._vocabulary = set()
+
+    def fit(self, examples: List[Tuple[str, str]]) -> None:
+        self.__init__()
+        for text, label in examples:
+            tokens = _tokens(text)
+            self.examples += 1
+            self._label_counts[label] += 1
+            self._token_counts[label].update(tokens)
+            self._token_totals[label] += len(tokens)
+            self._vocabulary.update(tokens)
+
+    def predict(self, text: str) -> Tuple[Optional[str], float]:
+        """Most likely label and its posterior probability"""
+        tokens = [token for token in _tokens(text) if token in self._vocabulary]
+        if not self.examples or len(tokens) < 2:
+            return None, 0.0
+        vocabulary_size = len(self._vocabulary)
+        scores = {}
+        for label, count in self._label_counts.items():
+            score = math.log(count / self.examples)
+            denominator = self._token_totals[label] + vocabulary_size
+            for token in tokens:
+                score += math.log((self._token_counts[label][token] + 1) / denominator)
+            scores[label] = score
+        best = max(scores, key=scores.get)
+        total = sum(math.exp(score - scores[best]) for score in scores.values())
+        return best, 1.0 / total
+
+
+class FastRouter:
+    """
+    Deterministic pre-router that settles clear-cut turns without the welcome_user
+    LLM call: greetings/thanks/goodbyes, obvious web-search intents and, once
+    trained from logged node_history decisions, confident classifier predictions.
+    Anything else falls through to welcome_user. FAQ questions are answered
+    earlier, by the FAQ index.
+    """
+
+    def __init__(self, threshold: float = FAST_ROUTER_THRESHOLD):
+        self.threshold = threshold
+        self.classifier = NaiveBayesRouter()
+        self.metrics = {"turns": 0, "llm_calls_skipped": 0, "fallthrough": 0}
+        self.routes: Counter = Counter()
+
+    def classify(self, user_input: str) -> Optional[Tuple[str, float, Dict[str, Any]]]:
+        """Return (route, confidence, details) for a clear-cut input, else None"""
+        text = normalize_text(user_input)
+        if not text:
+            return None
+        for route, pattern in (("greeting", GREETING_RE), ("thanks", THANKS_RE), ("goodbye", GOODBYE_RE)):
+            if pattern.match(text):
+                return route, 1.0, {}
+
+        if WEB_INTENT_RE.search(text):
+            return "tavily_tool", 1.0, {}
+
+        if self.classifier.examples >= FAST_ROUTER_MIN_TRAINING:
+            label, confidence = self.classifier.predict(user_input)
+            if label in ROUTABLE_LABELS and confidence >= self.threshold:
+                return label, confidence, {"classifier": True}
+        return None
+
+    def route(self, state: MainState) -> bool:
+        """Append a routing envelope to node_history and return True, or return False to use welcome_user"""
+        self.metrics["turns"] += 1
+        user_input = state.get("user_input", "")
+        try:
+            decision = self.classify(user_input)
+        except Exception as e:
+            logger.error(f"Error in fast router: {str(e)}")
+            decision = None
+        if decision is None:
+            self.metrics["fallthrough"] += 1
+            return False
+
+        route, confidence, details = decision
+        response_id = str(uuid.uuid4())
+        if route in CANNED_REPLIES:
+            message, follow_up_questions = CANNED_REPLIES[route]
+            handoff_to_respond_to_human(state, message, [], list(follow_up_questions), response_id, "fast_router")
+        else:
+            parameters = {"query": user_input, "comprehensive_question": user_input}
+            state["node_history"].append({
+                "role": "AI_AGENT",
+                "node": "fast_router",
+                "conversation_id": state["conversation_id"],
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "response_id": response_id,
+                "confidence": round(confidence, 4),
+                "content": {
+                    "response_type": "tool_call",
+                    "tools": [{"tool": route, "parameters": parameters}]
+                }
+            })
+
+        self.metrics["llm_calls_skipped"] += 1
+        self.routes["classifier" if details.get("classifier") else route] += 1
+        logger.info(f"Fast router sent '{user_input}' to {route} (confidence {confidence:.2f})")
+        return True
+
+    async def train_from_history(self, limit: int = FAST_ROUTER_TRAINING_LIMIT) -> int:
+        """Fit the classifier on welcome_user's logged decisions; returns the number of examples"""
+        sql = TRAINING_TURNS_SQL if reads_normalized() else TRAINING_SNAPSHOTS_SQL
+        async with acquire_connection() as conn:
+            rows = await conn.fetch(sql, limit)
+        examples = []
+        for row in rows:
+            try:
+                label = label_from_node_history(row["node_history"])
+            except (ValueError, TypeError):
+                continue
+            if label:
+                examples.append((row["user_input"], label))
+        self.classifier.fit(examples)
+        logger.info(f"Fast router classifier trained on {len(examples)} logged decisions")
+        return len(examples)
+
+    def get_stats(self) -> Dict[str, Any]:
+        turns = self.metrics["turns"]
+        return {
+            "enabled": FAST_ROUTER_ENABLED,
+            "threshold": self.threshold,
+            "training_examples": self.classifier.examples,
+            **self.metrics,
+            "skip_rate": round(self.metrics["llm_calls_skipped"] / turns, 4) if turns else 0.0,
+            "routes": dict(self.routes),
+        }
+
+
+# Create a singleton instance
+fast_router = FastRouter()
+
+
+def fast_route(state: MainState) -> bool:
+    """Route the turn locally if it is clear-cut; False means ask welcome_user"""
+    if not FAST_ROUTER_ENABLED:
+        return False
+    return fast_router.route(state)
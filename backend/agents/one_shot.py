@@ -0,0 +1,174 @@
+import os
+import uuid
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Tuple
+from backend.shared_services.shared_types import MainState
+from backend.shared_services.agent_schemas import call_llm_structured, ONE_SHOT_ENVELOPES
+from backend.shared_services.streaming import stream_response_to_user
+from backend.shared_services.dense_index import retrieve_documents
+from backend.agents.answer_user import format_doc_chunks
+from backend.shared_services.logger_setup import setup_logger
+
+logger = setup_logger()
+
+# One-shot mode: one LLM call routes and answers when the document context fits the budget
+ONE_SHOT_MODE = os.getenv("ONE_SHOT_MODE", "off").strip().lower() == "on"
+ONE_SHOT_TOKEN_BUDGET = int(os.getenv("ONE_SHOT_TOKEN_BUDGET", "12000"))
+ONE_SHOT_TOP_K = int(os.getenv("ONE_SHOT_TOP_K", "8"))  # Retrieved chunks offered as context
+CHARS_PER_TOKEN = 4  # Rough estimate for English text; avoids a tokenizer dependency
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+ONE_SHOT_PROMPT = """
+You are Simba, KCB Bank's product information assistant for staff.
+
+REMEMBER:
+- You are communicating with staff at KCB Bank, not customers.
+- Do not refer the user to check on website or visit the website.
+- Talk to staff from the point of view of a staff member at KCB Bank.
+
+Internal documents:
+{context}
+
+Conversation History: {conversation_history}
+
+User Query: {user_input}
+
+Decide first, then answer in the same reply:
+- If the query can be fully answered from the internal documents or the conversation history,
+  or is chitchat (greetings, thanks, small talk), answer it.
+- Otherwise (it needs current or web information, the documents don't cover it, or it is
+  too unclear to answer) decline so the full research workflow can handle it.
+
+To answer, respond with JSON:
+{{
+    "response_type": "handoff",
+    "agents": [
+        {{
+            "agent_name": "respond_to_human",
+            "parameters": {{
+                "message_to_user": "Your detailed answer in markdown, with inline citations",
+                "sources": ["Document name and page for each fact used"],
+                "requires_clarification": false,
+                "follow_up_questions": ["Question 1", "Question 2"]
+            }}
+        }}
+    ]
+}}
+
+To decline, respond with JSON:
+{{
+    "response_type": "decline",
+    "reason": "Why the documents are not enough"
+}}
+
+Only use facts from the internal documents or conversation history, cite the document and page
+for each one, and suggest 2-3 follow-up questions.
+"""
+
+
+class OneShotAnswerer:
+    """
+    Collapses welcome_user -> extract_docs_tool -> answer_user into a single LLM call
+    that either answers from the query's retrieved chunks or declines. A decline (or
+    no chunk fitting ONE_SHOT_TOKEN_BUDGET) falls back to the multi-agent path.
+    """
+
+    def __init__(self, enabled: bool = ONE_SHOT_MODE, token_budget: int = ONE_SHOT_TOKEN_BUDGET, top_k: int = ONE_SHOT_TOP_K):
+        self.enabled = enabled
+        self.token_budget = token_budget
+        self.top_k = top_k
+        self.metrics = {"attempts": 0, "answered": 0, "declined": 0, "over_budget": 0, "errors": 0}
+
+    def document_context(self, query: str, budget_tokens: int) -> Tuple[str, int]:
+        """
+        The query's top retrieved chunks as numbered excerpts, best first, keeping as
+        many as fit budget_tokens. Returns (context, chunks used).
+        """
+        chunks = retrieve_documents(query, self.top_k)
+        while chunks and estimate_tokens(format_doc_chunks(chunks)) > budget_tokens:
+            chunks = chunks[:-1]
+        return format_doc_chunks(chunks), len(chunks)
+
+    def build_messages(self, state: MainState, context: str) -> List[Dict[str, str]]:
+        prompt = ONE_SHOT_PROMPT.format(
+            context=context,
+            conversation_history=state.get("conversation_history", []),
+            user_input=state.get("user_input", "")
+        )
+        return [
+            {"role": "system", "content": "You are Simba, KCB Bank's product information assistant. Answer only from the provided sources."},
+            {"role": "user", "content": prompt},
+            {"role": "system", "content": "Please provide your response in the specified JSON format."}
+        ]
+
+    async def answer(self, state: MainState) -> bool:
+        """Try to answer the turn with one call; True if a respond_to_human handoff was queued"""
+        self.metrics["attempts"] += 1
+        try:
+            prompt_tokens = estimate_tokens("".join(message["content"] for message in self.build_messages(state, "")))
+            context, chunks_used = await asyncio.to_thread(
+                self.document_context, state.get("user_input", ""), self.token_budget - prompt_tokens
+            )
+            if not chunks_used:
+                self.metrics["over_budget"] += 1
+                return False
+            messages = self.build_messages(state, context)
+
+            if state.get("stream") and state.get("websocket_manager"):
+                llm_response, streamed_response = await stream_response_to_user(messages, state["websocket_manager"], state["session_id"])
+                parsed_response = await call_llm_structured(
+                    messages, ONE_SHOT_ENVELOPES, llm_response=llm_response, parsed_response=streamed_response
+                )
+            else:
+                parsed_response = await call_llm_structured(messages, ONE_SHOT_ENVELOPES)
+
+            if (
+                not parsed_response
+                or parsed_response.get("response_type") != "handoff"
+                or parsed_response["agents"][0]["agent_name"] != "respond_to_human"
+            ):
+                self.metrics["declined"] += 1
+                reason = (parsed_response or {}).get("reason", "no usable answer")
+                logger.info(f"One-shot declined for conversation {state['conversation_id']}: {reason}")
+                return False
+
+            state["node_history"].append({
+                "role": "AI_AGENT",
+                "node": "one_shot",
+                "conversation_id": state["conversation_id"],
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "response_id": str(uuid.uuid4()),
+                "content": parsed_response
+            })
+            self.metrics["answered"] += 1
+            return True
+
+        except Exception as e:
+            self.metrics["errors"] += 1
+            logger.error(f"Error in one-shot answer: {str(e)}", exc_info=True)
+            return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        attempts = self.metrics["attempts"]
+        return {
+            "enabled": self.enabled,
+            "token_budget": self.token_budget,
+            **self.metrics,
+            "answer_rate": round(self.metrics["answered"] / attempts, 4) if attempts else 0.0,
+        }
+
+
+# Create a singleton instance
+one_shot_answerer = OneShotAnswerer()
+
+
+async def answer_in_one_shot(state: MainState) -> bool:
+    """Answer with a single LLM call when one-shot mode is on; False means use the agent chain"""
+    if not one_shot_answerer.enabled:
+        return False
+    return await one_shot_answerer.answer(state)
@@ -6,6 +6,7 @@ from backend.shared_services.shared_types import MainState
 from backend.shared_services.logger_setup import setup_logger
 from backend.shared_services.handoff_parameters import get_unanalyzed_handoffs, mark_handoffs_as_analyzed
 from backend.shared_services.streaming import stream_response_to_user
+from backend.shared_services.history_cache import history_cache
 
 logger = setup_logger()
 
@@ -53,14 +54,17 @@ async def respond_to_human(state: MainState) -> MainState:
         state["sources"] = sources
         state["follow_up_questions"] = follow_up_questions
         
-        # Add response to conversation history
-        state["conversation_history"].append({
+        # Add response to conversation history and the session's hot history buffer
+        history_message = {
+            "message_id": str(uuid.uuid4()),
             "role": "assistant",
             "content": message,
             "sources": sources,
             "follow_up_questions": follow_up_questions,
             "timestamp": datetime.now(timezone.utc).isoformat()
-        })
+        }
+        state["conversation_history"].append(history_message)
+        history_cache.append(state["session_id"], history_message)
         
         # Add to node history
         state["node_history"].append({
@@ -1,10 +1,10 @@
-from typing import Dict, Any
+from typing import Dict, Any, List
 from datetime import datetime, timezone
 import json
 import uuid
 from backend.shared_services.llm import call_llm_api, call_llm_api_openrouter
 from backend.shared_services.shared_types import MainState
-from backend.shared_services.extract_and_parse_json import extract_and_parse_json
+from backend.shared_services.agent_schemas import call_llm_structured, ROUTER_ENVELOPES
 from backend.shared_services.logger_setup import setup_logger
 
 from backend.shared_services.handoff_parameters import get_unanalyzed_handoffs, mark_handoffs_as_analyzed
@@ -14,6 +14,19 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+def routing_cache_messages(user_input: str, conversation_history: List[Dict], past_history: List[Dict], has_docs: bool) -> List[Dict[str, Any]]:
+    """
+    What a routing decision depends on, for its cache key: the query and the role and
+    content of each message, without the per-message ids and timestamps in the prompt
+    """
+    past_exchanges = [entry.get("exchange", {}) for entry in past_history]
+    return [
+        {"role": "system", "content": f"welcome_user routing, available_docs={has_docs}"},
+        *({"role": message.get("role", ""), "content": message.get("content", "")} for message in conversation_history),
+        *({"role": f"past_{message.get('role', '')}", "content": message.get("content", "")} for message in past_exchanges),
+        {"role": "user", "content": user_input},
+    ]
+
 async def welcome_user(state: MainState) -> MainState:
     """
     Welcome user agent that autonomously decides how to handle user queries.
@@ -224,8 +237,16 @@ IMPORTANT NOTE:
             }
         ]
 
-        llm_response = await call_llm_api(messages)
-        parsed_response = extract_and_parse_json(llm_response)
+        # Routing decisions for identical context are safe to reuse. Error recovery is not
+        # cached: replaying the decision that just failed would loop.
+        parsed_response = await call_llm_structured(
+            messages,
+            ROUTER_ENVELOPES,
+            cache=not handoff_parameters,
+            cache_key_messages=routing_cache_messages(
+                user_input, conversation_history, state.get('past_history', []), len(available_docs) > 0
+            )
+        )
 
         print(f"Welcome User Parsed Response: {json.dumps(parsed_response, indent=2)}")
         
@@ -0,0 +1,118 @@
+"""
+Latency comparison of the multi-agent chat flow and one-shot mode.
+
+Runs each question through run_chat_flow in both modes against the configured
+LLM and database (backend/.env) and reports per-turn latency and LLM calls.
+The semantic cache, FAQ answers, fast router and LLM response cache are
+disabled so every turn does real work.
+
+    python -m backend.benchmarks.chat_flow_benchmark --runs 3
+    python -m backend.benchmarks.chat_flow_benchmark --questions questions.txt --json
+"""
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import statistics
+from typing import Dict, Any, List
+
+import backend.agents.fast_router as fast_router_module
+import backend.shared_services.semantic_cache as semantic_cache_module
+import backend.shared_services.faq_index as faq_index_module
+from backend.main import run_chat_flow, ChatRequest, initialize_state
+from backend.agents.one_shot import one_shot_answerer
+from backend.shared_services.llm_cache import llm_response_cache
+from backend.shared_services.db import init_db_pool, close_db_pool
+from backend.shared_services.conversation_writer import conversation_writer
+
+DEFAULT_QUESTIONS = [
+    "What is VOOMA?",
+    "What do I need to register on VOOMA?",
+    "Is there a cost of registration for VOOMA?",
+    "What services can a customer get on VOOMA?",
+    "How does a customer reset their VOOMA PIN?",
+]
+
+# Nodes that make an LLM call
+LLM_NODES = {"welcome_user", "answer_user", "one_shot"}
+
+
+async def run_turn(question: str) -> Dict[str, Any]:
+    request = ChatRequest(user_id="benchmark", user_input=question, session_id=f"benchmark-{uuid.uuid4()}")
+    state = await initialize_state(request)
+    started = time.perf_counter()
+    state = await run_chat_flow(state)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    nodes = [entry.get("node") for entry in state.get("node_history", [])]
+    return {
+        "latency_ms": elapsed_ms,
+        "llm_calls": sum(1 for node in nodes if node in LLM_NODES),
+        "answered_in_one_shot": "one_shot" in nodes,
+    }
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    latencies = sorted(result["latency_ms"] for result in results)
+    return {
+        "turns": len(results),
+        "p50_ms": round(statistics.median(latencies)),
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]),
+        "mean_ms": round(statistics.mean(latencies)),
+        "mean_llm_calls": round(statistics.mean(result["llm_calls"] for result in results), 2),
+        "one_shot_answers": sum(1 for result in results if result["answered_in_one_shot"]),
+    }
+
+
+async def run_benchmark(questions: List[str], runs: int) -> Dict[str, Any]:
+    semantic_cache_module.SEMANTIC_CACHE_ENABLED = False
+    faq_index_module.FAQ_ANSWERS_ENABLED = False
+    fast_router_module.FAST_ROUTER_ENABLED = False
+
+    await init_db_pool()
+    await conversation_writer.start()
+    try:
+        report = {}
+        for mode, enabled in (("multi_agent", False), ("one_shot", True)):
+            one_shot_answerer.enabled = enabled
+            results = []
+            for _ in range(runs):
+                for question in questions:
+                    llm_response_cache.clear()
+                    results.append(await run_turn(question))
+            report[mode] = summarize(results)
+        return report
+    finally:
+        await conversation_writer.stop()
+        await close_db_pool()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare multi-agent and one-shot chat flow latency")
+    parser.add_argument("--questions", help="File with one question per line (defaults to built-in product questions)")
+    parser.add_argument("--runs", type=int, default=1, help="Times to ask each question per mode")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    questions = DEFAULT_QUESTIONS
+    if args.questions:
+        with open(args.questions, "r", encoding="utf-8") as file:
+            questions = [line.strip() for line in file if line.strip()]
+
+    report = asyncio.run(run_benchmark(questions, args.runs))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+
+    print(f"{'mode':<12} {'turns':>6} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8} {'LLM calls':>10} {'one-shot':>9}")
+    for mode, summary in report.items():
+        print(
+            f"{mode:<12} {summary['turns']:>6} {summary['p50_ms']:>8} {summary['p95_ms']:>8} "
+            f"{summary['mean_ms']:>8} {summary['mean_llm_calls']:>10} {summary['one_shot_answers']:>9}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Page layout throughput of DocumentProcessor before and after the line grouping rework.
+
+Parses every page of a PDF (the bundled Vooma FAQ by default) with the previous
+per-line loop and with group_lines, checks that both produce identical page
+XML, and reports pages per second. "layout" times line grouping and XML only,
+on words extracted once up front; "end to end" includes pdfplumber's
+extract_words.
+
+    python -m backend.benchmarks.document_processor_benchmark --runs 20
+    python -m backend.benchmarks.document_processor_benchmark --pdf manual.pdf --json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Dict, Any, List, Callable
+
+import pdfplumber
+from backend.document_processing.document_processor import DocumentProcessor
+
+DEFAULT_PDF = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "document_processing", "completed", "VOOMA_CUSTOMER_FAQS (2).pdf"
+)
+
+WORD_OPTIONS = dict(keep_blank_chars=True, x_tolerance=3, y_tolerance=3, extra_attrs=['size', 'fontname', 'top'])
+
+
+def legacy_group_lines(words: List[Dict]) -> List[Dict]:
+    """The line grouping extract_page_data used before group_lines, kept for comparison"""
+    page_data = []
+    current_line = []
+    current_top = None
+
+    for word in words:
+        if current_top is None:
+            current_top = word['top']
+
+        if abs(word['top'] - current_top) > 3:
+            if current_line:
+                line_text = ' '.join(w['text'] for w in current_line)
+                chars = {
+                    'size': sum(w.get('size', 0) for w in current_line) / len(current_line),
+                    'fontname': current_line[0].get('fontname', ''),
+                    'avg_size': sum(w.get('size', 0) for w in words) / len(words)
+                }
+                page_data.append({'text': line_text, 'chars': chars})
+
+            current_line = [word]
+            current_top = word['top']
+        else:
+            current_line.append(word)
+
+    if current_line:
+        line_text = ' '.join(w['text'] for w in current_line)
+        chars = {
+            'size': sum(w.get('size', 0) for w in current_line) / len(current_line),
+            'fontname': current_line[0].get('fontname', ''),
+            'avg_size': sum(w.get('size', 0) for w in words) / len(words)
+        }
+        page_data.append({'text': line_text, 'chars': chars})
+
+    return page_data
+
+
+def pages_per_second(pages: int, seconds: float) -> float:
+    return round(pages / seconds, 1) if seconds else 0.0
+
+
+def time_layout(processor: DocumentProcessor, group: Callable, page_words: List[List[Dict]], runs: int) -> float:
+    started = time.perf_counter()
+    for _ in range(runs):
+        for words in page_words:
+            processor.create_xml_content(group(words))
+    return time.perf_counter() - started
+
+
+def time_end_to_end(processor: DocumentProcessor, group: Callable, pdf_path: str, runs: int) -> float:
+    started = time.perf_counter()
+    for _ in range(runs):
+        with pdfplumber.open(pdf_path) as pdf:
+            for page in pdf.pages:
+                processor.create_xml_content(group(page.extract_words(**WORD_OPTIONS)))
+    return time.perf_counter() - started
+
+
+def run_benchmark(pdf_path: str, runs: int, end_to_end_runs: int) -> Dict[str, Any]:
+    processor = DocumentProcessor(create_folders=False)
+    with pdfplumber.open(pdf_path) as pdf:
+        page_words = [page.extract_words(**WORD_OPTIONS) for page in pdf.pages]
+
+    mismatched = [
+        number for number, words in enumerate(page_words, 1)
+        if processor.create_xml_content(legacy_group_lines(words)) != processor.create_xml_content(processor.group_lines(words))
+    ]
+
+    pages = len(page_words)
+    report = {
+        "pdf": os.path.basename(pdf_path),
+        "pages": pages,
+        "words": sum(len(words) for words in page_words),
+        "identical_xml": not mismatched,
+        "mismatched_pages": mismatched,
+    }
+    for label, group in (("before", legacy_group_lines), ("after", processor.group_lines)):
+        report[label] = {
+            "layout_pages_per_s": pages_per_second(pages * runs, time_layout(processor, group, page_words, runs)),
+            "end_to_end_pages_per_s": pages_per_second(
+                pages * end_to_end_runs, time_end_to_end(processor, group, pdf_path, end_to_end_runs)
+            ),
+        }
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare DocumentProcessor page layout throughput before and after")
+    parser.add_argument("--pdf", default=DEFAULT_PDF, help="PDF to parse (defaults to the bundled Vooma FAQ)")
+    parser.add_argument("--runs", type=int, default=20, help="Layout passes over the extracted words")
+    parser.add_argument("--end-to-end-runs", type=int, default=3, help="Full parses including word extraction")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.pdf, args.runs, args.end_to_end_runs)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0 if report["identical_xml"] else 1
+
+    print(f"{report['pdf']}: {report['pages']} pages, {report['words']} words")
+    print(f"XML identical: {'yes' if report['identical_xml'] else 'NO, pages ' + str(report['mismatched_pages'])}")
+    print(f"{'':<8} {'layout pages/s':>15} {'end-to-end pages/s':>19}")
+    for label in ("before", "after"):
+        print(f"{label:<8} {report[label]['layout_pages_per_s']:>15} {report[label]['end_to_end_pages_per_s']:>19}")
+    return 0 if report["identical_xml"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
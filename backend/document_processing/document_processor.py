@@ -1,22 +1,134 @@
 import os
+import sys
 import json
+import time
+import hashlib
+import uuid
+import argparse
 from datetime import datetime
 import shutil
 import pdfplumber
+import numpy as np
 import xml.etree.ElementTree as ET
-from typing import Dict, List
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Tuple, Optional, Any
 import re
+from backend.document_processing.parsed_format import write_parsed_document, JSONL_SUFFIX
+from backend.document_processing.faq_extractor import extract_faq_pairs, update_faq_index, FAQ_INDEX_FILENAME
+from backend.shared_services.file_lock import file_lock
+
+# Documents longer than this are split into page ranges of this size for the process pool
+PAGES_PER_TASK = int(os.getenv("INGEST_PAGES_PER_TASK", "16"))
+
+LINE_TOLERANCE = 3  # Words whose top is within this of the line's first word share the line
+
+HEADING_RE = re.compile(
+    r"^(?:CHAPTER|Section)\s+\d+"  # Chapter or Section followed by number
+    r"|^\d+\.\d*\s+[A-Z]"          # Numbered sections like "1.2 TITLE"
+    r"|^[IVXLC]+\."                 # Roman numerals
+)
+LIST_ITEM_RE = re.compile(r'^\s*[•\-\d]+[\.\)]\s')
+
+
+def _parse_page_range(file_path: str, first_page: int, last_page: int) -> List[Tuple[int, Dict]]:
+    """
+    Process pool task: parse pages first_page..last_page (1-based, inclusive) of a PDF.
+    Module-level so it can be pickled.
+    """
+    processor = DocumentProcessor(create_folders=False)
+    with pdfplumber.open(file_path, pages=list(range(first_page, last_page + 1))) as pdf:
+        return [(page.page_number, processor.parse_page(page)) for page in pdf.pages]
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestManifest:
+    """
+    Record of every ingested PDF keyed by content hash: which parsed file it
+    produced, its page count and when. Lets ingestion skip PDFs it has already
+    parsed and spot changed versions of known files.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.documents = json.load(f).get("documents", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable manifest {path}: {str(e)}")
+
+    def lookup(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        return self.documents.get(content_hash)
+
+    def hash_for(self, filename: str) -> Optional[str]:
+        """Content hash last ingested under this filename"""
+        for content_hash, record in self.documents.items():
+            if record["filename"] == filename:
+                return content_hash
+        return None
+
+    def reload(self) -> None:
+        """Re-read the manifest; other processes (the watcher, upload jobs) may have written it"""
+        self.documents = IngestManifest(self.path).documents
+
+    def record(self, content_hash: str, filename: str, parsed_file: str, pages: int) -> None:
+        # Locked so concurrent writers (the watcher, upload jobs in each web worker) don't lose updates
+        with file_lock(self.path):
+            self.reload()
+            previous = self.hash_for(filename)
+            if previous and previous != content_hash:
+                del self.documents[previous]  # The file changed; its old version is no longer indexed
+            self.documents[content_hash] = {
+                "filename": filename,
+                "parsed_file": parsed_file,
+                "pages": pages,
+                "processed_at": datetime.now().isoformat()
+            }
+            self.save()
+
+    def save(self) -> None:
+        temp_path = f"{self.path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"documents": self.documents}, f, indent=2, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+
+
+def count_pages(file_path: str) -> int:
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
+
+
+def split_pages(total_pages: int, pages_per_task: int = PAGES_PER_TASK) -> List[Tuple[int, int]]:
+    """(first, last) 1-based inclusive page ranges covering the document"""
+    return [
+        (first, min(first + pages_per_task - 1, total_pages))
+        for first in range(1, total_pages + 1, pages_per_task)
+    ]
+
 
 class DocumentProcessor:
-    def __init__(self):
-        self.received_folder = "received"
-        self.parsed_folder = "parsed"
-        self.completed_folder = "completed"
+    def __init__(self, base_folder: str = ".", create_folders: bool = True, received_folder: Optional[str] = None):
+        self.received_folder = received_folder or os.path.join(base_folder, "received")
+        self.parsed_folder = os.path.join(base_folder, "parsed")
+        self.completed_folder = os.path.join(base_folder, "completed")
+        self.manifest_path = os.path.join(base_folder, "manifest.json")
+        self.faq_index_path = os.path.join(base_folder, FAQ_INDEX_FILENAME)
+        self._manifest: Optional[IngestManifest] = None
         
         # Create folders if they don't exist
-        for folder in [self.received_folder, self.parsed_folder, self.completed_folder]:
-            if not os.path.exists(folder):
-                os.makedirs(folder)
+        if create_folders:
+            for folder in [self.received_folder, self.parsed_folder, self.completed_folder]:
+                if not os.path.exists(folder):
+                    os.makedirs(folder)
 
     def detect_element_type(self, text: str, chars: Dict) -> str:
         """
@@ -27,15 +139,8 @@ class DocumentProcessor:
             return "empty"
 
         # Check for heading patterns
-        heading_patterns = [
-            r"^(?:CHAPTER|Section)\s+\d+",  # Chapter or Section followed by number
-            r"^\d+\.\d*\s+[A-Z]",           # Numbered sections like "1.2 TITLE"
-            r"^[IVXLC]+\.",                 # Roman numerals
-        ]
-        
-        for pattern in heading_patterns:
-            if re.match(pattern, text):
-                return "heading"
+        if HEADING_RE.match(text):
+            return "heading"
 
         # Check text characteristics from chars dictionary
         if chars:
@@ -43,11 +148,11 @@ class DocumentProcessor:
             if chars.get('size', 0) > chars.get('avg_size', 0) * 1.2:
                 return "heading"
             # If text is bold
-            if chars.get('fontname', '').lower().find('bold') != -1:
+            if 'bold' in chars.get('fontname', '').lower():
                 return "subheading"
 
         # Check for list items
-        if re.match(r'^\s*[•\-\d]+[\.\)]\s', text):
+        if LIST_ITEM_RE.match(text):
             return "list_item"
 
         return "paragraph"
@@ -91,14 +196,12 @@ class DocumentProcessor:
                     if 'fontname' in chars:
                         paragraph.set('font', chars['fontname'])
                     if 'size' in chars:
-                        paragraph.set('size', str(chars['size']))
+                        paragraph.set('size', str(round(chars['size'], 2)))
                 
         return ET.tostring(root, encoding='unicode', method='xml')
 
     def extract_page_data(self, page) -> List[Dict]:
         """Extract text and its properties from a page"""
-        page_data = []
-        
         # Extract text with layout preservation
         words = page.extract_words(
             keep_blank_chars=True,
@@ -106,70 +209,83 @@ class DocumentProcessor:
             y_tolerance=3,
             extra_attrs=['size', 'fontname', 'top']
         )
+        return self.group_lines(words)
+
+    @staticmethod
+    def line_starts(tops: np.ndarray, tolerance: float = LINE_TOLERANCE) -> List[int]:
+        """
+        Index of the first word of each line. A word starts a new line when its top
+        differs from the top of the current line's first word by more than tolerance.
+        """
+        if not len(tops):
+            return []
+        # Candidate breaks wherever consecutive tops jump; they are exact when no line
+        # drifts away from its first word and every jump also clears that word
+        starts = np.concatenate(([0], np.flatnonzero(np.abs(np.diff(tops)) > tolerance) + 1))
+        anchors = np.repeat(tops[starts], np.diff(np.append(starts, len(tops))))
+        if not np.any(np.abs(tops - anchors) > tolerance) and np.all(np.abs(tops[starts[1:]] - tops[starts[:-1]]) > tolerance):
+            return starts.tolist()
+
+        # Drifting baselines: fall back to walking the words
+        starts, current_top = [0], tops[0]
+        for index, top in enumerate(tops.tolist()):
+            if abs(top - current_top) > tolerance:
+                starts.append(index)
+                current_top = top
+        return starts
+
+    def group_lines(self, words: List[Dict]) -> List[Dict]:
+        """Group extracted words into lines with their font statistics"""
+        if not words:
+            return []
+        sizes = [w.get('size', 0) for w in words]
+        avg_size = sum(sizes) / len(sizes)  # Page statistic, computed once
+        starts = self.line_starts(np.array([w['top'] for w in words], dtype=np.float64))
+
+        page_data = []
+        for start, stop in zip(starts, starts[1:] + [len(words)]):
+            line = words[start:stop]
+            page_data.append({
+                'text': ' '.join(w['text'] for w in line),
+                'chars': {
+                    'size': sum(sizes[start:stop]) / (stop - start),
+                    'fontname': line[0].get('fontname', ''),
+                    'avg_size': avg_size
+                }
+            })
+        return page_data
+
+    def parse_page(self, page) -> Dict:
+        """Parse one pdfplumber page into its stored representation"""
+        # Extract page data with enhanced information
+        page_data = self.extract_page_data(page)
         
-        # Group words into lines based on vertical position
-        current_line = []
-        current_top = None
-        
-        for word in words:
-            if current_top is None:
-                current_top = word['top']
-            
-            # If word is on a new line (with small tolerance)
-            if abs(word['top'] - current_top) > 3:
-                if current_line:
-                    # Process the completed line
-                    line_text = ' '.join(w['text'] for w in current_line)
-                    chars = {
-                        'size': sum(w.get('size', 0) for w in current_line) / len(current_line),
-                        'fontname': current_line[0].get('fontname', ''),
-                        'avg_size': sum(w.get('size', 0) for w in words) / len(words)
-                    }
-                    page_data.append({'text': line_text, 'chars': chars})
-                
-                current_line = [word]
-                current_top = word['top']
-            else:
-                current_line.append(word)
+        # Convert to XML with structure
+        xml_content = self.create_xml_content(page_data)
         
-        # Process the last line
-        if current_line:
-            line_text = ' '.join(w['text'] for w in current_line)
-            chars = {
-                'size': sum(w.get('size', 0) for w in current_line) / len(current_line),
-                'fontname': current_line[0].get('fontname', ''),
-                'avg_size': sum(w.get('size', 0) for w in words) / len(words)
+        return {
+            "page_number": str(page.page_number),
+            "page_content": xml_content,
+            "metadata": {
+                "width": page.width,
+                "height": page.height,
+                "page_number": page.page_number,
+                "rotation": page.rotation or 0
             }
-            page_data.append({'text': line_text, 'chars': chars})
-        
-        return page_data
+        }
 
     def process_document(self, filename: str) -> Dict:
         """Process a single PDF document and return its JSON representation"""
         file_path = os.path.join(self.received_folder, filename)
         
         with pdfplumber.open(file_path) as pdf:
-            pages_dict = {}
-            
-            for page_num, page in enumerate(pdf.pages, 1):
-                # Extract page data with enhanced information
-                page_data = self.extract_page_data(page)
-                
-                # Convert to XML with structure
-                xml_content = self.create_xml_content(page_data)
-                
-                # Store page information
-                pages_dict[str(page_num)] = {
-                    "page_number": str(page_num),
-                    "page_content": xml_content,
-                    "metadata": {
-                        "width": page.width,
-                        "height": page.height,
-                        "page_number": page_num,
-                        "rotation": page.rotation or 0
-                    }
-                }
+            pages_dict = {str(page.page_number): self.parse_page(page) for page in pdf.pages}
         
+        return self.build_document(filename, pages_dict)
+
+    def build_document(self, filename: str, pages_dict: Dict) -> Dict:
+        """Wrap parsed pages (keyed by page number, in order) in the document envelope"""
+        file_path = os.path.join(self.received_folder, filename)
         return {
             "document_name": filename,
             "uploaded_on": datetime.now().isoformat(),
@@ -181,41 +297,168 @@ class DocumentProcessor:
             }
         }
 
-    def process_all_documents(self):
-        """Process all PDF documents in the received folder"""
-        processed_count = 0
-        error_count = 0
+    def page_ranges(self, filename: str, pages_per_task: int = PAGES_PER_TASK) -> List[Tuple[int, int]]:
+        """Split a document into (first, last) page ranges, one per process pool task"""
+        return split_pages(count_pages(os.path.join(self.received_folder, filename)), pages_per_task)
+
+    @property
+    def manifest(self) -> IngestManifest:
+        if self._manifest is None:
+            self._manifest = IngestManifest(self.manifest_path)
+        return self._manifest
+
+    def save_document(self, filename: str, json_data: Dict, content_hash: Optional[str] = None) -> None:
+        """
+        Write the parsed document, index its FAQ pairs, record it in the manifest and
+        move the PDF to the completed folder
+        """
+        stem = os.path.splitext(filename)[0]
+        parsed_filename = f"{stem}{JSONL_SUFFIX}"
+        
+        # Written to temp files and renamed, so the app's corpus reload never reads a partial file
+        write_parsed_document(json_data, os.path.join(self.parsed_folder, parsed_filename))
+        legacy_path = os.path.join(self.parsed_folder, f"{stem}.json")
+        if os.path.exists(legacy_path):
+            os.remove(legacy_path)  # Superseded by the JSONL just written
         
-        for filename in os.listdir(self.received_folder):
-            if filename.lower().endswith('.pdf'):
+        faqs = extract_faq_pairs(json_data, parsed_filename)
+        update_faq_index(self.faq_index_path, parsed_filename, faqs, replaces=[f"{stem}.json"])
+        if faqs:
+            print(f"Indexed {len(faqs)} FAQ pairs from {filename}")
+        
+        if content_hash:
+            self.manifest.record(content_hash, filename, parsed_filename, len(json_data['text']))
+        self.move_to_completed(filename)
+
+    def move_to_completed(self, filename: str) -> None:
+        source_path = os.path.join(self.received_folder, filename)
+        dest_path = os.path.join(self.completed_folder, filename)
+        shutil.move(source_path, dest_path)
+
+    def pending_documents(self) -> List[str]:
+        return sorted(filename for filename in os.listdir(self.received_folder) if filename.lower().endswith('.pdf'))
+
+    def plan_documents(self, skipped: List[str]) -> List[Tuple[str, str]]:
+        """
+        (filename, content hash) for received PDFs that need parsing. PDFs whose
+        content was already parsed are moved to completed and added to skipped.
+        """
+        planned = []
+        for filename in self.pending_documents():
+            content_hash = file_sha256(os.path.join(self.received_folder, filename))
+            record = self.manifest.lookup(content_hash)
+            if record and os.path.exists(os.path.join(self.parsed_folder, record["parsed_file"])):
+                print(f"Unchanged, skipping: {filename} (parsed as {record['parsed_file']})")
+                self.move_to_completed(filename)
+                skipped.append(filename)
+                continue
+            if self.manifest.hash_for(filename):
+                print(f"Changed since last ingest, re-parsing: {filename}")
+            planned.append((filename, content_hash))
+        return planned
+
+    def process_all_documents(self, workers: int = 1, pages_per_task: int = PAGES_PER_TASK):
+        """
+        Process all PDF documents in the received folder. With workers > 1, page
+        ranges from every document are parsed in a process pool and each
+        document's pages are reassembled in order once its last range finishes.
+        """
+        summary = {"processed": [], "skipped": [], "errors": []}
+        planned = self.plan_documents(summary["skipped"])
+        if workers > 1:
+            self._process_all_parallel(planned, workers, pages_per_task, summary)
+            self._print_summary(summary)
+            return summary
+
+        for filename, content_hash in planned:
+            try:
+                print(f"Processing: {filename}")
+                started = time.perf_counter()
+                json_data = self.process_document(filename)
+                self.save_document(filename, json_data, content_hash)
+                
+                print(f"Successfully processed: {filename} ({len(json_data['text'])} pages in {time.perf_counter() - started:.2f}s)")
+                summary["processed"].append(filename)
+                
+            except Exception as e:
+                print(f"Error processing {filename}: {str(e)}")
+                summary["errors"].append(filename)
+
+        self._print_summary(summary)
+        return summary
+
+    def _process_all_parallel(self, planned: List[Tuple[str, str]], workers: int, pages_per_task: int, summary: Dict[str, List[str]]):
+        started_at: Dict[str, float] = {}
+        remaining: Dict[str, int] = {}
+        pages: Dict[str, Dict[int, Dict]] = {}
+        failed = set()
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            hashes = dict(planned)
+            for filename, _ in planned:
+                try:
+                    ranges = self.page_ranges(filename, pages_per_task)
+                    if not ranges:
+                        raise ValueError("PDF has no pages")
+                except Exception as e:
+                    print(f"Error processing {filename}: {str(e)}")
+                    summary["errors"].append(filename)
+                    continue
+                print(f"Processing: {filename} ({len(ranges)} page ranges)")
+                started_at[filename] = time.perf_counter()
+                remaining[filename] = len(ranges)
+                pages[filename] = {}
+                file_path = os.path.join(self.received_folder, filename)
+                for first, last in ranges:
+                    futures[executor.submit(_parse_page_range, file_path, first, last)] = filename
+
+            for future in as_completed(futures):
+                filename = futures[future]
+                remaining[filename] -= 1
+                if filename in failed:
+                    continue  # Its partial pages were dropped when the first range failed
                 try:
-                    print(f"Processing: {filename}")
-                    # Process the document
-                    json_data = self.process_document(filename)
-                    
-                    # Save JSON to parsed folder
-                    json_filename = f"{os.path.splitext(filename)[0]}.json"
-                    json_path = os.path.join(self.parsed_folder, json_filename)
-                    
-                    with open(json_path, 'w', encoding='utf-8') as f:
-                        json.dump(json_data, f, indent=4, ensure_ascii=False)
-                    
-                    # Move original PDF to completed folder
-                    source_path = os.path.join(self.received_folder, filename)
-                    dest_path = os.path.join(self.completed_folder, filename)
-                    shutil.move(source_path, dest_path)
-                    
-                    print(f"Successfully processed: {filename}")
-                    processed_count += 1
-                    
+                    for page_num, page_entry in future.result():
+                        pages[filename][page_num] = page_entry
+                    if remaining[filename]:
+                        continue
+                    pages_dict = {str(page_num): pages[filename][page_num] for page_num in sorted(pages[filename])}
+                    self.save_document(filename, self.build_document(filename, pages_dict), hashes[filename])
+                    print(f"Successfully processed: {filename} ({len(pages_dict)} pages in {time.perf_counter() - started_at[filename]:.2f}s)")
+                    summary["processed"].append(filename)
                 except Exception as e:
                     print(f"Error processing {filename}: {str(e)}")
-                    error_count += 1
+                    failed.add(filename)
+                    summary["errors"].append(filename)
+                    pages.pop(filename, None)
+                finally:
+                    if not remaining[filename]:
+                        pages.pop(filename, None)
 
+    def _print_summary(self, summary: Dict[str, List[str]]):
         print(f"\nProcessing complete!")
-        print(f"Successfully processed: {processed_count} documents")
-        print(f"Errors encountered: {error_count} documents")
+        print(f"Successfully processed: {len(summary['processed'])} documents")
+        print(f"Skipped (unchanged): {len(summary['skipped'])} documents")
+        print(f"Errors encountered: {len(summary['errors'])} documents")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Parse PDFs from received/ into JSON in parsed/")
+    parser.add_argument("--base-folder", default=os.path.dirname(os.path.abspath(__file__)),
+                        help="Folder holding received/, parsed/ and completed/ (defaults to this directory)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes; 1 parses serially")
+    parser.add_argument("--pages-per-task", type=int, default=PAGES_PER_TASK,
+                        help="Pages per process pool task for long documents")
+    args = parser.parse_args()
+
+    processor = DocumentProcessor(args.base_folder)
+    started = time.perf_counter()
+    processor.process_all_documents(workers=args.workers, pages_per_task=args.pages_per_task)
+    print(f"Total time: {time.perf_counter() - started:.2f}s")
+    return 0
+
 
 if __name__ == "__main__":
-    processor = DocumentProcessor()
-    processor.process_all_documents() 
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""
+Question/answer pairs extracted from parsed FAQ documents.
+
+FAQ PDFs parse into <heading>N. Question ?</heading><section>answer…</section>
+pairs. At ingest DocumentProcessor records every pair in faq_index.json:
+
+    {"documents": {"VOOMA_CUSTOMER_FAQS.jsonl": [
+        {"question": "What is VOOMA?", "normalized": "what is vooma", "answer": "...",
+         "page": "1", "document": "VOOMA_CUSTOMER_FAQS.jsonl", "document_name": "VOOMA_CUSTOMER_FAQS.pdf"}
+    ]}}
+
+Rebuild the index for everything already in parsed/ with:
+
+    python -m backend.document_processing.faq_extractor
+"""
+import os
+import re
+import sys
+import json
+import uuid
+import argparse
+import xml.etree.ElementTree as ET
+from typing import Dict, Any, List
+
+from backend.document_processing.parsed_format import load_parsed_document, is_parsed_document
+from backend.shared_services.file_lock import file_lock
+
+FAQ_INDEX_FILENAME = "faq_index.json"
+
+QUESTION_NUMBER_RE = re.compile(r"^\s*\d+\s*[.)]\s*")
+
+
+def normalize_question(text: str) -> str:
+    """Lowercase words only, with list numbering ("3. ") stripped"""
+    return " ".join(re.findall(r"[a-z0-9]+", QUESTION_NUMBER_RE.sub("", text or "").lower()))
+
+
+def _clean(text: str) -> str:
+    # pdfplumber keeps Symbol-font bullets as the private-use character U+F0B7
+    return " ".join(text.replace("\uf0b7", "-").split())
+
+
+def _display_question(heading: str) -> str:
+    question = _clean(QUESTION_NUMBER_RE.sub("", heading))
+    return re.sub(r"\s+\?$", "?", question)
+
+
+def extract_faq_pairs(document: Dict[str, Any], filename: str) -> List[Dict[str, Any]]:
+    """
+    Every question heading (ending in "?") with the text that follows it up to the
+    next heading. Answers that run onto the next page are joined up.
+    """
+    document_name = document.get("document_name", filename)
+    pairs: List[Dict[str, Any]] = []
+    current = None
+    for page_key, page in document.get("text", {}).items():
+        page_number = str(page.get("page_number", page_key))
+        try:
+            root = ET.fromstring(page.get("page_content", ""))
+        except ET.ParseError:
+            current = None
+            continue
+        for element in root:
+            if element.tag == "heading":
+                heading = element.text or ""
+                current = None
+                if _clean(heading).endswith("?"):
+                    question = _display_question(heading)
+                    current = {
+                        "question": question,
+                        "normalized": normalize_question(question),
+                        "answer_lines": [],
+                        "page": page_number,
+                        "document": filename,
+                        "document_name": document_name,
+                    }
+                    pairs.append(current)
+            elif current is not None:
+                for child in element.iter():
+                    if child is not element and child.text and child.text.strip():
+                        current["answer_lines"].append(_clean(child.text))
+
+    faqs = []
+    for pair in pairs:
+        answer = "\n".join(pair.pop("answer_lines"))
+        if pair["normalized"] and answer:
+            faqs.append({**pair, "answer": answer})
+    return faqs
+
+
+def load_faq_index(path: str) -> Dict[str, List[Dict[str, Any]]]:
+    """parsed filename -> FAQ pairs"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("documents", {})
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable FAQ index {path}: {str(e)}")
+        return {}
+
+
+def _write_faq_index(path: str, documents: Dict[str, List[Dict[str, Any]]]) -> None:
+    temp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump({"documents": documents}, f, indent=2, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+def update_faq_index(path: str, filename: str, faqs: List[Dict[str, Any]], replaces: List[str] = ()) -> None:
+    """Store one document's FAQ pairs, dropping entries for the files it replaces"""
+    with file_lock(path):
+        documents = load_faq_index(path)
+        for old_filename in replaces:
+            documents.pop(old_filename, None)
+        if faqs:
+            documents[filename] = faqs
+        else:
+            documents.pop(filename, None)
+        _write_faq_index(path, documents)
+
+
+def rebuild_faq_index(parsed_folder: str, path: str) -> int:
+    """Re-extract FAQ pairs from every parsed document; returns the number of pairs"""
+    documents = {}
+    for filename in sorted(os.listdir(parsed_folder)):
+        if not is_parsed_document(filename):
+            continue
+        faqs = extract_faq_pairs(load_parsed_document(os.path.join(parsed_folder, filename)), filename)
+        if faqs:
+            documents[filename] = faqs
+        print(f"{filename}: {len(faqs)} FAQ pairs")
+    with file_lock(path):
+        _write_faq_index(path, documents)
+    return sum(len(faqs) for faqs in documents.values())
+
+
+def main() -> int:
+    base_folder = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Rebuild the FAQ index from parsed documents")
+    parser.add_argument("--parsed-folder", default=os.path.join(base_folder, "parsed"))
+    parser.add_argument("--output", default=os.path.join(base_folder, FAQ_INDEX_FILENAME))
+    args = parser.parse_args()
+    print(f"Indexed {rebuild_faq_index(args.parsed_folder, args.output)} FAQ pairs into {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
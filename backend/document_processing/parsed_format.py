@@ -0,0 +1,197 @@
+"""
+Compact parsed-document storage.
+
+A parsed document is stored as JSONL: a header record, then one compact record
+per page. A sidecar offset index maps each page number to its byte range:
+
+    VOOMA_CUSTOMER_FAQS.jsonl       {"type": "document", "document_name": ..., "metadata": ...}
+                                    {"type": "page", "page_number": "1", "page_content": ..., "metadata": ...}
+    VOOMA_CUSTOMER_FAQS.jsonl.idx   {"size": ..., "write_id": ..., "header": [0, 123], "pages": {"1": [123, 2048], ...}}
+
+ParsedDocumentReader memory-maps the JSONL and decodes only the records it is
+asked for. The index carries the JSONL size and a write id stored in the header
+record; a stale or missing index is rebuilt by scanning line offsets.
+
+The app's document corpus chunks every page, so it loads whole documents with
+to_document(); single-page reads (page()) are for tooling and page lookups.
+
+Convert existing pretty-printed JSON files in parsed/ with:
+
+    python -m backend.document_processing.parsed_format --remove-json
+"""
+import os
+import re
+import sys
+import json
+import mmap
+import uuid
+import argparse
+from typing import Dict, Any, List, Tuple, Optional, Iterator
+
+JSONL_SUFFIX = ".jsonl"
+INDEX_SUFFIX = ".jsonl.idx"
+
+SIZE_ATTR_RE = re.compile(r'size="(\d+\.\d{3,})"')
+
+
+def _dumps(record: Dict[str, Any]) -> bytes:
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def write_parsed_document(json_data: Dict[str, Any], jsonl_path: str) -> None:
+    """Write a parsed document (the DocumentProcessor dict) as JSONL plus its offset index"""
+    header = {key: value for key, value in json_data.items() if key != "text"}
+    header["type"] = "document"
+    header["write_id"] = uuid.uuid4().hex
+
+    offsets: Dict[str, List[int]] = {}
+    # Unique temp names: the watcher and upload jobs may write the same document at once
+    temp_path = f"{jsonl_path}.{header['write_id'][:8]}.tmp"
+    with open(temp_path, "wb") as f:
+        line = _dumps(header)
+        f.write(line)
+        header_range = [0, len(line)]
+        position = len(line)
+        for page_key, page in json_data.get("text", {}).items():
+            line = _dumps({"type": "page", **page, "page_number": str(page.get("page_number", page_key))})
+            f.write(line)
+            offsets[str(page.get("page_number", page_key))] = [position, len(line)]
+            position += len(line)
+
+    index_path = jsonl_path[:-len(JSONL_SUFFIX)] + INDEX_SUFFIX
+    index_temp_path = f"{index_path}.{header['write_id'][:8]}.tmp"
+    with open(index_temp_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {"size": position, "write_id": header["write_id"], "header": header_range, "pages": offsets},
+            f, separators=(",", ":")
+        )
+    # The data file goes first; readers reject an index whose size or write id does not match it
+    os.replace(temp_path, jsonl_path)
+    os.replace(index_temp_path, index_path)
+
+
+def scan_offsets(data: bytes) -> Tuple[List[int], Dict[str, List[int]]]:
+    """Rebuild the offset index by walking line boundaries"""
+    header_range, pages, start = None, {}, 0
+    while start < len(data):
+        end = data.find(b"\n", start)
+        end = len(data) if end == -1 else end + 1
+        if header_range is None:
+            header_range = [start, end - start]
+        else:
+            record = json.loads(data[start:end])
+            pages[str(record.get("page_number"))] = [start, end - start]
+        start = end
+    return header_range or [0, 0], pages
+
+
+class ParsedDocumentReader:
+    """Memory-mapped reader for one JSONL parsed document"""
+
+    def __init__(self, jsonl_path: str):
+        self.path = jsonl_path
+        self._file = open(jsonl_path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.header_range, self.offsets = self._load_index(size)
+
+    def _load_index(self, size: int) -> Tuple[List[int], Dict[str, List[int]]]:
+        try:
+            with open(self.path[:-len(JSONL_SUFFIX)] + INDEX_SUFFIX, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            offset, length = index["header"]
+            if index.get("size") == size and index["write_id"].encode() in self._data[offset:offset + length]:
+                return index["header"], index["pages"]
+        except (OSError, ValueError, KeyError):
+            pass
+        return scan_offsets(self._data)
+
+    def _record(self, offset: int, length: int) -> Dict[str, Any]:
+        record = json.loads(self._data[offset:offset + length])
+        record.pop("type", None)
+        record.pop("write_id", None)
+        return record
+
+    def header(self) -> Dict[str, Any]:
+        return self._record(*self.header_range)
+
+    def page_numbers(self) -> List[str]:
+        return list(self.offsets)
+
+    def page(self, page_number) -> Optional[Dict[str, Any]]:
+        """Decode a single page record, or None if the document has no such page"""
+        position = self.offsets.get(str(page_number))
+        return self._record(*position) if position else None
+
+    def pages(self) -> Iterator[Dict[str, Any]]:
+        for offset, length in self.offsets.values():
+            yield self._record(offset, length)
+
+    def to_document(self) -> Dict[str, Any]:
+        """The whole document in the DocumentProcessor dict layout"""
+        document = self.header()
+        document["text"] = {page["page_number"]: page for page in self.pages()}
+        return document
+
+    def close(self) -> None:
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+    def __enter__(self) -> "ParsedDocumentReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def load_parsed_document(path: str) -> Dict[str, Any]:
+    """Load a parsed document stored as JSONL or as legacy pretty-printed JSON"""
+    if path.endswith(JSONL_SUFFIX):
+        with ParsedDocumentReader(path) as reader:
+            return reader.to_document()
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def round_font_sizes(page_content: str) -> str:
+    """Round paragraph size attributes to 2 decimals, as DocumentProcessor now writes them"""
+    return SIZE_ATTR_RE.sub(lambda match: f'size="{round(float(match.group(1)), 2)}"', page_content)
+
+
+def is_parsed_document(filename: str) -> bool:
+    return filename.endswith(JSONL_SUFFIX) or filename.endswith(".json")
+
+
+def convert_directory(parsed_folder: str, remove_json: bool = False) -> List[str]:
+    """Convert every legacy .json document in parsed_folder to JSONL; returns the files written"""
+    converted = []
+    for filename in sorted(os.listdir(parsed_folder)):
+        if not filename.endswith(".json"):
+            continue
+        json_path = os.path.join(parsed_folder, filename)
+        jsonl_path = os.path.splitext(json_path)[0] + JSONL_SUFFIX
+        with open(json_path, "r", encoding="utf-8") as f:
+            json_data = json.load(f)
+        for page in json_data.get("text", {}).values():
+            page["page_content"] = round_font_sizes(page.get("page_content", ""))
+        write_parsed_document(json_data, jsonl_path)
+        before, after = os.path.getsize(json_path), os.path.getsize(jsonl_path)
+        print(f"Converted {filename}: {before} -> {after} bytes ({len(json_data.get('text', {}))} pages)")
+        if remove_json:
+            os.remove(json_path)
+        converted.append(jsonl_path)
+    return converted
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Convert parsed JSON documents to indexed JSONL")
+    parser.add_argument("--parsed-folder", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "parsed"))
+    parser.add_argument("--remove-json", action="store_true", help="Delete each .json file after converting it")
+    args = parser.parse_args()
+    convert_directory(args.parsed_folder, args.remove_json)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Watch-folder ingestion daemon.
+
+Waits for PDFs to land in received/ and runs DocumentProcessor on them. The
+manifest skips files whose content was already parsed and re-parses changed
+ones. Parsed JSON is written atomically into parsed/, where the app's document
+corpus picks it up on its next revalidation and re-reads only the changed files.
+
+Uses inotify when the optional inotify_simple package is installed, otherwise
+polls the folder.
+
+    python -m backend.document_processing.watcher --workers 4
+"""
+import os
+import sys
+import time
+import argparse
+from typing import Dict, Tuple, Optional
+
+from backend.document_processing.document_processor import DocumentProcessor, PAGES_PER_TASK
+
+INGEST_POLL_SECONDS = float(os.getenv("INGEST_POLL_SECONDS", "5"))
+INGEST_SETTLE_SECONDS = float(os.getenv("INGEST_SETTLE_SECONDS", "2"))  # Quiet time before a batch is processed
+
+
+class DocumentWatcher:
+    """Runs ingestion whenever received/ has PDFs whose size and mtime have stopped changing"""
+
+    def __init__(
+        self,
+        processor: DocumentProcessor,
+        workers: int = 1,
+        pages_per_task: int = PAGES_PER_TASK,
+        poll_seconds: float = INGEST_POLL_SECONDS,
+        settle_seconds: float = INGEST_SETTLE_SECONDS
+    ):
+        self.processor = processor
+        self.workers = workers
+        self.pages_per_task = pages_per_task
+        self.poll_seconds = poll_seconds
+        self.settle_seconds = settle_seconds
+        self._inotify = self._open_inotify()
+
+    def _open_inotify(self):
+        try:
+            from inotify_simple import INotify, flags  # Optional dependency
+        except ImportError:
+            print(f"inotify_simple not installed, polling {self.processor.received_folder} every {self.poll_seconds}s")
+            return None
+        inotify = INotify()
+        inotify.add_watch(self.processor.received_folder, flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE)
+        print(f"Watching {self.processor.received_folder} with inotify")
+        return inotify
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        stats = {}
+        for filename in self.processor.pending_documents():
+            try:
+                stat = os.stat(os.path.join(self.processor.received_folder, filename))
+            except FileNotFoundError:
+                continue
+            stats[filename] = (stat.st_size, stat.st_mtime_ns)
+        return stats
+
+    def _wait_for_activity(self) -> None:
+        if self._inotify is not None:
+            self._inotify.read(timeout=int(self.poll_seconds * 1000))
+        else:
+            time.sleep(self.poll_seconds)
+
+    def _wait_until_settled(self) -> Dict[str, Tuple[int, int]]:
+        """Block until received/ stops changing; uploads still being copied are left alone"""
+        previous = self._snapshot()
+        while True:
+            time.sleep(self.settle_seconds)
+            current = self._snapshot()
+            if current == previous:
+                return current
+            previous = current
+
+    def run_once(self) -> Optional[Dict]:
+        """Ingest whatever is waiting; returns the processor summary, or None if nothing was"""
+        if not self.processor.pending_documents():
+            return None
+        self._wait_until_settled()
+        return self.processor.process_all_documents(workers=self.workers, pages_per_task=self.pages_per_task)
+
+    def run_forever(self) -> None:
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Error during ingestion: {str(e)}")
+            self._wait_for_activity()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Ingest PDFs dropped into received/ as they arrive")
+    parser.add_argument("--base-folder", default=os.path.dirname(os.path.abspath(__file__)),
+                        help="Folder holding received/, parsed/ and completed/ (defaults to this directory)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes; 1 parses serially")
+    parser.add_argument("--pages-per-task", type=int, default=PAGES_PER_TASK,
+                        help="Pages per process pool task for long documents")
+    parser.add_argument("--once", action="store_true", help="Ingest what is waiting and exit")
+    args = parser.parse_args()
+
+    watcher = DocumentWatcher(DocumentProcessor(args.base_folder), args.workers, args.pages_per_task)
+    if args.once:
+        watcher.run_once()
+        return 0
+    try:
+        watcher.run_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
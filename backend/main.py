@@ -1,9 +1,10 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import Dict, Any, Optional
 from datetime import datetime, timezone, timedelta
+import os
 import json
 import uuid
 import asyncio
@@ -14,13 +15,28 @@ import requests
 import gradio as gr
 
 from backend.shared_services.get_conversation_history import get_conversation_history, get_user_past_history
-from backend.shared_services.save_conversation import save_conversation
+from backend.shared_services.conversation_writer import conversation_writer, enqueue_conversation
+from backend.shared_services.db import init_db_pool, close_db_pool, get_pool_stats, acquire_connection
+from backend.shared_services.migrations import run_migrations, check_schema_version
+from backend.shared_services.session_store import create_session_store, run_expiry_loop
+from backend.shared_services.history_cache import history_cache, MAX_MEMORY_RECORDS
+from backend.shared_services.loop_monitor import loop_monitor, start_loop_monitor
+from backend.shared_services.llm_cache import llm_response_cache
+from backend.shared_services.agent_schemas import get_structured_output_stats
+from backend.shared_services.semantic_cache import semantic_cache, answer_from_semantic_cache, remember_answer
+from backend.shared_services.document_corpus import document_corpus
+from backend.shared_services.bm25_index import document_retriever
+from backend.shared_services.dense_index import dense_retriever
+from backend.shared_services.faq_index import faq_index, answer_from_faq
+from backend.shared_services.ingestion_jobs import ingestion_jobs, UploadRejected
 from backend.shared_services.logger_setup import setup_logger
 from backend.shared_services.shared_types import MainState
 from backend.shared_services.websocket_manager import register_connection, remove_connection
 from backend.shared_services.handoffs import handoff_to_welcome_user
 
 from backend.agents.welcome_user import welcome_user
+from backend.agents.fast_router import fast_router, fast_route
+from backend.agents.one_shot import one_shot_answerer, answer_in_one_shot
 from backend.agents.answer_user import answer_user
 from backend.agents.respond_to_human import respond_to_human
 
@@ -40,6 +56,10 @@ logger = logging.getLogger(__name__)
 
 app = FastAPI(debug=True)  # Enable debug mode
 
+# Apply pending schema migrations when the app boots (otherwise run backend.shared_services.migrations;
+# startup fails if any are still pending)
+RUN_MIGRATIONS_ON_STARTUP = os.getenv("RUN_MIGRATIONS_ON_STARTUP", "false").lower() == "true"
+
 # Add CORS middleware with more permissive settings for development
 app.add_middleware(
     CORSMiddleware,
@@ -49,6 +69,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def startup():
+    """Open the shared database pool and start background workers for the app lifetime"""
+    global session_expiry_task
+    start_loop_monitor()
+    await init_db_pool()
+    async with acquire_connection() as conn:
+        if RUN_MIGRATIONS_ON_STARTUP:
+            await run_migrations(conn)
+        # History and session reads use the generated columns and tables added by migrations
+        await check_schema_version(conn)
+    await conversation_writer.start()
+    # Load the parsed corpus off the event loop; later reloads run in a background thread
+    await asyncio.to_thread(document_corpus.refresh)
+    await ingestion_jobs.start(notify=manager.send_message)
+    try:
+        await fast_router.train_from_history()
+    except Exception as e:
+        logger.error(f"Fast router classifier not trained: {str(e)}")
+    session_expiry_task = asyncio.create_task(run_expiry_loop(session_store))
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop background workers, flush queued conversations, then release pooled database connections"""
+    if session_expiry_task is not None:
+        session_expiry_task.cancel()
+    await session_store.close()
+    await conversation_writer.stop()
+    await ingestion_jobs.stop()
+    await close_db_pool()
+    await loop_monitor.stop()
+
 # Store active websocket connections
 class ConnectionManager:
     def __init__(self):
@@ -98,6 +150,7 @@ class ChatRequest(BaseModel):
     user_input: str
     session_id: str
     conversation_id: Optional[str] = None
+    stream: bool = False
 
 class ChatInput(BaseModel):
     user_id: str
@@ -112,84 +165,51 @@ class ChatResponse(BaseModel):
     error: Optional[str] = None
     is_new_session: bool  # Indicate if this was a new session
 
-# Session management constants
-SESSION_EXPIRY = timedelta(hours=24)  # Sessions expire after 24 hours
-SESSION_CLEANUP_FREQUENCY = 100  # Clean up expired sessions every N requests
-
-# In-memory session store (consider Redis for production)
-active_sessions: Dict[str, Dict[str, Any]] = {}
-request_counter = 0
-
-# Add these constants at the top
-MAX_MEMORY_RECORDS = 10  # Maximum records to keep in memory per user
-MEMORY_THRESHOLD = 7     # When to fetch more from DB
+# Session store (SESSION_STORE=memory|redis); TTL expiry runs as a background task
+session_store = create_session_store()
+session_expiry_task: Optional[asyncio.Task] = None
 
 def generate_session_id() -> str:
     """Generate a new session ID"""
     return str(uuid.uuid4())
 
-async def cleanup_expired_sessions():
-    """Remove expired sessions from memory"""
-    current_time = datetime.now(timezone.utc)
-    expired = [
-        session_id for session_id, session in active_sessions.items()
-        if current_time - session["last_active"] > SESSION_EXPIRY
-    ]
-    for session_id in expired:
-        # Save state to DB before removing session
-        if session_id in active_sessions:
-            await save_conversation(active_sessions[session_id]["state"])
-            del active_sessions[session_id]
-            logger.info(f"Session {session_id} expired and saved to database")
-
 async def get_or_create_session(chat_input: ChatInput) -> tuple[str, bool]:
     """Get existing session or create new one"""
-    global request_counter
-    
-    # Periodic cleanup of expired sessions
-    request_counter += 1
-    if request_counter % SESSION_CLEANUP_FREQUENCY == 0:
-        await cleanup_expired_sessions()
-    
-    # If session_id provided and valid, use it
-    if chat_input.session_id and chat_input.session_id in active_sessions:
-        session = active_sessions[chat_input.session_id]
-        # Check if session is expired
-        if datetime.now(timezone.utc) - session["last_active"] > SESSION_EXPIRY:
-            # Session expired, create new one
-            new_session_id = generate_session_id()
-            return new_session_id, True
-        else:
-            # Update last active time
-            session["last_active"] = datetime.now(timezone.utc)
+    # If session_id provided and still live in the store, use it
+    if chat_input.session_id:
+        session = await session_store.get(chat_input.session_id)
+        if session is not None:
+            # Update last active time (also refreshes the TTL)
+            session["last_active"] = datetime.now(timezone.utc).isoformat()
+            await session_store.set(chat_input.session_id, session)
             return chat_input.session_id, False
             
     # Create new session
     new_session_id = generate_session_id()
     return new_session_id, True
 
+async def remember_session(state: MainState) -> None:
+    """Write the session's working state back to the store after a turn"""
+    await session_store.set(state["session_id"], {
+        "user_id": state["user_id"],
+        "last_active": datetime.now(timezone.utc).isoformat(),
+        "conversation_history": state.get("conversation_history", [])[-MAX_MEMORY_RECORDS:],
+    })
+
 async def initialize_state(request: ChatRequest) -> MainState:
     """Initialize the state object for the chat flow"""
     # Generate conversation_id for this turn
     conversation_id = f"{request.user_id}_{request.session_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
     
-    conversation_history = []
     node_history = []
     
-    # Check memory records first
-    memory_records = active_sessions.get(request.session_id, {}).get("conversation_history", [])
-    
-    # If memory records below threshold, fetch from DB
-    if len(memory_records) < MEMORY_THRESHOLD:
-        records_needed = MAX_MEMORY_RECORDS - len(memory_records)
-        history = get_conversation_history(
-            user_id=request.user_id,
-            limit=records_needed
-        )
-        conversation_history = memory_records + history.get("conversation_history", [])
-        conversation_history = conversation_history[-MAX_MEMORY_RECORDS:]
-    else:
-        conversation_history = memory_records[-MAX_MEMORY_RECORDS:]
+    async def load_from_db(limit: int) -> list:
+        history = await get_conversation_history(user_id=request.user_id, limit=limit)
+        return history.get("conversation_history", [])
+
+    # Ring buffer first, then the session store, and the DB only on a cold miss
+    session = await session_store.get(request.session_id)
+    conversation_history = await history_cache.get_history(request.session_id, session, load_from_db)
     
     logger.info(f"Starting conversation {conversation_id} for user {request.user_id}")
 
@@ -199,9 +219,14 @@ async def initialize_state(request: ChatRequest) -> MainState:
         "conversation_id": conversation_id,
         "user_input": request.user_input,
         "conversation_history": conversation_history,
+        # Messages before this offset were loaded from storage; only later ones are new this turn
+        "history_offset": len(conversation_history),
+        "turn_started_at": datetime.now(timezone.utc).isoformat(),
         "node_history": node_history,
         "handoff_parameters": [],
         "extracted_parameters": {},
+        # Stream answer_user's reply over the session WebSocket as it is generated
+        "stream": request.stream,
     }
     
     # Add websocket manager separately
@@ -221,7 +246,16 @@ async def run_chat_flow(state: MainState) -> MainState:
         max_steps = 200000000  # Prevent infinite loops
         steps_taken = 0
         
-        state = await welcome_user(state)
+        # Reuse a stored answer for an equivalent question, answer FAQ questions from the
+        # FAQ index, settle clear-cut turns locally, try a single route-and-answer call
+        # (ONE_SHOT_MODE), and only then start the agent chain
+        if (
+            not answer_from_semantic_cache(state)
+            and not await asyncio.to_thread(answer_from_faq, state)
+            and not fast_route(state)
+            and not await answer_in_one_shot(state)
+        ):
+            state = await welcome_user(state)
         
         while steps_taken < max_steps:
             steps_taken += 1
@@ -266,7 +300,10 @@ async def run_chat_flow(state: MainState) -> MainState:
                     elif agent_name == "respond_to_human":
                         logger.info(f"Final step: Responding to human for conversation {state['conversation_id']}")
                         state = await respond_to_human(state)
-                        await save_conversation(state)
+                        # Persist in the background so DB latency isn't added to the reply
+                        await enqueue_conversation(state)
+                        await remember_session(state)
+                        remember_answer(state)
                         logger.info(f"Conversation {state['conversation_id']} completed")
                         return state
                     else:
@@ -287,7 +324,7 @@ async def run_chat_flow(state: MainState) -> MainState:
             logger.warning(f"Max steps reached, ending conversation {state['conversation_id']}")
             # Add error message to state
             state["final_answer"] = "I apologize, but I've taken too many steps to process your request. Please try rephrasing your question in a simpler way."
-            await save_conversation(state)
+            await enqueue_conversation(state)
             
         return state
 
@@ -315,7 +352,8 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                     chat_request = ChatRequest(
                         user_id=message_data['user_id'],
                         user_input=message_data['user_input'],
-                        session_id=message_data['session_id']
+                        session_id=message_data['session_id'],
+                        stream=message_data.get('stream', False)
                     )
                     
                     # Initialize state and run chat flow
@@ -398,7 +436,67 @@ async def chat(request: ChatRequest):
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "connections": len(manager.active_connections)}
+    return {
+        "status": "healthy",
+        "connections": len(manager.active_connections),
+        "db_pool": get_pool_stats()
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Internal service metrics"""
+    return {
+        "db_pool": get_pool_stats(),
+        "conversation_writer": conversation_writer.get_stats(),
+        "session_store": session_store.get_stats(),
+        "history_cache": history_cache.get_stats(),
+        "llm_cache": llm_response_cache.get_stats(),
+        "semantic_cache": semantic_cache.get_stats(),
+        "structured_output": get_structured_output_stats(),
+        "faq": faq_index.get_stats(),
+        "fast_router": fast_router.get_stats(),
+        "one_shot": one_shot_answerer.get_stats(),
+        "document_corpus": document_corpus.get_stats(),
+        "retrieval": document_retriever.get_stats(),
+        "dense_retrieval": dense_retriever.get_stats(),
+        "ingestion": ingestion_jobs.get_stats()
+    }
+
+@app.get("/metrics/loop")
+async def loop_metrics(reset: bool = False):
+    """Event loop lag and blocking call sites ranked by stall time (LOOP_MONITOR=on|audit)"""
+    stats = loop_monitor.get_stats()
+    if reset:
+        loop_monitor.reset()
+    return stats
+
+@app.post("/api/documents")
+async def upload_document(request: Request, filename: str, session_id: Optional[str] = None):
+    """
+    Upload a PDF as the raw request body (Content-Type: application/pdf) and queue it
+    for ingestion. Progress is sent to session_id's WebSocket and /api/documents/jobs/{job_id}.
+    """
+    try:
+        job = await ingestion_jobs.receive_upload(request.stream(), filename, session_id)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    return JSONResponse(status_code=202, content=job)
+
+@app.get("/api/documents/jobs")
+async def list_ingestion_jobs():
+    """Recent ingestion jobs from every worker, newest first"""
+    return JSONResponse(content=await ingestion_jobs.list_jobs())
+
+@app.get("/api/documents/jobs/{job_id}")
+async def get_ingestion_job(job_id: str):
+    """Status and progress of one ingestion job"""
+    job = await ingestion_jobs.get_job(job_id)
+    if job:
+        return JSONResponse(content=job)
+    return JSONResponse(
+        content={"error": "Job not found"},
+        status_code=404
+    )
 
 @app.get("/")
 async def read_root():
@@ -408,12 +506,11 @@ async def read_root():
 async def end_session(session_id: str):
     """Endpoint for when user explicitly ends session (new chat button)"""
     try:
-        if session_id in active_sessions:
-            # Save final state to DB
-            await save_conversation(active_sessions[session_id]["state"])
-            # Clean up session
-            del active_sessions[session_id]
-            logger.info(f"Session {session_id} ended by user and saved to database")
+        if await session_store.get(session_id) is not None:
+            # Every turn is already persisted, so just drop the working state
+            await session_store.delete(session_id)
+            history_cache.forget(session_id)
+            logger.info(f"Session {session_id} ended by user")
             return {"status": "success", "message": "Session ended"}
         return {"status": "not_found", "message": "Session not found"}
     except Exception as e:
@@ -421,15 +518,20 @@ async def end_session(session_id: str):
         return {"status": "error", "message": str(e)}
 
 @app.get("/api/chat-sessions")
-async def get_user_chat_sessions(user_id: str = "test_user"):
-    """Get all chat sessions for a user"""
-    sessions = get_chat_sessions(user_id)
-    return JSONResponse(content={"sessions": sessions})
+async def get_user_chat_sessions(
+    user_id: str = "test_user",
+    before: Optional[datetime] = None,
+    before_session_id: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=200)
+):
+    """Get a page of chat sessions for a user, newest first (keyset pagination on last_updated, session_id)"""
+    page = await get_chat_sessions(user_id, limit=limit, before=before, before_session_id=before_session_id)
+    return JSONResponse(content=page)
 
 @app.get("/api/chat-sessions/{session_id}")
 async def get_chat_session(session_id: str):
     """Get a specific chat session"""
-    session = get_session_by_id(session_id)
+    session = await get_session_by_id(session_id)
     if session:
         return JSONResponse(content=session)
     return JSONResponse(
@@ -1,83 +1,116 @@
 from datetime import datetime, timezone
-from typing import Dict, Any, List
-from backend.shared_services.db import get_postgres_connection
+from typing import Dict, Any, List, Optional
+from backend.shared_services.db import acquire_connection
 from backend.shared_services.logger_setup import setup_logger
-from psycopg2.extras import RealDictCursor
+from backend.shared_services.message_store import reads_normalized, message_from_row
 
 logger = setup_logger()
 
-def get_chat_sessions(user_id: str, limit: int = 100) -> List[Dict[str, Any]]:
-    """Get chat sessions grouped by session_id from existing state data"""
-    conn = get_postgres_connection("conversations")
+CHAT_SESSIONS_SQL = """
+    SELECT session_id, first_message, created_at, last_updated, message_count
+    FROM andika.andika_chat_sessions
+    WHERE user_id = $1
+        AND ($2::timestamptz IS NULL OR (last_updated, session_id) < ($2, COALESCE($3::text, '')))
+    ORDER BY last_updated DESC, session_id DESC
+    LIMIT $4;
+"""
+
+# The latest snapshot of a session holds its full conversation_history
+SESSION_SNAPSHOT_SQL = """
+    SELECT
+        state_session_id as session_id,
+        state->'conversation_history' as messages,
+        MIN(log_timestamp) OVER () as created_at,
+        MAX(log_timestamp) OVER () as last_updated
+    FROM andika.andika_conversations
+    WHERE state_session_id = $1
+    ORDER BY log_timestamp DESC
+    LIMIT 1;
+"""
+
+SESSION_MESSAGES_SQL = """
+    SELECT message_id, role, content, sources, follow_up_questions, created_at
+    FROM andika.andika_messages
+    WHERE session_id = $1
+    ORDER BY created_at;
+"""
+
+async def get_chat_sessions(
+    user_id: str,
+    limit: int = 100,
+    before: Optional[datetime] = None,
+    before_session_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Get a page of chat sessions for the sidebar, most recently updated first.
+    Pages are keyed on (last_updated, session_id), so sessions updated at the same instant
+    are not skipped: pass the returned next_before's fields to fetch the next page.
+    """
     try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            query = """
-                SELECT DISTINCT ON (state->>'session_id')
-                    state->>'session_id' as session_id,
-                    state->'conversation_history' as messages,
-                    MIN(log_timestamp) OVER (PARTITION BY state->>'session_id') as created_at,
-                    MAX(log_timestamp) OVER (PARTITION BY state->>'session_id') as last_updated,
-                    (
-                        SELECT content 
-                        FROM jsonb_array_elements(state->'conversation_history') msgs
-                        WHERE msgs->>'role' = 'user'
-                        LIMIT 1
-                    ) as first_message
-                FROM andika.andika_conversations 
-                WHERE user_id = %s
-                    AND state->>'session_id' IS NOT NULL
-                    AND state->'conversation_history' IS NOT NULL
-                    AND jsonb_array_length(state->'conversation_history') > 0
-                ORDER BY state->>'session_id', log_timestamp DESC
-                LIMIT %s;
-            """
-            cur.execute(query, (user_id, limit))
-            results = cur.fetchall()
+        async with acquire_connection() as conn:
+            results = await conn.fetch(CHAT_SESSIONS_SQL, user_id, before, before_session_id, limit)
+
+        sessions = [{
+            'id': str(row['session_id']),
+            'first_message': row['first_message'],
+            'message_count': row['message_count'],
+            'timestamp': row['created_at'].isoformat(),
+            'last_updated': row['last_updated'].isoformat()
+        } for row in results]
+
+        return {
+            "sessions": sessions,
+            "next_before": {
+                "last_updated": sessions[-1]['last_updated'],
+                "session_id": sessions[-1]['id']
+            } if len(sessions) == limit else None
+        }
             
-            return [{
-                'id': str(row['session_id']),
-                'first_message': row['first_message'],
+    except Exception as e:
+        logger.error(f"Error retrieving chat sessions: {str(e)}")
+        return {"sessions": [], "next_before": None}
+
+async def get_session_by_id(session_id: str) -> Dict[str, Any]:
+    """Get a specific chat session by session_id"""
+    if reads_normalized():
+        return await _get_normalized_session(session_id)
+
+    try:
+        async with acquire_connection() as conn:
+            row = await conn.fetchrow(SESSION_SNAPSHOT_SQL, session_id)
+        
+        if row and row['messages']:
+            first_message = next((msg['content'] for msg in row['messages'] if msg['role'] == 'user'), None)
+            return {
+                'id': row['session_id'],
+                'first_message': first_message,
                 'messages': row['messages'],
                 'timestamp': row['created_at'].isoformat(),
                 'last_updated': row['last_updated'].isoformat()
-            } for row in results]
-            
+            }
+        return None
     except Exception as e:
-        logger.error(f"Error retrieving chat sessions: {str(e)}")
-        return []
-    finally:
-        conn.close()
+        logger.error(f"Error retrieving chat session: {str(e)}")
+        return None
 
-def get_session_by_id(session_id: str) -> Dict[str, Any]:
-    """Get a specific chat session by session_id"""
-    conn = get_postgres_connection("conversations")
+async def _get_normalized_session(session_id: str) -> Dict[str, Any]:
+    """Get a specific chat session's messages, oldest first, from the normalized message table"""
     try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            query = """
-                SELECT 
-                    state->>'session_id' as session_id,
-                    state->'conversation_history' as messages,
-                    MIN(log_timestamp) as created_at,
-                    MAX(log_timestamp) as last_updated
-                FROM andika.andika_conversations 
-                WHERE state->>'session_id' = %s
-                GROUP BY state->>'session_id', state->'conversation_history';
-            """
-            cur.execute(query, (session_id,))
-            row = cur.fetchone()
-            
-            if row and row['messages']:
-                first_message = next((msg['content'] for msg in row['messages'] if msg['role'] == 'user'), None)
-                return {
-                    'id': row['session_id'],
-                    'first_message': first_message,
-                    'messages': row['messages'],
-                    'timestamp': row['created_at'].isoformat(),
-                    'last_updated': row['last_updated'].isoformat()
-                }
+        async with acquire_connection() as conn:
+            rows = await conn.fetch(SESSION_MESSAGES_SQL, session_id)
+
+        if not rows:
             return None
+
+        messages = [message_from_row(row) for row in rows]
+        first_message = next((msg['content'] for msg in messages if msg['role'] == 'user'), None)
+        return {
+            'id': session_id,
+            'first_message': first_message,
+            'messages': messages,
+            'timestamp': messages[0]['timestamp'],
+            'last_updated': messages[-1]['timestamp']
+        }
     except Exception as e:
         logger.error(f"Error retrieving chat session: {str(e)}")
         return None
-    finally:
-        conn.close() 
\ No newline at end of file
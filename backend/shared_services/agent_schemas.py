@@ -0,0 +1,206 @@
+import json
+from typing import Any, Dict, List, Literal, Optional, Sequence, Tuple, Type, get_args
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field, ValidationError, model_validator
+from backend.shared_services.llm import call_llm_api, DEFAULT_MODEL, DEFAULT_TEMPERATURE
+from backend.shared_services.llm_cache import llm_response_cache, make_cache_key
+from backend.shared_services.extract_and_parse_json import extract_and_parse_json
+from backend.shared_services.logger_setup import setup_logger
+
+logger = setup_logger()
+
+
+class RespondToHumanParameters(BaseModel):
+    """Parameters respond_to_human needs to deliver a reply"""
+    model_config = ConfigDict(extra="allow")
+
+    message_to_user: str = Field(min_length=1)
+    sources: List[str] = Field(default_factory=list)
+    follow_up_questions: List[str] = Field(default_factory=list)
+    requires_clarification: bool = False
+
+
+class ToolCall(BaseModel):
+    tool: Literal["extract_docs_tool", "tavily_tool"]
+    parameters: Dict[str, Any] = Field(default_factory=dict)
+
+
+class ToolCallEnvelope(BaseModel):
+    """{"response_type": "tool_call", "tools": [...]}"""
+    response_type: Literal["tool_call"]
+    tools: List[ToolCall] = Field(min_length=1)
+
+
+class AgentHandoff(BaseModel):
+    # The agent prompts ask for "agent"; handoff code reads "agent_name"
+    agent_name: Literal["welcome_user", "answer_user", "respond_to_human"] = Field(
+        validation_alias=AliasChoices("agent_name", "agent")
+    )
+    parameters: Dict[str, Any] = Field(default_factory=dict)
+
+    @model_validator(mode="after")
+    def check_reply_parameters(self):
+        if self.agent_name == "respond_to_human":
+            self.parameters = RespondToHumanParameters.model_validate(self.parameters).model_dump()
+        return self
+
+
+class HandoffEnvelope(BaseModel):
+    """{"response_type": "handoff", "agents": [...]}"""
+    response_type: Literal["handoff"]
+    agents: List[AgentHandoff] = Field(min_length=1)
+
+
+class DeclineEnvelope(BaseModel):
+    """{"response_type": "decline", "reason": "..."} - the one-shot answerer passing to the agent chain"""
+    response_type: Literal["decline"]
+    reason: str = ""
+
+
+# Envelopes each agent may produce
+ROUTER_ENVELOPES = (ToolCallEnvelope, HandoffEnvelope)
+ANSWER_ENVELOPES = (HandoffEnvelope,)
+ONE_SHOT_ENVELOPES = (HandoffEnvelope, DeclineEnvelope)
+
+# Outcome counters; every repaired or re-asked response is a welcome_user fallback avoided
+structured_output_metrics = {"responses": 0, "valid": 0, "repaired": 0, "reasked": 0, "failed": 0}
+
+
+def _as_list(value: Any) -> Any:
+    """LLMs often send a list as a JSON string or a single bare string"""
+    if not isinstance(value, str):
+        return value
+    try:
+        decoded = json.loads(value)
+        if isinstance(decoded, list):
+            return decoded
+    except json.JSONDecodeError:
+        pass
+    return [value] if value.strip() else []
+
+
+def _repair(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Fix the deviations the prompts are known to produce"""
+    if "response_type" not in data and ("agent_name" in data or "agent" in data):
+        data = {"response_type": "handoff", "agents": [data]}
+    data = dict(data)
+    agents = data.get("agents")
+    if isinstance(agents, dict):
+        agents = [agents]
+    if isinstance(agents, list):
+        repaired_agents = []
+        for agent in agents:
+            if isinstance(agent, dict):
+                agent = dict(agent)
+                parameters = agent.get("parameters")
+                if isinstance(parameters, dict):
+                    parameters = dict(parameters)
+                    for field in ("sources", "follow_up_questions"):
+                        if field in parameters:
+                            parameters[field] = _as_list(parameters[field])
+                    agent["parameters"] = parameters
+            repaired_agents.append(agent)
+        data["agents"] = repaired_agents
+    if isinstance(data.get("tools"), dict):
+        data["tools"] = [data["tools"]]
+    return data
+
+
+def _response_type(envelope: Type[BaseModel]) -> str:
+    return get_args(envelope.model_fields["response_type"].annotation)[0]
+
+
+def _validate(data: Any, envelopes: Sequence[Type[BaseModel]]) -> Dict[str, Any]:
+    if not isinstance(data, dict):
+        raise ValueError("response is not a JSON object")
+    response_type = data.get("response_type")
+    for envelope in envelopes:
+        if _response_type(envelope) == response_type:
+            return envelope.model_validate(data).model_dump()
+    expected = [_response_type(envelope) for envelope in envelopes]
+    raise ValueError(f"response_type must be one of {expected}, got {response_type!r}")
+
+
+def parse_agent_response(
+    text: str,
+    envelopes: Sequence[Type[BaseModel]],
+    data: Optional[Any] = None
+) -> Tuple[Optional[Dict[str, Any]], Optional[str], bool]:
+    """
+    Validate an agent's raw LLM output against the allowed envelopes. Pass data
+    when the JSON object was already parsed (e.g. while streaming) to skip re-parsing text.
+
+    Returns (envelope, error, repaired): the validated envelope as a plain dict,
+    or None with a description of what was wrong.
+    """
+    if data is None:
+        data = extract_and_parse_json(text) if text else None
+    if data is None:
+        return None, "the response did not contain a JSON object", False
+    try:
+        return _validate(data, envelopes), None, False
+    except (ValidationError, ValueError):
+        pass
+    try:
+        return _validate(_repair(data), envelopes), None, True
+    except (ValidationError, ValueError) as e:
+        return None, str(e), False
+
+
+async def call_llm_structured(
+    messages: List[Dict[str, Any]],
+    envelopes: Sequence[Type[BaseModel]],
+    cache: bool = False,
+    llm_response: Optional[str] = None,
+    cache_key_messages: Optional[List[Dict[str, Any]]] = None,
+    parsed_response: Optional[Dict[str, Any]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    JSON-mode LLM call whose output is validated against Pydantic envelopes.
+    Invalid output is repaired locally, then re-asked once with the validation
+    error, instead of falling back to handoff_to_welcome_user.
+
+    :param cache: Serve identical requests from the response cache (valid envelopes only)
+    :param llm_response: Validate an already generated (e.g. streamed) response instead of calling the LLM
+    :param parsed_response: The object the incremental parser already built from llm_response, if it completed
+    :param cache_key_messages: Hash these instead of messages for the cache key, leaving out
+        prompt content (ids, timestamps) that does not affect the answer
+    """
+    cache_key = None
+    if cache and llm_response is None:
+        cache_key = make_cache_key(DEFAULT_MODEL, DEFAULT_TEMPERATURE, cache_key_messages or messages, json_mode=True)
+        cached = llm_response_cache.get(cache_key)
+        if cached is not None:
+            return json.loads(cached)
+
+    if llm_response is None:
+        llm_response = await call_llm_api(messages, json_mode=True)
+    structured_output_metrics["responses"] += 1
+
+    parsed, error, repaired = parse_agent_response(llm_response, envelopes, parsed_response)
+    if parsed is not None:
+        structured_output_metrics["repaired" if repaired else "valid"] += 1
+    else:
+        logger.warning(f"Agent response failed validation, asking again: {error}")
+        retry_messages = messages + [
+            {"role": "assistant", "content": llm_response or ""},
+            {"role": "user", "content": f"That reply was not valid: {error}. Reply again with only the corrected JSON object."}
+        ]
+        parsed, error, _ = parse_agent_response(await call_llm_api(retry_messages, json_mode=True), envelopes)
+        if parsed is None:
+            structured_output_metrics["failed"] += 1
+            logger.error(f"Agent response still invalid after retry: {error}")
+            return None
+        structured_output_metrics["reasked"] += 1
+
+    if cache_key:
+        llm_response_cache.put(cache_key, json.dumps(parsed))
+    return parsed
+
+
+def get_structured_output_stats() -> Dict[str, Any]:
+    responses = structured_output_metrics["responses"]
+    return {
+        **structured_output_metrics,
+        "fallbacks_avoided": structured_output_metrics["repaired"] + structured_output_metrics["reasked"],
+        "failure_rate": round(structured_output_metrics["failed"] / responses, 4) if responses else 0.0,
+    }
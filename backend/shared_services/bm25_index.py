@@ -0,0 +1,228 @@
+import os
+import re
+import json
+import math
+import time
+import heapq
+import uuid
+import threading
+from collections import Counter
+from typing import Dict, Any, List, Optional, Iterable
+from backend.shared_services.document_chunks import format_citation
+from backend.shared_services.document_corpus import get_corpus_snapshot, CorpusSnapshot
+from backend.shared_services.file_lock import file_lock
+from backend.shared_services.logger_setup import setup_logger
+
+logger = setup_logger()
+
+# Retrieval configuration (override via environment)
+BM25_INDEX_PATH = os.getenv(
+    "BM25_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "document_processing", "index", "bm25_index.json")
+)
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "5"))
+BM25_K1 = float(os.getenv("BM25_K1", "1.5"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+HEADING_WEIGHT = 2  # Heading terms count this many times; FAQ headings are the questions themselves
+
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from how i if in into is it its me my of on or our so
+that the their there this to was we what when where which who why will with you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in re.findall(r"[a-z0-9]+", text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """Inverted index over document chunks, scored with Okapi BM25"""
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.version: Optional[str] = None
+        self.chunks: List[Dict[str, Any]] = []
+        self.postings: Dict[str, List[List[int]]] = {}  # term -> [[chunk index, term frequency], ...]
+        self.lengths: List[int] = []
+        self.avg_length = 0.0
+
+    @classmethod
+    def build(cls, chunks: List[Dict[str, Any]], version: Optional[str] = None, **params) -> "BM25Index":
+        index = cls(**params)
+        index.version = version
+        index.chunks = chunks
+        for position, chunk in enumerate(chunks):
+            terms = tokenize(chunk["heading"]) * HEADING_WEIGHT + tokenize(chunk["text"])
+            index.lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                index.postings.setdefault(term, []).append([position, frequency])
+        index.avg_length = sum(index.lengths) / len(index.lengths) if index.lengths else 0.0
+        return index
+
+    def updated(self, chunks: List[Dict[str, Any]], affected: Iterable[str], version: Optional[str]) -> "BM25Index":
+        """
+        Index for chunks that reuses this index's postings for every document not in
+        affected, so only added or changed documents are tokenized
+        """
+        affected = set(affected)
+        old_positions = {chunk["chunk_id"]: position for position, chunk in enumerate(self.chunks)}
+        index = BM25Index(self.k1, self.b)
+        index.version = version
+        index.chunks = chunks
+        remap: Dict[int, int] = {}
+        fresh: List[int] = []
+        for position, chunk in enumerate(chunks):
+            old_position = old_positions.get(chunk["chunk_id"]) if chunk["document"] not in affected else None
+            if old_position is None:
+                fresh.append(position)
+                index.lengths.append(0)
+            else:
+                remap[old_position] = position
+                index.lengths.append(self.lengths[old_position])
+
+        for term, postings in self.postings.items():
+            kept = [[remap[position], frequency] for position, frequency in postings if position in remap]
+            if kept:
+                index.postings[term] = kept
+        for position in fresh:
+            terms = tokenize(chunks[position]["heading"]) * HEADING_WEIGHT + tokenize(chunks[position]["text"])
+            index.lengths[position] = len(terms)
+            for term, frequency in Counter(terms).items():
+                index.postings.setdefault(term, []).append([position, frequency])
+        index.avg_length = sum(index.lengths) / len(index.lengths) if index.lengths else 0.0
+        return index
+
+    def idf(self, term: str) -> float:
+        matches = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.chunks) - matches + 0.5) / (matches + 0.5))
+
+    def search(self, query: str, k: int = RETRIEVAL_TOP_K, documents: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Top-k chunks for the query, optionally restricted to the given document files"""
+        allowed = set(documents) if documents else None
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for position, frequency in postings:
+                if allowed is not None and self.chunks[position]["document"] not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[position] / (self.avg_length or 1))
+                scores[position] = scores.get(position, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [
+            {**self.chunks[position], "score": round(score, 4), "citation": format_citation(self.chunks[position])}
+            for position, score in best
+        ]
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump({
+                "version": self.version,
+                "k1": self.k1,
+                "b": self.b,
+                "chunks": self.chunks,
+                "postings": self.postings,
+                "lengths": self.lengths,
+            }, file, ensure_ascii=False)
+        os.replace(temp_path, path)  # Readers never see a half-written index
+
+    @classmethod
+    def load(cls, path: str) -> Optional["BM25Index"]:
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.error(f"Unable to read BM25 index {path}: {str(e)}")
+            return None
+        index = cls(k1=data["k1"], b=data["b"])
+        index.version = data["version"]
+        index.chunks = data["chunks"]
+        index.postings = data["postings"]
+        index.lengths = data["lengths"]
+        index.avg_length = sum(index.lengths) / len(index.lengths) if index.lengths else 0.0
+        return index
+
+
+class DocumentRetriever:
+    """
+    Keeps the BM25 index in step with the parsed corpus: the on-disk index is
+    reused while the corpus version matches, otherwise it is rebuilt and saved.
+    """
+
+    def __init__(self, path: str = BM25_INDEX_PATH):
+        self.path = path
+        self._index: Optional[BM25Index] = None
+        self._lock = threading.Lock()
+        self.metrics = {"searches": 0, "search_ms_total": 0.0, "rebuilds": 0, "incremental_updates": 0}
+
+    def get_index(self) -> BM25Index:
+        snapshot = get_corpus_snapshot()
+        version = snapshot.version
+        with self._lock:
+            if self._index is not None and self._index.version == version:
+                return self._index
+            # Across worker processes: one saves at a time, so no save can fail on another's temp file
+            with file_lock(self.path):
+                self._index = self._load_or_build(snapshot)
+            return self._index
+
+    def _load_or_build(self, snapshot: CorpusSnapshot) -> BM25Index:
+        version = snapshot.version
+        if self._index is not None and self._index.version == snapshot.previous_version:
+            # Only the documents in this reload need re-tokenizing
+            started = time.perf_counter()
+            index = self._index.updated(list(snapshot.chunks), snapshot.changed | snapshot.removed, version)
+            index.save(self.path)
+            self.metrics["incremental_updates"] += 1
+            logger.info(
+                f"Updated BM25 index for {len(snapshot.changed)} changed and {len(snapshot.removed)} removed "
+                f"documents in {(time.perf_counter() - started) * 1000:.0f}ms"
+            )
+            return index
+        index = BM25Index.load(self.path)
+        if index is None or index.version != version:
+            started = time.perf_counter()
+            index = BM25Index.build(list(snapshot.chunks), version)
+            index.save(self.path)
+            self.metrics["rebuilds"] += 1
+            logger.info(
+                f"Built BM25 index: {len(index.chunks)} chunks, {len(index.postings)} terms "
+                f"in {(time.perf_counter() - started) * 1000:.0f}ms"
+            )
+        return index
+
+    def search(self, query: str, k: int = RETRIEVAL_TOP_K, documents: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        index = self.get_index()
+        started = time.perf_counter()
+        results = index.search(query, k, documents)
+        self.metrics["searches"] += 1
+        self.metrics["search_ms_total"] += (time.perf_counter() - started) * 1000
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        searches = self.metrics["searches"]
+        return {
+            "chunks": len(self._index.chunks) if self._index else 0,
+            "terms": len(self._index.postings) if self._index else 0,
+            "version": self._index.version if self._index else None,
+            "searches": searches,
+            "rebuilds": self.metrics["rebuilds"],
+            "incremental_updates": self.metrics["incremental_updates"],
+            "avg_search_ms": round(self.metrics["search_ms_total"] / searches, 3) if searches else 0.0,
+        }
+
+
+# Create a singleton instance
+document_retriever = DocumentRetriever()
+
+
+def search_documents(query: str, k: int = RETRIEVAL_TOP_K, documents: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """Top-k document chunks with citations for a query"""
+    return document_retriever.search(query, k, documents)
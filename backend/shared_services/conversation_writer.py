@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+from backend.shared_services.db import acquire_connection
+from backend.shared_services.message_store import (
+    build_turn_delta, write_turn_deltas, writes_snapshots, writes_normalized
+)
+from backend.shared_services.session_summary import build_session_summary, upsert_session_summaries
+from backend.shared_services.logger_setup import setup_logger
+
+logger = setup_logger()
+
+# Write-behind queue configuration (override via environment)
+WRITE_QUEUE_MAX_SIZE = int(os.getenv("WRITE_QUEUE_MAX_SIZE", "1000"))
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "50"))
+WRITE_FLUSH_INTERVAL = float(os.getenv("WRITE_FLUSH_INTERVAL", "0.5"))
+WRITE_MAX_RETRIES = int(os.getenv("WRITE_MAX_RETRIES", "5"))
+
+
+class ConversationWriteQueue:
+    """
+    In-process write-behind queue for conversation snapshots.
+
+    Turns are enqueued as serialized rows (a full-state snapshot and/or the
+    normalized turn delta, depending on PERSISTENCE_MODE) and flushed by a
+    background worker in batches, either when WRITE_BATCH_SIZE rows are
+    waiting or every WRITE_FLUSH_INTERVAL seconds. The queue is bounded, so producers wait
+    (backpressure) when the database falls behind.
+    """
+
+    def __init__(
+        self,
+        max_size: int = WRITE_QUEUE_MAX_SIZE,
+        batch_size: int = WRITE_BATCH_SIZE,
+        flush_interval: float = WRITE_FLUSH_INTERVAL,
+        max_retries: int = WRITE_MAX_RETRIES
+    ):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.metrics = {
+            "enqueued": 0,
+            "flushed": 0,
+            "dropped": 0,
+            "batches": 0,
+            "flush_errors": 0,
+            "backpressure_waits": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+
+    async def start(self) -> None:
+        """Start the background flush worker"""
+        if self._worker is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._stopping = False
+        self._worker = asyncio.create_task(self._run(), name="conversation-writer")
+        logger.info(
+            f"Conversation write queue started (max_size={self.max_size}, "
+            f"batch_size={self.batch_size}, flush_interval={self.flush_interval}s)"
+        )
+
+    async def stop(self) -> None:
+        """Stop accepting work and flush everything still queued"""
+        if self._worker is None:
+            return
+        self._stopping = True
+        await self._queue.join()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        logger.info(f"Conversation write queue stopped, {self.metrics['flushed']} rows flushed in total")
+
+    async def enqueue(self, state: Dict[str, Any]) -> None:
+        """
+        Snapshot the turn state and queue it for persistence.
+        Waits when the queue is full so memory stays bounded.
+        """
+        if self._queue is None or self._stopping:
+            # Queue not running (scripts, shutdown) - write synchronously instead
+            await self._flush([self._to_row(state)])
+            return
+
+        row = self._to_row(state)
+        if self._queue.full():
+            self.metrics["backpressure_waits"] += 1
+            logger.warning("Conversation write queue full, waiting for the database to catch up")
+        await self._queue.put(row)
+        self.metrics["enqueued"] += 1
+
+    def _to_row(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Serialize the state now so later mutations don't leak into the saved turn"""
+        logged_at = datetime.now(timezone.utc)
+        row = {
+            "conversation_id": state['conversation_id'],
+            "snapshot": None,
+            "turn": None,
+            "messages": [],
+            "summary": build_session_summary(state, logged_at),
+        }
+
+        if writes_snapshots():
+            save_state = state.copy()
+            save_state.pop('websocket_manager', None)  # Remove websocket manager before saving
+            row["snapshot"] = (
+                state['user_id'],
+                state['session_id'],
+                state['conversation_id'],
+                json.dumps(save_state),
+                logged_at
+            )
+
+        if writes_normalized():
+            row["turn"], row["messages"] = build_turn_delta(state, logged_at)
+
+        return row
+
+    async def _run(self) -> None:
+        """Collect rows into batches and flush them on size or time"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._flush_with_retry(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush_with_retry(self, batch: List[Dict[str, Any]]) -> None:
+        """Retry a failed batch with exponential backoff before giving up on it"""
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                await self._flush(batch)
+                return
+            except Exception as e:
+                self.metrics["flush_errors"] += 1
+                logger.error(f"Error flushing {len(batch)} conversations (attempt {attempt}): {str(e)}")
+                if attempt < self.max_retries:
+                    await asyncio.sleep(min(0.5 * 2 ** (attempt - 1), 10))
+
+        self.metrics["dropped"] += len(batch)
+        logger.error(f"Dropped conversations after {self.max_retries} attempts: {[row['conversation_id'] for row in batch]}")
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        """Write a batch with a single multi-row INSERT per table"""
+        started = time.perf_counter()
+        snapshots = [row["snapshot"] for row in batch if row["snapshot"]]
+        turns = [row["turn"] for row in batch if row["turn"]]
+        messages = [message for row in batch for message in row["messages"]]
+
+        async with acquire_connection() as conn:
+            if snapshots:
+                user_ids, session_ids, conversation_ids, states, timestamps = zip(*snapshots)
+                await conn.execute("""
+                    INSERT INTO andika.andika_conversations
+                    (user_id, session_id, conversation_id, state, log_timestamp)
+                    SELECT u, s, c, st::jsonb, ts
+                    FROM unnest($1::text[], $2::text[], $3::text[], $4::text[], $5::timestamptz[])
+                        AS rows(u, s, c, st, ts)
+                """, list(user_ids), list(session_ids), list(conversation_ids), list(states), list(timestamps))
+            if turns:
+                await write_turn_deltas(conn, turns, messages)
+            await upsert_session_summaries(conn, [row["summary"] for row in batch])
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.metrics["flushed"] += len(batch)
+        self.metrics["batches"] += 1
+        self.metrics["last_flush_ms"] = round(elapsed_ms, 2)
+        self.metrics["max_flush_ms"] = round(max(self.metrics["max_flush_ms"], elapsed_ms), 2)
+        self.metrics["total_flush_ms"] += elapsed_ms
+        logger.debug(f"Flushed {len(batch)} conversations in {elapsed_ms:.1f}ms")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth and flush latency for the metrics endpoint"""
+        batches = self.metrics["batches"]
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_size": self.max_size,
+            "running": self._worker is not None,
+            **{key: value for key, value in self.metrics.items() if key != "total_flush_ms"},
+            "avg_flush_ms": round(self.metrics["total_flush_ms"] / batches, 2) if batches else 0.0,
+        }
+
+
+# Create a singleton instance
+conversation_writer = ConversationWriteQueue()
+
+
+async def enqueue_conversation(state: Dict[str, Any]) -> None:
+    """Queue a turn for write-behind persistence"""
+    await conversation_writer.enqueue(state)
@@ -1,9 +1,13 @@
 import os
+import json
+import asyncio
+from contextlib import asynccontextmanager
 
 from typing import List, Dict, Any, Optional, TypedDict, Union
 from dotenv import load_dotenv
 import google.generativeai as genai
 import psycopg2
+import asyncpg
 import requests
 from langchain_core.messages import HumanMessage, AIMessage
 from langgraph.graph import StateGraph, END, START
@@ -17,20 +21,144 @@ from backend.shared_services.logger_setup import setup_logger
 
 logger = setup_logger()
 
+# Pool configuration (override via environment)
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "10"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "30"))
+
+# App-lifetime pool, created in the FastAPI startup hook
+_pool: Optional[asyncpg.Pool] = None
+_waiters = 0
+
+
+def _get_db_settings() -> Dict[str, str]:
+    """Read connection settings from the environment"""
+    return {
+        "host": os.getenv("DB_HOST", "212.56.44.75").strip(),
+        "user": os.getenv("DB_USER", "postgres").strip(),
+        "password": os.getenv("DB_PASSWORD", "Wes@1234").strip(),
+        "port": os.getenv("DB_PORT", "5432").strip(),
+        "database": os.getenv("DB_NAME", "ai_agents").strip(),
+    }
+
+
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    """Decode json/jsonb columns into Python objects on every pooled connection"""
+    for type_name in ("json", "jsonb"):
+        await conn.set_type_codec(
+            type_name,
+            encoder=json.dumps,
+            decoder=json.loads,
+            schema="pg_catalog"
+        )
+
+
+async def init_db_pool() -> asyncpg.Pool:
+    """
+    Create the shared asyncpg pool. Safe to call more than once.
+    """
+    global _pool
+    if _pool is not None:
+        return _pool
+
+    settings = _get_db_settings()
+    try:
+        _pool = await asyncpg.create_pool(
+            host=settings["host"],
+            user=settings["user"],
+            password=settings["password"],
+            port=int(settings["port"]),
+            database=settings["database"],
+            min_size=DB_POOL_MIN_SIZE,
+            max_size=DB_POOL_MAX_SIZE,
+            statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+            command_timeout=DB_COMMAND_TIMEOUT,
+            init=_init_connection
+        )
+        logger.info(
+            f"Database pool ready for {settings['database']} "
+            f"(min={DB_POOL_MIN_SIZE}, max={DB_POOL_MAX_SIZE})"
+        )
+        return _pool
+    except Exception as e:
+        logger.error(f"Unable to create database pool. Error: {e}")
+        raise
+
+
+async def close_db_pool() -> None:
+    """Close the shared pool on application shutdown"""
+    global _pool
+    if _pool is None:
+        return
+    pool, _pool = _pool, None
+    await pool.close()
+    logger.info("Database pool closed")
+
+
+async def get_db_pool() -> asyncpg.Pool:
+    """Return the shared pool, creating it lazily outside of the app (scripts, notebooks)"""
+    if _pool is None:
+        return await init_db_pool()
+    return _pool
+
+
+@asynccontextmanager
+async def acquire_connection(timeout: Optional[float] = None):
+    """
+    Borrow a connection from the shared pool.
+
+    :param timeout: Seconds to wait for a free connection (defaults to DB_POOL_ACQUIRE_TIMEOUT)
+    """
+    global _waiters
+    pool = await get_db_pool()
+    _waiters += 1
+    try:
+        conn = await pool.acquire(timeout=timeout or DB_POOL_ACQUIRE_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.error("Timed out waiting for a database connection")
+        raise
+    finally:
+        _waiters -= 1
+    try:
+        yield conn
+    finally:
+        await pool.release(conn)
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Pool usage for the /health endpoint"""
+    if _pool is None:
+        return {"status": "not_initialized"}
+    size = _pool.get_size()
+    idle = _pool.get_idle_size()
+    return {
+        "status": "ready",
+        "size": size,
+        "in_use": size - idle,
+        "idle": idle,
+        "waiters": _waiters,
+        "min_size": _pool.get_min_size(),
+        "max_size": _pool.get_max_size(),
+    }
+
 
 def get_postgres_connection(table_name: str):
 
     """
-    Establish and return a connection to the PostgreSQL database.
+    Establish and return a standalone (synchronous) connection to the PostgreSQL database.
+    Request handlers should use acquire_connection() instead; this is kept for scripts.
     
     :param table_name: Name of the table to interact with
     :return: Connection object
     """
-    db_host = os.getenv("DB_HOST", "212.56.44.75").strip()
-    db_user = os.getenv("DB_USER", "postgres").strip()
-    db_password = os.getenv("DB_PASSWORD", "Wes@1234").strip()
-    db_port = os.getenv("DB_PORT", "5432").strip()
-    db_name = os.getenv("DB_NAME", "ai_agents").strip()
+    settings = _get_db_settings()
+    db_host = settings["host"]
+    db_user = settings["user"]
+    db_password = settings["password"]
+    db_port = settings["port"]
+    db_name = settings["database"]
 
     try:
         conn = psycopg2.connect(
@@ -0,0 +1,308 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+import numpy as np
+from backend.shared_services.embeddings import get_embedder
+from backend.shared_services.document_chunks import format_citation
+from backend.shared_services.document_corpus import get_corpus_snapshot
+from backend.shared_services.bm25_index import search_documents, RETRIEVAL_TOP_K
+from backend.shared_services.file_lock import file_lock
+from backend.shared_services.logger_setup import setup_logger
+
+logger = setup_logger()
+
+# Dense retrieval configuration (override via environment)
+DENSE_INDEX_DIR = os.getenv(
+    "DENSE_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "document_processing", "index", "dense")
+)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid").strip().lower()            # bm25 | dense | hybrid
+DENSE_INDEX_DTYPE = os.getenv("DENSE_INDEX_DTYPE", "float32").strip().lower()      # float32 | int8
+DENSE_IVF_MIN_CHUNKS = int(os.getenv("DENSE_IVF_MIN_CHUNKS", "100000"))             # partition only large corpora
+DENSE_IVF_NPROBE = int(os.getenv("DENSE_IVF_NPROBE", "8"))
+DENSE_MIN_SCORE = float(os.getenv("DENSE_MIN_SCORE", "0.1"))                        # cosine floor for a dense hit
+SCAN_BLOCK_ROWS = 65536  # Rows dequantized/scored at a time, bounds temporary memory
+RRF_K = 60               # Reciprocal rank fusion constant
+
+
+def _chunk_text(chunk: Dict[str, Any]) -> str:
+    return f"{chunk['heading']}\n{chunk['text']}".strip()
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _quantize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 quantization; returns (codes, scales)"""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def _kmeans(vectors: np.ndarray, clusters: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on a sample of the (unit-length) vectors; returns the centroids"""
+    rng = np.random.default_rng(seed)
+    sample = vectors[rng.choice(len(vectors), size=min(len(vectors), clusters * 256), replace=False)]
+    centroids = sample[rng.choice(len(sample), size=clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        for cluster in range(clusters):
+            members = sample[assignments == cluster]
+            if len(members):
+                centroids[cluster] = members.sum(axis=0)
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+    return centroids
+
+
+class DenseIndex:
+    """
+    Chunk embeddings as one row-major matrix in a .npy file, opened with
+    mmap_mode="r" so every worker process shares the same page-cache copy.
+    Rows are float32 or int8 with a per-row scale. Large corpora are partitioned
+    IVF-style: rows are stored grouped by k-means cluster so a search scans only
+    the clusters nearest the query.
+    """
+
+    def __init__(self, directory: str, meta: Dict[str, Any]):
+        self.directory = directory
+        self.meta = meta
+        self.version: str = meta["version"]
+        self.chunks: List[Dict[str, Any]] = meta["chunks"]
+        mmap_mode = "r" if self.chunks else None  # numpy cannot map a zero-length array
+        self.vectors = np.load(os.path.join(directory, meta["vectors_file"]), mmap_mode=mmap_mode)
+        self.scales = np.load(os.path.join(directory, meta["scales_file"]), mmap_mode=mmap_mode) if meta.get("scales_file") else None
+        self.centroids = np.asarray(meta["centroids"], dtype=np.float32) if meta.get("centroids") else None
+        self.offsets = np.asarray(meta["offsets"], dtype=np.int64) if meta.get("offsets") else None
+        self.documents = np.array([chunk["document"] for chunk in self.chunks])
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["DenseIndex"]:
+        try:
+            with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as file:
+                return cls(directory, json.load(file))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Unable to read dense index {directory}: {str(e)}")
+            return None
+
+    def rows(self, start: int, stop: int) -> np.ndarray:
+        """Rows [start, stop) as float32"""
+        block = np.asarray(self.vectors[start:stop], dtype=np.float32)
+        if self.scales is not None:
+            block *= np.asarray(self.scales[start:stop])[:, None]
+        return block
+
+    def vector_map(self) -> Dict[str, np.ndarray]:
+        """text hash -> stored float32 vector, used to skip re-embedding unchanged chunks"""
+        hashes = self.meta.get("hashes", [])
+        vectors = {}
+        for start in range(0, len(hashes), SCAN_BLOCK_ROWS):
+            block = self.rows(start, start + SCAN_BLOCK_ROWS)
+            for offset, text_hash in enumerate(hashes[start:start + SCAN_BLOCK_ROWS]):
+                vectors[text_hash] = block[offset]
+        return vectors
+
+    def _ranges(self, query_vector: np.ndarray) -> List[Tuple[int, int]]:
+        if self.centroids is None:
+            return [(0, len(self.chunks))]
+        nprobe = min(DENSE_IVF_NPROBE, len(self.centroids))
+        nearest = np.argpartition(-(self.centroids @ query_vector), nprobe - 1)[:nprobe]
+        return [(int(self.offsets[cluster]), int(self.offsets[cluster + 1])) for cluster in nearest]
+
+    def search(self, query_vector: np.ndarray, k: int, documents: Optional[Iterable[str]] = None) -> List[Tuple[int, float]]:
+        """(row, cosine score) pairs for the k nearest chunks"""
+        allowed = np.isin(self.documents, list(documents)) if documents else None
+        positions, scores = [], []
+        for start, stop in self._ranges(query_vector):
+            for block_start in range(start, stop, SCAN_BLOCK_ROWS):
+                block_stop = min(stop, block_start + SCAN_BLOCK_ROWS)
+                block_scores = self.rows(block_start, block_stop) @ query_vector
+                if allowed is not None:
+                    block_scores[~allowed[block_start:block_stop]] = -np.inf
+                positions.append(np.arange(block_start, block_stop))
+                scores.append(block_scores)
+        if not scores:
+            return []
+        positions, scores = np.concatenate(positions), np.concatenate(scores)
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            positions, scores = positions[top], scores[top]
+        order = np.argsort(-scores)
+        return [(int(positions[i]), float(scores[i])) for i in order if np.isfinite(scores[i])]
+
+
+def build_dense_index(
+    directory: str,
+    chunks: List[Dict[str, Any]],
+    version: str,
+    previous: Optional[DenseIndex] = None,
+    dtype: str = DENSE_INDEX_DTYPE
+) -> Tuple[DenseIndex, int]:
+    """
+    Write a new index for chunks, embedding only chunk texts the previous index
+    does not already hold. Returns (index, number of chunks embedded). Callers
+    hold the directory's file lock.
+    """
+    embedder = get_embedder()
+    texts = [_chunk_text(chunk) for chunk in chunks]
+    hashes = [_text_hash(text) for text in texts]
+    known = previous.vector_map() if previous is not None and previous.meta.get("embedder") == embedder.name else {}
+    missing = sorted({text_hash: i for i, text_hash in enumerate(hashes) if text_hash not in known}.values())
+    if missing:
+        for position, vector in zip(missing, embedder.embed([texts[i] for i in missing])):
+            known[hashes[position]] = vector
+
+    vectors = np.stack([known[text_hash] for text_hash in hashes]).astype(np.float32) if chunks else np.zeros((0, embedder.dim), dtype=np.float32)
+
+    centroids, offsets = None, None
+    if len(chunks) >= DENSE_IVF_MIN_CHUNKS:
+        centroids = _kmeans(vectors, clusters=int(np.sqrt(len(chunks))))
+        assignments = np.concatenate([
+            np.argmax(vectors[start:start + SCAN_BLOCK_ROWS] @ centroids.T, axis=1)
+            for start in range(0, len(vectors), SCAN_BLOCK_ROWS)
+        ])
+        order = np.argsort(assignments, kind="stable")
+        vectors, chunks, hashes = vectors[order], [chunks[i] for i in order], [hashes[i] for i in order]
+        offsets = np.searchsorted(assignments[order], np.arange(len(centroids) + 1)).tolist()
+
+    scales = None
+    if dtype == "int8":
+        vectors, scales = _quantize(vectors)
+
+    os.makedirs(directory, exist_ok=True)
+    suffix = f"{version}-{uuid.uuid4().hex[:8]}.npy"
+    vectors_file = f"vectors-{suffix}"
+    scales_file = f"scales-{suffix}" if scales is not None else None
+    np.save(os.path.join(directory, vectors_file), vectors)
+    if scales_file:
+        np.save(os.path.join(directory, scales_file), scales)
+    meta = {
+        "version": version,
+        "embedder": embedder.name,
+        "dim": int(vectors.shape[1]),
+        "dtype": dtype,
+        "vectors_file": vectors_file,
+        "scales_file": scales_file,
+        "centroids": centroids.tolist() if centroids is not None else None,
+        "offsets": offsets,
+        "hashes": hashes,
+        "chunks": chunks,
+    }
+    meta_path = os.path.join(directory, "meta.json")
+    try:
+        with open(meta_path, "r", encoding="utf-8") as file:
+            replaced = json.load(file)
+        replaced_files = {replaced.get("vectors_file"), replaced.get("scales_file")} - {None}
+    except (OSError, ValueError):
+        replaced_files = set()
+    temp_path = os.path.join(directory, f"meta.json.{uuid.uuid4().hex[:8]}.tmp")
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(meta, file, ensure_ascii=False)
+    os.replace(temp_path, meta_path)  # Switches readers to the new vectors file
+
+    # Only the files the replaced meta.json pointed at; workers still mapping them keep their pages until they reload
+    for filename in replaced_files - {vectors_file, scales_file}:
+        try:
+            os.remove(os.path.join(directory, filename))
+        except OSError:
+            pass
+    return DenseIndex(directory, meta), len(missing)
+
+
+class DenseRetriever:
+    """
+    Keeps the memory-mapped dense index in step with the parsed corpus. When the
+    corpus version changes the index is rebuilt, re-embedding only new or changed
+    chunks.
+    """
+
+    def __init__(self, directory: str = DENSE_INDEX_DIR):
+        self.directory = directory
+        self._index: Optional[DenseIndex] = None
+        self._lock = threading.Lock()
+        self.metrics = {"searches": 0, "search_ms_total": 0.0, "rebuilds": 0, "chunks_embedded": 0}
+
+    def get_index(self) -> DenseIndex:
+        snapshot = get_corpus_snapshot()
+        version = snapshot.version
+        with self._lock:
+            if self._index is not None and self._index.version == version:
+                return self._index
+            # Across worker processes: one builds, the others wait and load its result
+            with file_lock(os.path.join(self.directory, "meta.json")):
+                index = DenseIndex.load(self.directory)
+                stale = (
+                    index is None
+                    or index.version != version
+                    or index.meta.get("embedder") != get_embedder().name
+                    or index.meta.get("dtype") != DENSE_INDEX_DTYPE
+                )
+                if stale:
+                    started = time.perf_counter()
+                    index, embedded = build_dense_index(self.directory, list(snapshot.chunks), version, previous=index or self._index)
+                    self.metrics["rebuilds"] += 1
+                    self.metrics["chunks_embedded"] += embedded
+                    logger.info(
+                        f"Built dense index: {len(index.chunks)} chunks ({embedded} embedded), "
+                        f"{index.meta['dtype']}, ivf={'on' if index.centroids is not None else 'off'} "
+                        f"in {(time.perf_counter() - started) * 1000:.0f}ms"
+                    )
+            self._index = index
+            return index
+
+    def search(self, query: str, k: int = RETRIEVAL_TOP_K, documents: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        index = self.get_index()
+        started = time.perf_counter()
+        query_vector = get_embedder().embed([query])[0].astype(np.float32)
+        results = [
+            {**index.chunks[row], "score": round(score, 4), "citation": format_citation(index.chunks[row])}
+            for row, score in index.search(query_vector, k, documents)
+            if score >= DENSE_MIN_SCORE
+        ]
+        self.metrics["searches"] += 1
+        self.metrics["search_ms_total"] += (time.perf_counter() - started) * 1000
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        searches = self.metrics["searches"]
+        index = self._index
+        return {
+            "mode": RETRIEVAL_MODE,
+            "chunks": len(index.chunks) if index else 0,
+            "dtype": index.meta["dtype"] if index else DENSE_INDEX_DTYPE,
+            "ivf_clusters": len(index.centroids) if index is not None and index.centroids is not None else 0,
+            "version": index.version if index else None,
+            **self.metrics,
+            "avg_search_ms": round(self.metrics["search_ms_total"] / searches, 3) if searches else 0.0,
+        }
+
+
+# Create a singleton instance
+dense_retriever = DenseRetriever()
+
+
+def retrieve_documents(query: str, k: int = RETRIEVAL_TOP_K, documents: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Top-k document chunks for a query using RETRIEVAL_MODE. Hybrid mode fuses the
+    BM25 and dense rankings with reciprocal rank fusion.
+    """
+    if RETRIEVAL_MODE == "bm25":
+        return search_documents(query, k, documents)
+    if RETRIEVAL_MODE == "dense":
+        return dense_retriever.search(query, k, documents)
+
+    documents = list(documents) if documents else None
+    fused: Dict[str, Dict[str, Any]] = {}
+    for ranking in (search_documents(query, k * 2, documents), dense_retriever.search(query, k * 2, documents)):
+        for rank, chunk in enumerate(ranking):
+            entry = fused.setdefault(chunk["chunk_id"], {**chunk, "score": 0.0})
+            entry["score"] += 1.0 / (RRF_K + rank + 1)
+    best = sorted(fused.values(), key=lambda chunk: chunk["score"], reverse=True)[:k]
+    return [{**chunk, "score": round(chunk["score"], 6)} for chunk in best]
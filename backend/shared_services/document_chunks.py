@@ -0,0 +1,71 @@
+import os
+import re
+import xml.etree.ElementTree as ET
+from typing import Dict, Any, List, Tuple
+from backend.shared_services.logger_setup import setup_logger
+
+logger = setup_logger()
+
+PARSED_DOCS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "document_processing", "parsed")
+CHUNK_MAX_WORDS = int(os.getenv("CHUNK_MAX_WORDS", "250"))  # Longer sections are split into windows
+
+
+def _clean(text: str) -> str:
+    # pdfplumber keeps Symbol-font bullets as the private-use character U+F0B7
+    return " ".join(text.replace("\uf0b7", "-").split())
+
+
+def page_sections(page_content: str) -> List[Tuple[str, List[str]]]:
+    """
+    Split a DocumentProcessor page (<content> with alternating <heading> and <section>
+    elements) into (heading, lines) pairs. Text before the first heading gets "".
+    """
+    try:
+        root = ET.fromstring(page_content)
+    except ET.ParseError as e:
+        logger.warning(f"Unparseable page XML, indexing it as plain text: {str(e)}")
+        return [("", [_clean(re.sub(r"<[^>]+>", " ", page_content))])]
+
+    sections: List[Tuple[str, List[str]]] = []
+    heading, lines = "", []
+    for element in root:
+        if element.tag == "heading":
+            if lines or heading:
+                sections.append((heading, lines))
+            heading, lines = _clean(element.text or ""), []
+        else:
+            for child in element.iter():
+                if child is not element and child.text and child.text.strip():
+                    lines.append(_clean(child.text))
+    if lines or heading:
+        sections.append((heading, lines))
+    return sections
+
+
+def chunk_document(document: Dict[str, Any], filename: str, max_words: int = CHUNK_MAX_WORDS) -> List[Dict[str, Any]]:
+    """One chunk per heading/section, windowed to max_words, with its citation"""
+    document_name = document.get("document_name", filename)
+    chunks = []
+    for page_key, page in document.get("text", {}).items():
+        page_number = page.get("page_number", page_key)
+        for heading, lines in page_sections(page.get("page_content", "")):
+            words = " ".join(lines).split()
+            windows = [words[i:i + max_words] for i in range(0, len(words), max_words)] or [[]]
+            for window_number, window in enumerate(windows):
+                text = " ".join(window)
+                if not text and not heading:
+                    continue
+                chunks.append({
+                    "chunk_id": f"{filename}:{page_number}:{len(chunks)}",
+                    "document": filename,
+                    "document_name": document_name,
+                    "page": str(page_number),
+                    "heading": heading,
+                    "text": text,
+                    "part": window_number,
+                })
+    return chunks
+
+
+def format_citation(chunk: Dict[str, Any]) -> str:
+    return f"{chunk['document_name']} page {chunk['page']}"
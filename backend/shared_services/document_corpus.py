@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from types import MappingProxyType
+from typing import Dict, Any, Optional, Tuple, Mapping, FrozenSet
+from backend.shared_services.document_chunks import chunk_document, PARSED_DOCS_PATH
+from backend.document_processing.parsed_format import load_parsed_document, is_parsed_document, JSONL_SUFFIX
+from backend.shared_services.logger_setup import setup_logger
+
+logger = setup_logger()
+
+# How often the parsed directory is re-checked for changes (override via environment)
+CORPUS_REVALIDATE_SECONDS = float(os.getenv("CORPUS_REVALIDATE_SECONDS", "2"))
+
+
+def scan_corpus(docs_path: str = PARSED_DOCS_PATH) -> Dict[str, Tuple[int, int]]:
+    """filename -> (size, mtime_ns) for every parsed document; JSONL wins over a legacy JSON of the same name"""
+    try:
+        files = {
+            entry.name: (entry.stat().st_size, entry.stat().st_mtime_ns)
+            for entry in os.scandir(docs_path)
+            if entry.is_file() and is_parsed_document(entry.name)
+        }
+    except FileNotFoundError:
+        return {}
+    return {
+        name: stat for name, stat in files.items()
+        if not (name.endswith(".json") and f"{name[:-len('.json')]}{JSONL_SUFFIX}" in files)
+    }
+
+
+def fingerprint(files: Dict[str, Tuple[int, int]]) -> str:
+    """Corpus version from file names, sizes and mtimes"""
+    return hashlib.sha1(repr(sorted((name, *stat) for name, stat in files.items())).encode("utf-8")).hexdigest()[:16]
+
+
+class CorpusSnapshot:
+    """
+    Read-only view of the parsed corpus at one version: parsed documents by
+    filename and their chunks. A reload builds a new snapshot and swaps it in,
+    so a reader keeps a consistent view for as long as it holds the reference.
+    previous_version, changed and removed describe the reload that produced it,
+    so indexes built for the previous version can update just those documents.
+    """
+
+    __slots__ = (
+        "version", "files", "documents", "chunks_by_document", "chunks", "loaded_at",
+        "previous_version", "changed", "removed"
+    )
+
+    def __init__(
+        self,
+        version: str,
+        files: Dict[str, Tuple[int, int]],
+        documents: Dict[str, Dict[str, Any]],
+        chunks_by_document: Dict[str, Tuple[Dict[str, Any], ...]],
+        previous_version: Optional[str] = None,
+        changed: FrozenSet[str] = frozenset(),
+        removed: FrozenSet[str] = frozenset()
+    ):
+        self.version = version
+        self.files: Mapping[str, Tuple[int, int]] = MappingProxyType(dict(files))
+        self.documents: Mapping[str, Dict[str, Any]] = MappingProxyType(dict(sorted(documents.items())))
+        self.chunks_by_document: Mapping[str, Tuple[Dict[str, Any], ...]] = MappingProxyType(dict(chunks_by_document))
+        self.chunks: Tuple[Dict[str, Any], ...] = tuple(
+            chunk for filename in self.documents for chunk in self.chunks_by_document.get(filename, ())
+        )
+        self.loaded_at = time.time()
+        self.previous_version = previous_version
+        self.changed = changed
+        self.removed = removed
+
+    def pages(self):
+        """(filename, document name, page number, page content) for every page, in file order"""
+        for filename, document in self.documents.items():
+            name = document.get("document_name", filename)
+            for page_key, page in document.get("text", {}).items():
+                yield filename, name, str(page.get("page_number", page_key)), page.get("page_content", "")
+
+
+class DocumentCorpus:
+    """
+    Process-wide cache of the parsed documents. The directory is re-scanned at
+    most every CORPUS_REVALIDATE_SECONDS, in a background thread; only added or
+    changed files are re-read and re-chunked. While it reloads, readers keep
+    getting the previous snapshot instead of waiting.
+    """
+
+    def __init__(self, docs_path: str = PARSED_DOCS_PATH, revalidate_seconds: float = CORPUS_REVALIDATE_SECONDS):
+        self.docs_path = docs_path
+        self.revalidate_seconds = revalidate_seconds
+        self._snapshot: Optional[CorpusSnapshot] = None
+        self._checked_at = 0.0
+        self._reload_lock = threading.Lock()
+        self.metrics = {"reloads": 0, "files_read": 0, "revalidations": 0, "errors": 0}
+
+    def get_snapshot(self) -> CorpusSnapshot:
+        """
+        The current snapshot, without blocking on I/O once one is loaded: when the
+        revalidation interval has passed, the re-scan and reload run in a background
+        thread and callers keep the previous snapshot until it is swapped in
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.refresh()
+        if time.monotonic() - self._checked_at >= self.revalidate_seconds and not self._reload_lock.locked():
+            self._checked_at = time.monotonic()
+            threading.Thread(target=self._revalidate_in_background, name="corpus-revalidate", daemon=True).start()
+        return snapshot
+
+    def refresh(self) -> CorpusSnapshot:
+        """Re-scan now and return the up-to-date snapshot, waiting for a reload in progress"""
+        with self._reload_lock:
+            self._revalidate()
+            return self._snapshot
+
+    def _revalidate_in_background(self) -> None:
+        if not self._reload_lock.acquire(blocking=False):
+            return  # Another thread is already revalidating
+        try:
+            self._revalidate()
+        except Exception as e:
+            self.metrics["errors"] += 1
+            logger.error(f"Error revalidating document corpus: {str(e)}", exc_info=True)
+        finally:
+            self._reload_lock.release()
+
+    def _revalidate(self) -> None:
+        self.metrics["revalidations"] += 1
+        files = scan_corpus(self.docs_path)
+        version = fingerprint(files)
+        if self._snapshot is None or self._snapshot.version != version:
+            self._snapshot = self._load(files, version, self._snapshot)
+        self._checked_at = time.monotonic()
+
+    def _load(self, files: Dict[str, Tuple[int, int]], version: str, previous: Optional[CorpusSnapshot]) -> CorpusSnapshot:
+        started = time.perf_counter()
+        documents, chunks_by_document, changed = {}, {}, set()
+        for filename, stat in files.items():
+            if previous is not None and previous.files.get(filename) == stat and filename in previous.documents:
+                documents[filename] = previous.documents[filename]
+                chunks_by_document[filename] = previous.chunks_by_document[filename]
+                continue
+            try:
+                document = load_parsed_document(os.path.join(self.docs_path, filename))
+                documents[filename] = document
+                chunks_by_document[filename] = tuple(chunk_document(document, filename))
+                changed.add(filename)
+            except (OSError, ValueError) as e:
+                self.metrics["errors"] += 1
+                logger.error(f"Error loading parsed document {filename}: {str(e)}")
+
+        removed = frozenset(previous.documents.keys() - documents.keys()) if previous is not None else frozenset()
+        snapshot = CorpusSnapshot(
+            version, files, documents, chunks_by_document,
+            previous_version=previous.version if previous is not None else None,
+            changed=frozenset(changed),
+            removed=removed
+        )
+        self.metrics["reloads"] += 1
+        self.metrics["files_read"] += len(changed)
+        logger.info(
+            f"Loaded document corpus {version}: {len(documents)} documents ({len(changed)} read, "
+            f"{len(removed)} removed), {len(snapshot.chunks)} chunks in {(time.perf_counter() - started) * 1000:.0f}ms"
+        )
+        return snapshot
+
+    def invalidate(self) -> None:
+        """Re-check the parsed directory on the next read instead of waiting out the interval (see refresh)"""
+        self._checked_at = 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version if snapshot else None,
+            "documents": len(snapshot.documents) if snapshot else 0,
+            "chunks": len(snapshot.chunks) if snapshot else 0,
+            **self.metrics,
+        }
+
+
+# Create a singleton instance
+document_corpus = DocumentCorpus()
+
+
+def get_corpus_snapshot() -> CorpusSnapshot:
+    """The current parsed-document snapshot"""
+    return document_corpus.get_snapshot()
+
+
+def get_corpus_version() -> str:
+    """Fingerprint of the parsed document corpus (names, sizes, mtimes)"""
+    return document_corpus.get_snapshot().version
@@ -0,0 +1,85 @@
+import os
+import re
+import hashlib
+from typing import List
+import numpy as np
+from backend.shared_services.logger_setup import setup_logger
+
+logger = setup_logger()
+
+# Set EMBEDDING_MODEL to a sentence-transformers model name to use it (CPU only);
+# otherwise the dependency-free hashing embedder is used.
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "").strip()
+HASHING_EMBEDDING_DIM = int(os.getenv("HASHING_EMBEDDING_DIM", "1024"))
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class HashingEmbedder:
+    """
+    Deterministic CPU embedder: hashed word unigrams/bigrams and character
+    trigrams, sublinear TF, signed feature hashing, L2-normalized.
+    Captures lexical and spelling-level similarity without any model download.
+    """
+
+    def __init__(self, dim: int = HASHING_EMBEDDING_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text: str) -> List[str]:
+        words = _WORD_RE.findall(text.lower())
+        features = [f"w:{word}" for word in words]
+        features += [f"b:{a}_{b}" for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f"#{word}#"
+            features += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+        return features
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = {}
+            for feature in self._features(text):
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                index = value % self.dim
+                sign = 1.0 if (value >> 63) & 1 else -1.0
+                counts[index] = counts.get(index, 0.0) + sign
+            for index, count in counts.items():
+                vectors[row, index] = np.sign(count) * (1.0 + np.log(abs(count))) if count else 0.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class SentenceTransformerEmbedder:
+    """Wrapper around a local sentence-transformers model pinned to CPU"""
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL):
+        from sentence_transformers import SentenceTransformer  # Optional dependency
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = model_name
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(
+            self.model.encode(texts, normalize_embeddings=True, convert_to_numpy=True),
+            dtype=np.float32
+        )
+
+
+_embedder = None
+
+
+def get_embedder():
+    """Process-wide embedder selected by EMBEDDING_MODEL"""
+    global _embedder
+    if _embedder is None:
+        if EMBEDDING_MODEL:
+            try:
+                _embedder = SentenceTransformerEmbedder(EMBEDDING_MODEL)
+                logger.info(f"Using sentence-transformers embedder {EMBEDDING_MODEL} on CPU")
+            except Exception as e:
+                logger.error(f"Unable to load embedding model {EMBEDDING_MODEL}, using hashing embedder: {str(e)}")
+        if _embedder is None:
+            _embedder = HashingEmbedder()
+    return _embedder
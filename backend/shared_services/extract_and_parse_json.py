@@ -1,49 +1,313 @@
 import json
 import re
+from typing import Any, Callable, Dict, Iterable, List, Optional
 from backend.shared_services.logger_setup import setup_logger
 
 logger = setup_logger()
 
+_WHITESPACE = re.compile(r"\s+")
+_STRING_RUN = re.compile(r'[^"\\]+')
+_LITERAL_RUN = re.compile(r"[A-Za-z0-9+\-.]+")
+_SURROGATES = re.compile("[\ud800-\udfff]")
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+# strict=False accepts raw newlines/tabs inside strings, which LLMs emit freely
+_DECODER = json.JSONDecoder(strict=False)
+
+
+def _join_string(pieces: List[str]) -> str:
+    text = "".join(pieces)
+    if _SURROGATES.search(text):
+        # 😀 style escapes arrive as two code points; combine the pairs
+        text = text.encode("utf-16", "surrogatepass").decode("utf-16", "replace")
+    return text
+
+
+def is_agent_response(value: Any) -> bool:
+    return isinstance(value, dict) and ("response_type" in value or "agent_name" in value)
+
+
+class IncrementalJSONParser:
+    """
+    Single-pass parser for the JSON object in an LLM response, fed chunk by chunk.
+
+    Prose or code fences before the first "{" are skipped and anything after the
+    object closes is ignored. feed() returns events as soon as they are known:
+      {"event": "value", "path": (...), "key": ..., "value": ...}    a scalar completed
+      {"event": "partial", "path": (...), "key": ..., "delta": ...}  more text of a stream_fields string
+      {"event": "done", "value": {...}}                               the object closed
+    Every character is examined once, so parsing is O(n) in the response length.
+    Malformed fragments are skipped and scanning resumes at the next "{".
+    """
+
+    def __init__(
+        self,
+        stream_fields: Iterable[str] = ("message_to_user",),
+        accept: Optional[Callable[[Any], bool]] = None
+    ):
+        """
+        :param stream_fields: String fields whose text is reported while still incomplete
+        :param accept: Optional check on each complete object; rejected objects are skipped
+        """
+        self.stream_fields = set(stream_fields)
+        self.accept = accept
+        self.result: Optional[Dict[str, Any]] = None
+        self.errors = 0
+        self._buffer = ""
+        self._reset()
+
+    @property
+    def done(self) -> bool:
+        return self._state == "done"
+
+    def _reset(self) -> None:
+        self._state = "seek"
+        self._stack: List[Any] = []   # open containers, outermost first
+        self._path: List[Any] = []    # current key/index within each open container
+        self._string: List[str] = []
+        self._string_is_key = False
+        self._streaming = False
+        self._streamed_upto = 0
+        self._literal: List[str] = []
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume the next chunk of the response and return the events it completed"""
+        events: List[Dict[str, Any]] = []
+        if self._state == "done":
+            return events
+        text = self._buffer + chunk if self._buffer else chunk
+        pos = 0
+        length = len(text)
+
+        while pos < length and self._state != "done":
+            state = self._state
+            if state == "seek":
+                index = text.find("{", pos)
+                if index < 0:
+                    pos = length
+                    break
+                pos = index + 1
+                self._open({})
+                continue
+
+            if state == "string":
+                pos = self._read_string(text, pos, events)
+                if self._state == "string":
+                    break  # Chunk ended inside the string, possibly mid-escape
+                continue
+
+            if state == "literal":
+                match = _LITERAL_RUN.match(text, pos)
+                if match:
+                    self._literal.append(match.group())
+                    pos = match.end()
+                    if pos == length:
+                        break  # The literal may continue in the next chunk
+                self._finish_literal(events)
+                continue
+
+            char = text[pos]
+            if char in " \t\r\n":
+                pos = _WHITESPACE.match(text, pos).end()
+                continue
+
+            pos += 1
+            container = self._stack[-1]
+            if state == "value":
+                if char == "{":
+                    self._open({})
+                elif char == "[":
+                    self._open([])
+                elif char == '"':
+                    self._start_string(is_key=False)
+                elif char == "]" and isinstance(container, list) and not container:
+                    self._close(events)
+                elif char in "-0123456789tfn":
+                    self._state = "literal"
+                    self._literal = []
+                    pos -= 1
+                else:
+                    self._fail()
+                    pos -= 1  # Rescan the offending character; it may open the real object
+            elif state == "key":
+                if char == '"':
+                    self._start_string(is_key=True)
+                elif char == "}":
+                    self._close(events)
+                else:
+                    self._fail()
+                    pos -= 1
+            elif state == "colon":
+                if char == ":":
+                    self._state = "value"
+                else:
+                    self._fail()
+                    pos -= 1
+            elif state == "after_value":
+                if char == ",":
+                    if isinstance(container, dict):
+                        self._state = "key"
+                    else:
+                        self._path[-1] += 1
+                        self._state = "value"
+                elif (char == "}" and isinstance(container, dict)) or (char == "]" and isinstance(container, list)):
+                    self._close(events)
+                else:
+                    self._fail()
+                    pos -= 1
+
+        self._buffer = "" if self._state == "done" else text[pos:]
+        return events
+
+    def _open(self, container: Any) -> None:
+        if self._stack:
+            self._assign(container)
+        self._stack.append(container)
+        if isinstance(container, dict):
+            self._path.append(None)
+            self._state = "key"
+        else:
+            self._path.append(0)
+            self._state = "value"
+
+    def _close(self, events: List[Dict[str, Any]]) -> None:
+        container = self._stack.pop()
+        self._path.pop()
+        if self._stack:
+            self._state = "after_value"
+            return
+        if self.accept is not None and not self.accept(container):
+            self._reset()
+            return
+        self.result = container
+        self._state = "done"
+        events.append({"event": "done", "value": container})
+
+    def _assign(self, value: Any) -> None:
+        container = self._stack[-1]
+        if isinstance(container, dict):
+            container[self._path[-1]] = value
+        else:
+            container.append(value)
+
+    def _complete_value(self, value: Any, events: List[Dict[str, Any]]) -> None:
+        self._assign(value)
+        events.append({"event": "value", "path": tuple(self._path), "key": self._path[-1], "value": value})
+        self._state = "after_value"
+
+    def _fail(self) -> None:
+        self.errors += 1
+        self._reset()
+
+    def _start_string(self, is_key: bool) -> None:
+        self._state = "string"
+        self._string = []
+        self._string_is_key = is_key
+        self._streamed_upto = 0
+        self._streaming = (
+            not is_key and isinstance(self._stack[-1], dict) and self._path[-1] in self.stream_fields
+        )
+
+    def _read_string(self, text: str, pos: int, events: List[Dict[str, Any]]) -> int:
+        length = len(text)
+        while pos < length:
+            match = _STRING_RUN.match(text, pos)
+            if match:
+                self._string.append(match.group())
+                pos = match.end()
+                continue
+            if text[pos] == '"':
+                pos += 1
+                value = _join_string(self._string)
+                if self._string_is_key:
+                    self._path[-1] = value
+                    self._state = "colon"
+                else:
+                    if self._streaming:
+                        self._emit_partial(events, final=True)
+                    self._complete_value(value, events)
+                return pos
+            # Backslash escape; wait for the next chunk if it is cut off
+            if pos + 1 >= length:
+                break
+            escape = text[pos + 1]
+            if escape == "u":
+                if pos + 6 > length:
+                    break
+                try:
+                    self._string.append(chr(int(text[pos + 2:pos + 6], 16)))
+                except ValueError:
+                    self._string.append(text[pos + 2:pos + 6])
+                pos += 6
+            else:
+                self._string.append(_ESCAPES.get(escape, escape))
+                pos += 2
+        if self._streaming:
+            self._emit_partial(events, final=False)
+        return pos
+
+    def _emit_partial(self, events: List[Dict[str, Any]], final: bool) -> None:
+        end = len(self._string)
+        # Hold back a trailing high surrogate until its low half arrives
+        if not final and end > self._streamed_upto and "\ud800" <= self._string[-1][-1] <= "\udbff":
+            end -= 1
+        if end <= self._streamed_upto:
+            return
+        delta = _join_string(self._string[self._streamed_upto:end])
+        self._streamed_upto = end
+        if delta:
+            events.append({"event": "partial", "path": tuple(self._path), "key": self._path[-1], "delta": delta})
+
+    def _finish_literal(self, events: List[Dict[str, Any]]) -> None:
+        try:
+            value = json.loads("".join(self._literal))
+        except ValueError:
+            self._fail()
+            return
+        self._complete_value(value, events)
+
+
 def extract_and_parse_json(text):
+    """
+    Parse the JSON object in an LLM response. Handles code fences, prose before or
+    after the object and raw control characters inside strings in linear time.
+    """
     try:
-        # Clean the text of any invalid control characters
-        cleaned_text = ''.join(char for char in text if ord(char) >= 32 or char in '\n\r\t')
-        
+        if not text:
+            logger.error("No valid JSON found in response")
+            return None
+
         # First try to parse the entire text as JSON
         try:
-            return json.loads(cleaned_text)
+            return json.loads(text, strict=False)
         except json.JSONDecodeError:
             pass
 
-        # Look for JSON-like content
-        matches = re.findall(r'({[\s\S]*})', cleaned_text)
-        
-        for match in matches:
-            try:
-                # Further clean the JSON string
-                cleaned_json = re.sub(r'[\x00-\x1F\x7F-\x9F]', '', match)
-                cleaned_json = cleaned_json.replace('\n', '\\n').replace('\r', '\\r')
-                
-                # Try to parse the cleaned JSON
-                parsed_json = json.loads(cleaned_json)
-                
-                # Validate the expected structure
-                if isinstance(parsed_json, dict):
-                    if "response_type" in parsed_json or "agent_name" in parsed_json:
-                        return parsed_json
-                        
-            except json.JSONDecodeError as e:
-                logger.debug(f"Failed to parse JSON match: {e}")
-                continue
-                
+        # Decode from the first brace, ignoring fences and trailing prose
+        start = text.find("{")
+        if start < 0:
+            logger.error("No valid JSON found in response")
+            return None
+        try:
+            parsed_json, _ = _DECODER.raw_decode(text, start)
+            if is_agent_response(parsed_json):
+                return parsed_json
+        except json.JSONDecodeError as e:
+            logger.debug(f"Failed to decode JSON at offset {start}: {e}")
+
+        # Single pass that skips malformed fragments until an agent response parses
+        parser = IncrementalJSONParser(stream_fields=(), accept=is_agent_response)
+        parser.feed(text[start:])
+        if parser.result is not None:
+            return parser.result
+
         logger.error("No valid JSON found in response")
         return None
-        
+
     except Exception as e:
         logger.error(f"Error extracting JSON: {str(e)}")
         return None
-    
 
 
-# TODO: Add handoff to the agent if JSON fails and tell the agent to try again.  You can set a counter to limit the number of times the agent can try.
 
+# TODO: Add handoff to the agent if JSON fails and tell the agent to try again.  You can set a counter to limit the number of times the agent can try.
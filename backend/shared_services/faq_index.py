@@ -0,0 +1,180 @@
+import os
+import math
+import uuid
+import threading
+from difflib import SequenceMatcher
+from typing import Dict, Any, List, Optional, Tuple
+from backend.document_processing.faq_extractor import (
+    extract_faq_pairs, load_faq_index, normalize_question, FAQ_INDEX_FILENAME
+)
+from backend.shared_services.bm25_index import tokenize, RETRIEVAL_TOP_K
+from backend.shared_services.dense_index import retrieve_documents
+from backend.shared_services.document_chunks import format_citation
+from backend.shared_services.document_corpus import get_corpus_snapshot
+from backend.shared_services.handoffs import handoff_to_respond_to_human, handoff_chunks_to_answer_user
+from backend.shared_services.shared_types import MainState
+from backend.shared_services.logger_setup import setup_logger
+
+logger = setup_logger()
+
+# FAQ answer configuration (override via environment)
+FAQ_INDEX_PATH = os.getenv(
+    "FAQ_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "document_processing", FAQ_INDEX_FILENAME)
+)
+FAQ_ANSWERS_ENABLED = os.getenv("FAQ_ANSWERS_ENABLED", "true").lower() == "true"
+# Scores are the IDF-weighted F1 overlap of content tokens (stopwords removed) between query and FAQ question
+FAQ_ANSWER_THRESHOLD = float(os.getenv("FAQ_ANSWER_THRESHOLD", "0.9"))  # reply with the FAQ answer verbatim
+FAQ_MATCH_THRESHOLD = float(os.getenv("FAQ_MATCH_THRESHOLD", "0.6"))    # put this pair first in answer_user's chunks
+FAQ_UBIQUITOUS_SHARE = float(os.getenv("FAQ_UBIQUITOUS_SHARE", "0.25"))  # tokens in more questions ("vooma") may go unmatched
+FAQ_RELATED_QUESTIONS = 2
+
+
+class FAQIndex:
+    """
+    Question -> answer pairs from the parsed FAQ documents, with fuzzy lookup.
+    Pairs come from the faq_index.json written at ingest; documents it does not
+    cover are extracted from the corpus snapshot. Rebuilt when the corpus changes.
+    """
+
+    def __init__(self, path: str = FAQ_INDEX_PATH):
+        self.path = path
+        self._version: Optional[str] = None
+        self._entries: List[Dict[str, Any]] = []
+        self._postings: Dict[str, List[int]] = {}
+        self._idf: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.metrics = {"lookups": 0, "direct_answers": 0, "matched_pairs": 0, "misses": 0}
+
+    def _load(self) -> List[Dict[str, Any]]:
+        snapshot = get_corpus_snapshot()
+        if snapshot.version == self._version:
+            return self._entries
+        with self._lock:
+            if snapshot.version == self._version:
+                return self._entries
+            stored = load_faq_index(self.path)
+            entries, extracted = [], 0
+            for filename, document in snapshot.documents.items():
+                faqs = stored.get(filename)
+                if faqs is None:
+                    faqs = extract_faq_pairs(document, filename)
+                    extracted += 1
+                entries.extend(faqs)
+            postings: Dict[str, List[int]] = {}
+            for position, entry in enumerate(entries):
+                for token in set(tokenize(entry["normalized"])):
+                    postings.setdefault(token, []).append(position)
+            self._idf = {
+                token: math.log(1 + (len(entries) - len(positions) + 0.5) / (len(positions) + 0.5))
+                for token, positions in postings.items()
+            }
+            self._entries, self._postings, self._version = entries, postings, snapshot.version
+            logger.info(f"FAQ index: {len(entries)} questions ({extracted} documents extracted at load)")
+            return entries
+
+    def _weight(self, token: str) -> float:
+        # Tokens no FAQ question contains are as informative as the rarest ones
+        return self._idf.get(token, math.log(1 + (len(self._entries) + 0.5) / 0.5))
+
+    def is_ubiquitous(self, token: str) -> bool:
+        """A token in so many questions ("vooma") that it says nothing about which one is meant"""
+        return len(self._postings.get(token, ())) > FAQ_UBIQUITOUS_SHARE * len(self._entries)
+
+    def search(self, question: str, k: int = FAQ_RELATED_QUESTIONS + 1) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        (similarity, pair) for the closest questions, best first. Similarity is the
+        IDF-weighted F1 overlap of content tokens; the character-level ratio only breaks ties.
+        """
+        entries = self._load()
+        normalized = normalize_question(question)
+        tokens = set(tokenize(normalized))
+        if not tokens:
+            return []
+        query_weight = sum(self._weight(token) for token in tokens)
+        candidates = {position for token in tokens for position in self._postings.get(token, ())}
+        scored = []
+        for position in candidates:
+            entry_tokens = set(tokenize(entries[position]["normalized"]))
+            shared = sum(self._weight(token) for token in tokens & entry_tokens)
+            overlap = 2 * shared / (query_weight + sum(self._weight(token) for token in entry_tokens))
+            tie_break = SequenceMatcher(None, normalized, entries[position]["normalized"], autojunk=False).ratio()
+            scored.append((overlap, tie_break, entries[position]))
+        scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        return [(overlap, entry) for overlap, _, entry in scored[:k]]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": FAQ_ANSWERS_ENABLED,
+            "questions": len(self._entries),
+            "answer_threshold": FAQ_ANSWER_THRESHOLD,
+            "match_threshold": FAQ_MATCH_THRESHOLD,
+            **self.metrics,
+        }
+
+
+# Create a singleton instance
+faq_index = FAQIndex()
+
+
+def answer_from_faq(state: MainState) -> bool:
+    """
+    Answer near-verbatim FAQ questions straight from the FAQ, or put the matched
+    question/answer pair ahead of the retrieved chunks for answer_user. False
+    means no confident match. Only a question whose content words all appear in
+    the FAQ question is answered directly; a pair is handed on only if it contains
+    every query word that is not common to most questions.
+    """
+    if not FAQ_ANSWERS_ENABLED:
+        return False
+    faq_index.metrics["lookups"] += 1
+    user_input = state.get("user_input", "")
+    try:
+        matches = faq_index.search(user_input)
+    except Exception as e:
+        logger.error(f"Error searching FAQ index: {str(e)}")
+        return False
+    query_tokens = set(tokenize(normalize_question(user_input)))
+    if not matches or matches[0][0] < FAQ_MATCH_THRESHOLD:
+        faq_index.metrics["misses"] += 1
+        return False
+    score, pair = matches[0]
+    missing = query_tokens - set(tokenize(pair["normalized"]))
+    if any(not faq_index.is_ubiquitous(token) for token in missing):
+        # "how do i open vooma" must not settle for "What is VOOMA?"
+        faq_index.metrics["misses"] += 1
+        return False
+
+    citation = format_citation(pair)
+    response_id = str(uuid.uuid4())
+    if score >= FAQ_ANSWER_THRESHOLD and not missing:
+        related = [entry["question"] for _, entry in matches[1:]]
+        handoff_to_respond_to_human(
+            state, f"**{pair['question']}**\n\n{pair['answer']}", [citation], related, response_id, "faq_index"
+        )
+        faq_index.metrics["direct_answers"] += 1
+    else:
+        chunk = {
+            "chunk_id": f"faq:{pair['document']}:{pair['page']}:{pair['normalized']}",
+            "document": pair["document"],
+            "document_name": pair["document_name"],
+            "page": pair["page"],
+            "heading": pair["question"],
+            "text": pair["answer"],
+            "part": 0,
+            "score": round(score, 4),
+            "citation": citation,
+        }
+        # The pair goes first, with normal retrieval after it in case it is not the one meant
+        try:
+            retrieved = [
+                retrieved_chunk for retrieved_chunk in retrieve_documents(user_input, RETRIEVAL_TOP_K)
+                if normalize_question(retrieved_chunk.get("heading", "")) != pair["normalized"]
+            ][:RETRIEVAL_TOP_K - 1]
+        except Exception as e:
+            logger.error(f"Error retrieving documents alongside FAQ match: {str(e)}")
+            retrieved = []
+        handoff_chunks_to_answer_user(state, user_input, [chunk, *retrieved], response_id, "faq_index")
+        faq_index.metrics["matched_pairs"] += 1
+    logger.info(f"FAQ match ({score:.2f}) for '{user_input}' -> '{pair['question']}'")
+    return True
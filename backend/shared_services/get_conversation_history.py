@@ -2,71 +2,117 @@ import os
 import json
 from datetime import datetime, timezone
 from typing import Dict, Any, Optional, List
-from .db import get_postgres_connection
+from .db import acquire_connection
 from .logger_setup import setup_logger
-from psycopg2.extras import RealDictCursor
-import asyncpg
+from .message_store import reads_normalized, message_from_row
 
 
 logger = setup_logger()
 
-def get_conversation_history(
+# Snapshot rows repeat earlier messages, so flatten the user's most recent rows,
+# keep each distinct entry once (first snapshot wins) and order/limit in SQL.
+# Only O(limit) rows leave the database.
+HISTORY_FROM_SNAPSHOTS_SQL = r"""
+    WITH recent AS (
+        SELECT state, log_timestamp
+        FROM andika.andika_conversations
+        WHERE state_user_id = $1
+        ORDER BY log_timestamp DESC
+        LIMIT $2
+    ),
+    items AS (
+        SELECT 'conversation_history' AS kind, item, recent.log_timestamp
+        FROM recent
+        CROSS JOIN LATERAL jsonb_array_elements(
+            CASE WHEN jsonb_typeof(state->'conversation_history') = 'array'
+                 THEN state->'conversation_history' ELSE '[]'::jsonb END
+        ) AS item
+        UNION ALL
+        SELECT 'node_history' AS kind, item, recent.log_timestamp
+        FROM recent
+        CROSS JOIN LATERAL jsonb_array_elements(
+            CASE WHEN jsonb_typeof(state->'node_history') = 'array'
+                 THEN state->'node_history' ELSE '[]'::jsonb END
+        ) AS item
+    ),
+    distinct_items AS (
+        SELECT DISTINCT ON (kind, md5(item::text))
+            kind,
+            item,
+            COALESCE(
+                CASE WHEN item->>'timestamp' ~ '^\d{4}-\d{2}-\d{2}'
+                     THEN (item->>'timestamp')::timestamptz END,
+                log_timestamp
+            ) AS item_timestamp
+        FROM items
+        ORDER BY kind, md5(item::text), log_timestamp
+    ),
+    ranked AS (
+        SELECT kind, item,
+               ROW_NUMBER() OVER (PARTITION BY kind ORDER BY item_timestamp DESC) AS position
+        FROM distinct_items
+    )
+    SELECT kind, item
+    FROM ranked
+    WHERE position <= $2
+    ORDER BY kind, position;
+"""
+
+RECENT_MESSAGES_SQL = """
+    SELECT message_id, role, content, sources, follow_up_questions, created_at
+    FROM andika.andika_messages
+    WHERE user_id = $1
+    ORDER BY created_at DESC
+    LIMIT $2;
+"""
+
+RECENT_NODES_SQL = """
+    SELECT node.entry
+    FROM (
+        SELECT node_history, log_timestamp
+        FROM andika.andika_turns
+        WHERE user_id = $1
+        ORDER BY log_timestamp DESC
+        LIMIT $2
+    ) recent
+    CROSS JOIN LATERAL jsonb_array_elements(recent.node_history)
+        WITH ORDINALITY AS node(entry, position)
+    ORDER BY recent.log_timestamp DESC, node.position DESC
+    LIMIT $2;
+"""
+
+async def get_conversation_history(
     user_id: str, 
     limit: int,  # Removed session_id and conversation_id parameters
 ) -> Dict[str, Any]:
     """
     Extract recent conversation_history and node_history for a user
     """
-    conn = get_postgres_connection("conversations")
+    if reads_normalized():
+        return await _get_normalized_history(user_id, limit)
+
     try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute("""
-                SELECT 
-                    state->'conversation_history' as conversation_history,
-                    state->'node_history' as node_history
-                FROM andika.andika_conversations 
-                WHERE user_id = %s 
-                ORDER BY log_timestamp DESC
-                LIMIT %s;
-            """, (user_id, limit))
+        async with acquire_connection() as conn:
+            results = await conn.fetch(HISTORY_FROM_SNAPSHOTS_SQL, user_id, limit)
             
-            results = cur.fetchall()
-            
-            if not results:
-                logger.info(f"No conversations found for user_id: {user_id}")
-                return {
-                    "status": "no_data",
-                    "conversation_history": [],
-                    "node_history": [],
-                }
-            
-            # Extract histories
-            conversations = []
-            node_conversations = []
-       
-            for result in results:
-                if result['conversation_history']:
-                    conversations.extend(result['conversation_history'])
-                if result['node_history']:
-                    node_conversations.extend(result['node_history'])
-
-            # Sort with error handling
-            def safe_sort(items):
-                try:
-                    return sorted(
-                        items,
-                        key=lambda x: datetime.fromisoformat(x.get('timestamp', datetime.now().isoformat())),
-                        reverse=True  # Newest first
-                    )[:limit]  # Limit after sorting to get most recent
-                except Exception as e:
-                    logger.warning(f"Error sorting items: {str(e)}")
-                    return items[:limit]
-
+        if not results:
+            logger.info(f"No conversations found for user_id: {user_id}")
             return {
-                "status": "success",
-                "conversation_history": safe_sort(conversations),
-                "node_history": safe_sort(node_conversations),
+                "status": "no_data",
+                "conversation_history": [],
+                "node_history": [],
             }
+        
+        # Rows arrive deduplicated, newest first and already limited per kind
+        histories = {"conversation_history": [], "node_history": []}
+        for result in results:
+            histories[result['kind']].append(result['item'])
+
+        return {
+            "status": "success",
+            "conversation_history": histories["conversation_history"],
+            "node_history": histories["node_history"],
+        }
             
     except Exception as e:
         logger.error(f"Error retrieving history: {str(e)}")
@@ -75,22 +121,37 @@ def get_conversation_history(
             "conversation_history": [],
             "node_history": []
         }
-    finally:
-        conn.close()
 
-async def get_db_connection():
-    """Get async database connection"""
+async def _get_normalized_history(user_id: str, limit: int) -> Dict[str, Any]:
+    """
+    Read the latest messages and node records from the normalized tables, newest first
+    """
     try:
-        conn = await asyncpg.connect(
-            user='your_user',
-            password='your_password',
-            database='ai_agents',
-            host='localhost'
-        )
-        return conn
+        async with acquire_connection() as conn:
+            message_rows = await conn.fetch(RECENT_MESSAGES_SQL, user_id, limit)
+            node_rows = await conn.fetch(RECENT_NODES_SQL, user_id, limit)
+
+        if not message_rows and not node_rows:
+            logger.info(f"No conversations found for user_id: {user_id}")
+            return {
+                "status": "no_data",
+                "conversation_history": [],
+                "node_history": [],
+            }
+
+        return {
+            "status": "success",
+            "conversation_history": [message_from_row(row) for row in message_rows],
+            "node_history": [row['entry'] for row in node_rows],
+        }
+
     except Exception as e:
-        logger.error(f"Error connecting to database: {str(e)}")
-        raise
+        logger.error(f"Error retrieving history: {str(e)}")
+        return {
+            "status": "error",
+            "conversation_history": [],
+            "node_history": []
+        }
 
 async def get_user_past_history(
     user_id: str,
@@ -98,29 +159,27 @@ async def get_user_past_history(
     max_past_turns: int = 5
 ) -> list:
     """
-    Retrieve relevant exchanges from user's past conversations using async DB connection
+    Retrieve relevant exchanges from user's past conversations using the shared async pool
     """
     try:
-        conn = await get_db_connection()
-        
         query = """
             SELECT 
-                conversation_history,
+                state->'conversation_history' as conversation_history,
                 conversation_id,
-                created_at as timestamp
-            FROM conversations
-            WHERE user_id = $1
-            AND ($2::uuid IS NULL OR conversation_id != $2)
-            ORDER BY created_at DESC
+                log_timestamp as timestamp
+            FROM andika.andika_conversations
+            WHERE state_user_id = $1
+            AND ($2::text IS NULL OR conversation_id != $2)
+            ORDER BY log_timestamp DESC
             LIMIT $3
         """
         
-        rows = await conn.fetch(query, user_id, current_conversation_id, max_past_turns)
-        await conn.close()
+        async with acquire_connection() as conn:
+            rows = await conn.fetch(query, user_id, current_conversation_id, max_past_turns)
         
         relevant_history = []
         for row in rows:
-            conversation = json.loads(row['conversation_history'])
+            conversation = row['conversation_history']
             if conversation:
                 relevant_history.append({
                     "conversation_id": row['conversation_id'],
@@ -132,4 +191,4 @@ async def get_user_past_history(
             
     except Exception as e:
         logger.error(f"Error retrieving past history: {str(e)}")
-        return []
\ No newline at end of file
+        return []
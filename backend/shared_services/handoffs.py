@@ -53,4 +53,68 @@ def handoff_to_welcome_user(state: MainState, error_context: str, response_id: s
         }
     })
     
-    return state 
\ No newline at end of file
+    return state 
+
+def handoff_to_respond_to_human(
+    state: MainState,
+    message: str,
+    sources: list,
+    follow_up_questions: list,
+    response_id: str,
+    source: str
+) -> MainState:
+    """
+    Helper function to hand a ready answer straight to respond_to_human
+    """
+    state["node_history"].append({
+        "role": "AI_AGENT",
+        "node": source,
+        "conversation_id": state["conversation_id"],
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "response_id": response_id,
+        "content": {
+            "response_type": "handoff",
+            "agents": [{
+                "agent_name": "respond_to_human",
+                "parameters": {
+                    "message_to_user": message,
+                    "sources": sources,
+                    "follow_up_questions": follow_up_questions
+                }
+            }]
+        }
+    })
+
+    return state
+
+def handoff_chunks_to_answer_user(
+    state: MainState,
+    query: str,
+    doc_chunks: list,
+    response_id: str,
+    source: str
+) -> MainState:
+    """
+    Helper function to hand retrieved document chunks (with citations) to answer_user
+    """
+    state["node_history"].append({
+        "role": "AI_AGENT",
+        "node": source,
+        "conversation_id": state["conversation_id"],
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "response_id": response_id,
+        "content": {
+            "response_type": "handoff",
+            "agents": [{
+                "agent_name": "answer_user",
+                "parameters": {
+                    "query": query,
+                    "doc_chunks": doc_chunks,
+                    "context": f"{len(doc_chunks)} document passages retrieved by {source}",
+                    "previous_attempt": f"Document retrieval completed in {source}"
+                }
+            }]
+        }
+    })
+
+    return state
@@ -0,0 +1,85 @@
+import os
+from collections import OrderedDict, deque
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+from backend.shared_services.logger_setup import setup_logger
+
+logger = setup_logger()
+
+MAX_MEMORY_RECORDS = int(os.getenv("MAX_MEMORY_RECORDS", "10"))  # Maximum records to keep in memory per session
+HISTORY_CACHE_MAX_SESSIONS = int(os.getenv("HISTORY_CACHE_MAX_SESSIONS", "5000"))
+
+
+class HistoryCache:
+    """
+    Per-session ring buffer of the last MAX_MEMORY_RECORDS messages, oldest first.
+
+    Lookups go buffer -> session store record -> database, and only the last
+    step counts as a database read. Once a session is warm, respond_to_human
+    appends to its buffer and later turns never touch the database.
+    """
+
+    def __init__(self, max_records: int = MAX_MEMORY_RECORDS, max_sessions: int = HISTORY_CACHE_MAX_SESSIONS):
+        self.max_records = max_records
+        self.max_sessions = max_sessions
+        self._buffers: "OrderedDict[str, deque]" = OrderedDict()
+        self.metrics = {"hits": 0, "store_hits": 0, "db_loads": 0, "appends": 0, "evicted": 0}
+
+    def _seed(self, session_id: str, messages: List[Dict[str, Any]]) -> deque:
+        buffer = deque(messages, maxlen=self.max_records)
+        self._buffers[session_id] = buffer
+        self._buffers.move_to_end(session_id)
+        while len(self._buffers) > self.max_sessions:
+            self._buffers.popitem(last=False)
+            self.metrics["evicted"] += 1
+        return buffer
+
+    async def get_history(
+        self,
+        session_id: str,
+        store_record: Optional[Dict[str, Any]],
+        load_from_db: Callable[[int], Awaitable[List[Dict[str, Any]]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Return the session's recent messages (oldest first).
+
+        :param store_record: The session's record from the session store, if any
+        :param load_from_db: Coroutine taking a limit and returning messages newest first
+        """
+        buffer = self._buffers.get(session_id)
+        if buffer is not None:
+            self._buffers.move_to_end(session_id)
+            self.metrics["hits"] += 1
+            return list(buffer)
+
+        if store_record is not None and "conversation_history" in store_record:
+            self.metrics["store_hits"] += 1
+            return list(self._seed(session_id, store_record["conversation_history"]))
+
+        self.metrics["db_loads"] += 1
+        logger.info(f"History cache miss for session {session_id}, loading from database")
+        newest_first = await load_from_db(self.max_records)
+        return list(self._seed(session_id, list(reversed(newest_first))))
+
+    def append(self, session_id: str, message: Dict[str, Any]) -> None:
+        """Record a new message for a warm session (cold sessions are seeded on their next turn)"""
+        buffer = self._buffers.get(session_id)
+        if buffer is None:
+            return
+        buffer.append(message)
+        self.metrics["appends"] += 1
+
+    def forget(self, session_id: str) -> None:
+        self._buffers.pop(session_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.metrics["hits"] + self.metrics["store_hits"] + self.metrics["db_loads"]
+        return {
+            "sessions": len(self._buffers),
+            "max_records": self.max_records,
+            **self.metrics,
+            "db_read_rate": round(self.metrics["db_loads"] / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Create a singleton instance
+history_cache = HistoryCache()
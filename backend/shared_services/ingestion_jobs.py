@@ -0,0 +1,336 @@
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, AsyncIterator, Callable, Awaitable
+from backend.document_processing.document_processor import (
+    DocumentProcessor, file_sha256, count_pages, split_pages, _parse_page_range, PAGES_PER_TASK
+)
+from backend.document_processing.parsed_format import JSONL_SUFFIX
+from backend.shared_services.document_chunks import chunk_document
+from backend.shared_services.document_corpus import document_corpus
+from backend.shared_services.file_lock import file_lock
+from backend.shared_services.logger_setup import setup_logger
+
+logger = setup_logger()
+
+# Upload ingestion configuration (override via environment)
+DOCUMENTS_BASE_FOLDER = os.getenv(
+    "DOCUMENTS_BASE_FOLDER",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "document_processing")
+)
+UPLOADS_FOLDER = os.path.join(DOCUMENTS_BASE_FOLDER, "uploads")
+DOCUMENT_UPLOAD_MAX_BYTES = int(os.getenv("DOCUMENT_UPLOAD_MAX_BYTES", str(200 * 1024 * 1024)))
+INGEST_JOB_WORKERS = int(os.getenv("INGEST_JOB_WORKERS", "2"))
+INGEST_JOB_NICENESS = int(os.getenv("INGEST_JOB_NICENESS", "10"))
+INGEST_JOB_HISTORY = int(os.getenv("INGEST_JOB_HISTORY", "100"))
+UPLOAD_WRITE_BUFFER = 1024 * 1024  # Bytes collected before each disk write
+
+SAFE_FILENAME_RE = re.compile(r"[^\w\-. ()]+")
+
+Notifier = Callable[[str, str], Awaitable[None]]
+
+
+class UploadRejected(Exception):
+    """The upload cannot be accepted; status_code is the HTTP status to return"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class JobStore:
+    """
+    Job status shared by all web workers: a JSON file next to the manifest, written
+    under file_lock through a unique temp file. Each worker runs the jobs it received;
+    any worker can report on them. Only the newest INGEST_JOB_HISTORY jobs are kept.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                return json.load(file).get("jobs", {})
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.error(f"Ignoring unreadable ingestion job file {self.path}: {str(e)}")
+            return {}
+
+    def save(self, job: Dict[str, Any]) -> None:
+        with file_lock(self.path):
+            jobs = self._read()
+            jobs[job["job_id"]] = job
+            newest = sorted(jobs.values(), key=lambda entry: entry["created_at"])[-INGEST_JOB_HISTORY:]
+            self._write({entry["job_id"]: entry for entry in newest})
+
+    def _write(self, jobs: Dict[str, Dict[str, Any]]) -> None:
+        temp_path = f"{self.path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump({"jobs": jobs}, file, ensure_ascii=False)
+        os.replace(temp_path, self.path)  # Other workers never read a half-written file
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._read().get(job_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        return sorted(self._read().values(), key=lambda entry: entry["created_at"], reverse=True)
+
+    def fail_interrupted(self) -> int:
+        """Mark unfinished jobs whose worker process is gone as failed; returns how many"""
+        interrupted = 0
+        with file_lock(self.path):
+            jobs = self._read()
+            for job in jobs.values():
+                if job["finished_at"] is None and not _process_alive(job.get("worker_pid")):
+                    job.update(status="failed", error="Interrupted by a server restart", finished_at=time.time())
+                    interrupted += 1
+            if interrupted:
+                self._write(jobs)
+        return interrupted
+
+
+def _process_alive(pid: Optional[int]) -> bool:
+    if not pid or pid == os.getpid():
+        return False  # A starting worker that reuses a dead worker's pid has no jobs yet
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass  # Exists but belongs to another user
+    return True
+
+
+def _lower_priority() -> None:
+    """Process pool initializer: parse at a lower CPU priority than the web workers"""
+    try:
+        os.nice(INGEST_JOB_NICENESS)
+    except (AttributeError, OSError):
+        pass
+
+
+def _save_parsed_pages(base_folder: str, job_folder: str, filename: str, pages_dict: Dict, content_hash: str) -> int:
+    """
+    Process pool task: build and save the parsed document (FAQ index and manifest
+    included), returning its chunk count. The web workers' indexes pick the file
+    up at their next corpus revalidation.
+    """
+    processor = DocumentProcessor(base_folder, create_folders=False, received_folder=job_folder)
+    json_data = processor.build_document(filename, pages_dict)
+    processor.save_document(filename, json_data, content_hash)
+    return len(chunk_document(json_data, f"{os.path.splitext(filename)[0]}{JSONL_SUFFIX}"))
+
+
+def safe_pdf_filename(filename: str) -> str:
+    name = SAFE_FILENAME_RE.sub("_", os.path.basename(filename or "")).strip(" .")
+    if not name.lower().endswith(".pdf") or len(name) <= len(".pdf"):
+        raise UploadRejected("Only .pdf uploads are supported")
+    return name
+
+
+class IngestionJobService:
+    """
+    Background ingestion of uploaded PDFs. Uploads are streamed to disk and queued;
+    one worker task takes jobs in order and parses and saves them in a small,
+    lower-priority process pool, so parsing never runs in the web worker. Progress
+    (pages parsed, chunks indexed) goes to the shared JobStore, so any web worker
+    can report it, and is pushed to the uploader's WebSocket session when one is given.
+    """
+
+    def __init__(self, base_folder: str = DOCUMENTS_BASE_FOLDER, workers: int = INGEST_JOB_WORKERS):
+        self.base_folder = base_folder
+        self.workers = workers
+        self.store = JobStore(os.path.join(base_folder, "ingest_jobs.json"))
+        self.jobs: Dict[str, Dict[str, Any]] = {}  # Jobs queued or running in this process
+        self.notify: Optional[Notifier] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.metrics = {"uploads": 0, "upload_bytes": 0, "completed": 0, "skipped": 0, "failed": 0}
+
+    async def start(self, notify: Optional[Notifier] = None) -> None:
+        """Start the job worker; notify(message, session_id) sends progress frames"""
+        if self._worker is not None:
+            return
+        self.notify = notify
+        os.makedirs(UPLOADS_FOLDER, exist_ok=True)
+        interrupted = await asyncio.to_thread(self.store.fail_interrupted)
+        if interrupted:
+            logger.warning(f"Marked {interrupted} interrupted ingestion jobs as failed")
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run(), name="ingestion-jobs")
+        logger.info(f"Ingestion job worker started ({self.workers} parse processes)")
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_lower_priority)
+        return self._pool
+
+    async def receive_upload(self, chunks: AsyncIterator[bytes], filename: str, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Stream an uploaded PDF to its job folder and queue it; returns the job"""
+        if self._queue is None:
+            raise UploadRejected("Document ingestion is not running", 503)
+        filename = safe_pdf_filename(filename)
+        job_id = uuid.uuid4().hex
+        job_folder = os.path.join(UPLOADS_FOLDER, job_id)
+        os.makedirs(job_folder)
+        path = os.path.join(job_folder, filename)
+
+        size, buffer = 0, bytearray()
+        file = await asyncio.to_thread(open, path, "wb")
+        try:
+            async for chunk in chunks:
+                if not size and not buffer and not chunk.startswith(b"%PDF"):
+                    raise UploadRejected("Upload is not a PDF file")
+                size += len(chunk)
+                if size > DOCUMENT_UPLOAD_MAX_BYTES:
+                    raise UploadRejected(f"Upload exceeds {DOCUMENT_UPLOAD_MAX_BYTES} bytes", 413)
+                buffer += chunk
+                if len(buffer) >= UPLOAD_WRITE_BUFFER:
+                    await asyncio.to_thread(file.write, bytes(buffer))
+                    buffer.clear()
+            if buffer:
+                await asyncio.to_thread(file.write, bytes(buffer))
+        except BaseException:
+            await asyncio.to_thread(file.close)
+            shutil.rmtree(job_folder, ignore_errors=True)
+            raise
+        await asyncio.to_thread(file.close)
+        if not size:
+            shutil.rmtree(job_folder, ignore_errors=True)
+            raise UploadRejected("Upload is empty")
+
+        job = {
+            "job_id": job_id,
+            "filename": filename,
+            "session_id": session_id,
+            "status": "queued",
+            "bytes": size,
+            "pages_total": 0,
+            "pages_parsed": 0,
+            "chunks_indexed": 0,
+            "error": None,
+            "created_at": time.time(),
+            "finished_at": None,
+            "worker_pid": os.getpid(),
+        }
+        self.jobs[job_id] = job
+        await asyncio.to_thread(self.store.save, dict(job))
+        self.metrics["uploads"] += 1
+        self.metrics["upload_bytes"] += size
+        await self._queue.put(job_id)
+        logger.info(f"Queued ingestion job {job_id} for {filename} ({size} bytes)")
+        return dict(job)
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def list_jobs(self) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.store.list)
+
+    async def _update(self, job: Dict[str, Any], **changes) -> None:
+        job.update(changes)
+        try:
+            await asyncio.to_thread(self.store.save, dict(job))
+        except OSError as e:
+            logger.error(f"Unable to save ingestion job {job['job_id']}: {str(e)}")
+        if self.notify is not None and job.get("session_id"):
+            try:
+                await self.notify(json.dumps({"type": "ingestion", "job": job}), job["session_id"])
+            except Exception as e:
+                logger.error(f"Unable to send ingestion progress for job {job['job_id']}: {str(e)}")
+
+    async def _run(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            job = self.jobs.get(job_id)
+            try:
+                if job is not None:
+                    await self._ingest(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.metrics["failed"] += 1
+                logger.error(f"Ingestion job {job_id} failed: {str(e)}", exc_info=True)
+                shutil.rmtree(os.path.join(UPLOADS_FOLDER, job_id), ignore_errors=True)
+                await self._update(job, status="failed", error=str(e), finished_at=time.time())
+            finally:
+                self.jobs.pop(job_id, None)
+                self._queue.task_done()
+
+    async def _ingest(self, job: Dict[str, Any]) -> None:
+        loop = asyncio.get_running_loop()
+        job_folder = os.path.join(UPLOADS_FOLDER, job["job_id"])
+        filename = job["filename"]
+        path = os.path.join(job_folder, filename)
+        processor = DocumentProcessor(self.base_folder, create_folders=False, received_folder=job_folder)
+
+        await self._update(job, status="hashing")
+        content_hash = await asyncio.to_thread(file_sha256, path)
+        await asyncio.to_thread(processor.manifest.reload)
+        record = processor.manifest.lookup(content_hash)
+        if record and os.path.exists(os.path.join(processor.parsed_folder, record["parsed_file"])):
+            await asyncio.to_thread(processor.move_to_completed, filename)
+            shutil.rmtree(job_folder, ignore_errors=True)
+            self.metrics["skipped"] += 1
+            await self._update(job, status="skipped", error=f"Already ingested as {record['parsed_file']}", finished_at=time.time())
+            return
+
+        pool = self._get_pool()
+        total_pages = await loop.run_in_executor(pool, count_pages, path)
+        if not total_pages:
+            raise ValueError("PDF has no pages")
+        await self._update(job, status="parsing", pages_total=total_pages)
+        pages: Dict[int, Dict] = {}
+        tasks = [
+            loop.run_in_executor(pool, _parse_page_range, path, first, last)
+            for first, last in split_pages(total_pages, PAGES_PER_TASK)
+        ]
+        for task in asyncio.as_completed(tasks):
+            for page_number, page_entry in await task:
+                pages[page_number] = page_entry
+            await self._update(job, pages_parsed=len(pages))
+
+        # Saving and chunking run in the pool too; the indexes update in the background, not in this worker's threads
+        await self._update(job, status="indexing")
+        pages_dict = {str(page_number): pages[page_number] for page_number in sorted(pages)}
+        chunks = await loop.run_in_executor(
+            pool, _save_parsed_pages, self.base_folder, job_folder, filename, pages_dict, content_hash
+        )
+        shutil.rmtree(job_folder, ignore_errors=True)
+        document_corpus.invalidate()
+
+        self.metrics["completed"] += 1
+        await self._update(job, status="completed", chunks_indexed=chunks, finished_at=time.time())
+        logger.info(f"Ingestion job {job['job_id']} completed: {filename}, {len(pages_dict)} pages, {chunks} chunks")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "active": len(self.jobs),
+            **self.metrics,
+        }
+
+
+# Create a singleton instance
+ingestion_jobs = IngestionJobService()
@@ -12,9 +12,13 @@ import traceback, requests
 import google.generativeai as genai
 from openai import AsyncOpenAI
 import json
+from backend.shared_services.llm_cache import llm_response_cache, make_cache_key
 
 load_dotenv()
 
+DEFAULT_MODEL = "gpt-4o-mini-2024-07-18"
+DEFAULT_TEMPERATURE = 0.7
+
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
@@ -136,16 +140,21 @@ def call_llm_api_ollama(messages: List[Dict[str, str]], model="deepseek-r1:7b")
         print(f"Error in Ollama API call: {str(e)}")
         return None
 
-async def call_llm_api_stream(messages: list) -> AsyncGenerator[str, None]:
+def _response_format(json_mode: bool) -> Dict[str, Any]:
+    """JSON mode constrains decoding to a single valid JSON object"""
+    return {"response_format": {"type": "json_object"}} if json_mode else {}
+
+async def call_llm_api_stream(messages: list, json_mode: bool = False) -> AsyncGenerator[str, None]:
     """
     Stream responses from OpenAI API
     """
     try:
         response = await client.chat.completions.create(
-            model="gpt-4o-mini-2024-07-18",  # or your preferred model
+            model=DEFAULT_MODEL,  # or your preferred model
             messages=messages,
-            temperature=0.7,
-            stream=True  # Enable streaming
+            temperature=DEFAULT_TEMPERATURE,
+            stream=True,  # Enable streaming
+            **_response_format(json_mode)
         )
 
         
@@ -157,17 +166,30 @@ async def call_llm_api_stream(messages: list) -> AsyncGenerator[str, None]:
         print(f"Error in streaming LLM response: {str(e)}")
         yield f"Error: {str(e)}"
 
-async def call_llm_api(messages: list) -> str:
+async def call_llm_api(messages: list, cache: bool = False, json_mode: bool = False) -> str:
     """
-    Regular non-streaming API call
+    Regular non-streaming API call.
+    Pass cache=True to serve identical requests from the response cache, and
+    json_mode=True to have the model return a single JSON object.
     """
+    options = {"json_mode": True} if json_mode else {}
+    cache_key = make_cache_key(DEFAULT_MODEL, DEFAULT_TEMPERATURE, messages, **options) if cache else None
+    if cache_key:
+        cached = llm_response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
     try:
         response = await client.chat.completions.create(
-            model="gpt-4o-mini-2024-07-18",  # or your preferred model
+            model=DEFAULT_MODEL,  # or your preferred model
             messages=messages,
-            temperature=0.7
+            temperature=DEFAULT_TEMPERATURE,
+            **_response_format(json_mode)
         )
-        return response.choices[0].message.content or ""
+        content = response.choices[0].message.content or ""
+        if cache_key and content:
+            llm_response_cache.put(cache_key, content)
+        return content
     
     except Exception as e:
         print(f"Error in LLM API call: {str(e)}")
@@ -0,0 +1,138 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+from backend.shared_services.logger_setup import setup_logger
+
+logger = setup_logger()
+
+# Response cache configuration (override via environment)
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(6 * 60 * 60)))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")  # e.g. backend/llm_cache.sqlite3 to survive restarts
+
+
+def make_cache_key(model: str, temperature: float, messages: List[Dict[str, Any]], **options) -> str:
+    """
+    Stable hash of a request. Message text is whitespace-normalized so
+    formatting-only prompt differences still hit.
+    """
+    normalized = [
+        {"role": message.get("role", ""), "content": " ".join(str(message.get("content", "")).split())}
+        for message in messages
+    ]
+    payload = json.dumps(
+        {"model": model, "temperature": temperature, "messages": normalized, "options": options},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Exact-match cache for LLM responses: an in-memory LRU with TTL, optionally
+    backed by a SQLite file so entries survive restarts and are shared by workers.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = LLM_CACHE_TTL_SECONDS,
+        path: str = LLM_CACHE_PATH
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self.metrics = {"hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        if path:
+            self._open_db(path)
+
+    def _open_db(self, path: str) -> None:
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._db.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            logger.info(f"LLM response cache persisted to {path}")
+        except sqlite3.Error as e:
+            logger.error(f"Unable to open LLM cache database {path}, using memory only: {str(e)}")
+            self._db = None
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            response, created_at = entry
+            if now - created_at <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.metrics["hits"] += 1
+                return response
+            del self._entries[key]
+
+        if self._db is not None:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+            if row is not None and now - row[1] <= self.ttl_seconds:
+                self._remember(key, row[0], row[1])
+                self.metrics["disk_hits"] += 1
+                return row[0]
+
+        self.metrics["misses"] += 1
+        return None
+
+    def put(self, key: str, response: str) -> None:
+        created_at = time.time()
+        self._remember(key, response, created_at)
+        self.metrics["stores"] += 1
+        if self._db is not None:
+            try:
+                with self._db_lock:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO llm_cache (key, response, created_at) VALUES (?, ?, ?)",
+                        (key, response, created_at)
+                    )
+            except sqlite3.Error as e:
+                logger.error(f"Error writing LLM cache entry: {str(e)}")
+
+    def _remember(self, key: str, response: str, created_at: float) -> None:
+        self._entries[key] = (response, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.metrics["evictions"] += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM llm_cache")
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.metrics["hits"] + self.metrics["disk_hits"] + self.metrics["misses"]
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "persistent": self._db is not None,
+            **self.metrics,
+            "hit_rate": round((self.metrics["hits"] + self.metrics["disk_hits"]) / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Create a singleton instance
+llm_response_cache = LLMResponseCache()
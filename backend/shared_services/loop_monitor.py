@@ -0,0 +1,169 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from collections import Counter, defaultdict
+from typing import Dict, Any, List, Optional
+from backend.shared_services.logger_setup import setup_logger
+
+logger = setup_logger()
+
+# off | on | audit  (audit also turns on asyncio debug mode and its slow-callback warnings)
+LOOP_MONITOR_MODE = os.getenv("LOOP_MONITOR", "off").strip().lower()
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.1"))          # seconds between heartbeats
+LOOP_STALL_THRESHOLD_MS = float(os.getenv("LOOP_STALL_THRESHOLD_MS", "100"))
+LOOP_SAMPLE_INTERVAL_MS = float(os.getenv("LOOP_SAMPLE_INTERVAL_MS", "20"))
+
+# Frames from these paths are runtime plumbing, not the code that blocked
+_SKIP_PATHS = (os.sep + "asyncio" + os.sep, os.sep + "uvicorn" + os.sep, os.sep + "starlette" + os.sep)
+_PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+class LoopMonitor:
+    """
+    Measures event-loop lag and attributes stalls to call sites.
+
+    A heartbeat coroutine stamps the time every LOOP_LAG_INTERVAL; the observed
+    oversleep is the loop lag. A watchdog thread checks the stamp and, while the
+    loop is stuck past LOOP_STALL_THRESHOLD_MS, samples the loop thread's stack.
+    Each sample is charged to the innermost project frame (or the innermost
+    non-runtime frame) so blocking calls can be ranked by total stall time.
+    """
+
+    def __init__(
+        self,
+        interval: float = LOOP_LAG_INTERVAL,
+        threshold_ms: float = LOOP_STALL_THRESHOLD_MS,
+        sample_interval_ms: float = LOOP_SAMPLE_INTERVAL_MS
+    ):
+        self.interval = interval
+        self.threshold = threshold_ms / 1000
+        self.sample_interval = sample_interval_ms / 1000
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = time.monotonic()
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.lag_samples = 0
+        self.lag_total_ms = 0.0
+        self.lag_max_ms = 0.0
+        self.stalls = 0
+        self._site_samples: Counter = Counter()
+        self._site_stall_ms: Dict[str, float] = defaultdict(float)
+        self._site_stacks: Dict[str, List[str]] = {}
+
+    def start(self, loop: asyncio.AbstractEventLoop, audit: bool = False) -> None:
+        """Start the heartbeat on `loop` and the sampling watchdog thread"""
+        if self._heartbeat_task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        if audit:
+            loop.set_debug(True)
+            loop.slow_callback_duration = self.threshold
+        self._stop.clear()
+        self._heartbeat_task = loop.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-stall-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(f"Event loop monitor started (threshold={self.threshold * 1000:.0f}ms, audit={audit})")
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            started = time.monotonic()
+            self._last_beat = started
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (time.monotonic() - started - self.interval) * 1000)
+            with self._lock:
+                self.lag_samples += 1
+                self.lag_total_ms += lag_ms
+                self.lag_max_ms = max(self.lag_max_ms, lag_ms)
+
+    def _watch(self) -> None:
+        in_stall = False
+        while not self._stop.wait(self.sample_interval):
+            blocked_for = time.monotonic() - self._last_beat - self.interval
+            if blocked_for < self.threshold:
+                in_stall = False
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            site = self._call_site(stack)
+            with self._lock:
+                if not in_stall:
+                    self.stalls += 1
+                    in_stall = True
+                self._site_samples[site] += 1
+                self._site_stall_ms[site] += self.sample_interval * 1000
+                if site not in self._site_stacks:
+                    self._site_stacks[site] = traceback.format_list(stack[-8:])
+            if self._site_samples[site] == 1:
+                logger.warning(f"Event loop blocked for {blocked_for * 1000:.0f}ms at {site}")
+
+    @staticmethod
+    def _call_site(stack: traceback.StackSummary) -> str:
+        """Innermost project frame, else innermost frame outside the asyncio/server runtime"""
+        candidates = [f for f in stack if not any(skip in f.filename for skip in _SKIP_PATHS)]
+        project = [f for f in candidates if f.filename.startswith(_PROJECT_ROOT)]
+        frame = (project or candidates or list(stack))[-1]
+        return f"{os.path.relpath(frame.filename, _PROJECT_ROOT)}:{frame.lineno} in {frame.name}"
+
+    def get_stats(self, top: int = 20) -> Dict[str, Any]:
+        """Loop lag summary plus call sites ranked by observed stall time"""
+        with self._lock:
+            ranked = sorted(self._site_stall_ms.items(), key=lambda item: item[1], reverse=True)[:top]
+            return {
+                "running": self._heartbeat_task is not None,
+                "threshold_ms": self.threshold * 1000,
+                "lag_avg_ms": round(self.lag_total_ms / self.lag_samples, 2) if self.lag_samples else 0.0,
+                "lag_max_ms": round(self.lag_max_ms, 2),
+                "stalls": self.stalls,
+                "blocking_call_sites": [
+                    {
+                        "site": site,
+                        "stall_ms": round(stall_ms),
+                        "samples": self._site_samples[site],
+                        "stack": self._site_stacks.get(site, []),
+                    }
+                    for site, stall_ms in ranked
+                ],
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.lag_samples = 0
+            self.lag_total_ms = 0.0
+            self.lag_max_ms = 0.0
+            self.stalls = 0
+            self._site_samples.clear()
+            self._site_stall_ms.clear()
+            self._site_stacks.clear()
+
+
+# Create a singleton instance
+loop_monitor = LoopMonitor()
+
+
+def start_loop_monitor() -> None:
+    """Start monitoring the running loop if LOOP_MONITOR is on/audit"""
+    if LOOP_MONITOR_MODE not in ("on", "audit"):
+        return
+    loop_monitor.start(asyncio.get_running_loop(), audit=LOOP_MONITOR_MODE == "audit")
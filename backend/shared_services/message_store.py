@@ -0,0 +1,232 @@
+import os
+import uuid
+import hashlib
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+from backend.shared_services.logger_setup import setup_logger
+
+logger = setup_logger()
+
+# "snapshot"   - legacy: one full-state JSONB row per turn in andika_conversations
+# "normalized" - one row per turn in andika_turns plus one row per message in andika_messages
+# "dual"       - write both (use while backfilling / migrating readers)
+PERSISTENCE_MODE = os.getenv("PERSISTENCE_MODE", "snapshot").strip().lower()
+
+
+def writes_snapshots() -> bool:
+    return PERSISTENCE_MODE in ("snapshot", "dual")
+
+
+def writes_normalized() -> bool:
+    return PERSISTENCE_MODE in ("normalized", "dual")
+
+
+def reads_normalized() -> bool:
+    return PERSISTENCE_MODE == "normalized"
+
+
+MESSAGE_STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS andika.andika_turns (
+    conversation_id VARCHAR(255) PRIMARY KEY,
+    session_id VARCHAR(255) NOT NULL,
+    user_id VARCHAR(255) NOT NULL,
+    user_input TEXT,
+    final_answer TEXT,
+    node_history JSONB NOT NULL DEFAULT '[]'::jsonb,
+    log_timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS andika.andika_messages (
+    message_id UUID PRIMARY KEY,
+    conversation_id VARCHAR(255) NOT NULL,
+    session_id VARCHAR(255) NOT NULL,
+    user_id VARCHAR(255) NOT NULL,
+    role VARCHAR(32) NOT NULL,
+    content TEXT,
+    sources JSONB NOT NULL DEFAULT '[]'::jsonb,
+    follow_up_questions JSONB NOT NULL DEFAULT '[]'::jsonb,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS andika_turns_user_ts_idx
+    ON andika.andika_turns (user_id, log_timestamp DESC);
+CREATE INDEX IF NOT EXISTS andika_messages_user_ts_idx
+    ON andika.andika_messages (user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS andika_messages_session_ts_idx
+    ON andika.andika_messages (session_id, created_at);
+"""
+
+# Rebuild turns and messages from the legacy snapshot rows (run by migrations.py). Snapshot messages carry
+# no id, so one is derived from md5(user_id|role|timestamp|content), matching
+# legacy_message_id(); the earliest snapshot a message appears in owns it.
+BACKFILL_SQL = """
+INSERT INTO andika.andika_turns
+    (conversation_id, session_id, user_id, user_input, final_answer, node_history, log_timestamp)
+SELECT DISTINCT ON (conversation_id)
+    conversation_id,
+    session_id,
+    user_id,
+    state->>'user_input',
+    state->>'final_answer',
+    COALESCE(state->'node_history', '[]'::jsonb),
+    log_timestamp
+FROM andika.andika_conversations
+WHERE conversation_id IS NOT NULL
+ORDER BY conversation_id, log_timestamp DESC
+ON CONFLICT (conversation_id) DO NOTHING;
+
+INSERT INTO andika.andika_messages
+    (message_id, conversation_id, session_id, user_id, role, content, sources, follow_up_questions, created_at)
+SELECT DISTINCT ON (message_id)
+    message_id, conversation_id, session_id, user_id, role, content, sources, follow_up_questions, created_at
+FROM (
+    SELECT
+        COALESCE(
+            (msg->>'message_id')::uuid,
+            md5(c.user_id || '|' || COALESCE(msg->>'role', '') || '|' ||
+                COALESCE(msg->>'timestamp', '') || '|' || COALESCE(msg->>'content', ''))::uuid
+        ) AS message_id,
+        c.conversation_id,
+        c.session_id,
+        c.user_id,
+        COALESCE(msg->>'role', 'assistant') AS role,
+        msg->>'content' AS content,
+        COALESCE(msg->'sources', '[]'::jsonb) AS sources,
+        COALESCE(msg->'follow_up_questions', '[]'::jsonb) AS follow_up_questions,
+        COALESCE((msg->>'timestamp')::timestamptz, c.log_timestamp) AS created_at,
+        c.log_timestamp
+    FROM andika.andika_conversations c
+    CROSS JOIN LATERAL jsonb_array_elements(
+        CASE WHEN jsonb_typeof(c.state->'conversation_history') = 'array'
+             THEN c.state->'conversation_history' ELSE '[]'::jsonb END
+    ) AS msg
+    UNION ALL
+    SELECT
+        md5(c.conversation_id || '|user')::uuid,
+        c.conversation_id,
+        c.session_id,
+        c.user_id,
+        'user',
+        c.state->>'user_input',
+        '[]'::jsonb,
+        '[]'::jsonb,
+        COALESCE(
+            (c.state->>'turn_started_at')::timestamptz,
+            (c.state->'node_history'->0->>'timestamp')::timestamptz,
+            c.log_timestamp
+        ),
+        c.log_timestamp
+    FROM andika.andika_conversations c
+    WHERE c.state->>'user_input' IS NOT NULL
+) src
+ORDER BY message_id, log_timestamp
+ON CONFLICT (message_id) DO NOTHING;
+"""
+
+
+def _md5_uuid(key: str) -> str:
+    return str(uuid.UUID(hashlib.md5(key.encode("utf-8")).hexdigest()))
+
+
+def legacy_message_id(user_id: str, message: Dict[str, Any]) -> str:
+    """Deterministic id for a message that was stored without one"""
+    return _md5_uuid("|".join([
+        user_id,
+        message.get("role") or "",
+        message.get("timestamp") or "",
+        message.get("content") or "",
+    ]))
+
+
+def parse_timestamp(value: Optional[str], default: datetime) -> datetime:
+    """Parse an ISO timestamp from state, falling back to default"""
+    try:
+        parsed = datetime.fromisoformat(value)
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return default
+
+
+def build_turn_delta(state: Dict[str, Any], logged_at: datetime) -> Tuple[tuple, List[tuple]]:
+    """
+    Rows to write for one turn: the turn itself plus only the messages added during it.
+    Messages before state["history_offset"] were loaded from storage and are skipped.
+    """
+    user_id = state["user_id"]
+    session_id = state["session_id"]
+    conversation_id = state["conversation_id"]
+
+    turn_row = (
+        conversation_id,
+        session_id,
+        user_id,
+        state.get("user_input"),
+        state.get("final_answer"),
+        state.get("node_history", []),
+        logged_at,
+    )
+
+    message_rows = []
+    if state.get("user_input"):
+        message_rows.append((
+            _md5_uuid(f"{conversation_id}|user"),
+            conversation_id,
+            session_id,
+            user_id,
+            "user",
+            state["user_input"],
+            [],
+            [],
+            parse_timestamp(state.get("turn_started_at"), logged_at),
+        ))
+
+    history = state.get("conversation_history", [])
+    for message in history[state.get("history_offset", 0):]:
+        message_rows.append((
+            message.get("message_id") or legacy_message_id(user_id, message),
+            conversation_id,
+            session_id,
+            user_id,
+            message.get("role", "assistant"),
+            message.get("content"),
+            message.get("sources") or [],
+            message.get("follow_up_questions") or [],
+            parse_timestamp(message.get("timestamp"), logged_at),
+        ))
+
+    return turn_row, message_rows
+
+
+async def write_turn_deltas(conn, turns: List[tuple], messages: List[tuple]) -> None:
+    """Insert a batch of turns and their new messages in one transaction"""
+    async with conn.transaction():
+        if turns:
+            await conn.executemany("""
+                INSERT INTO andika.andika_turns
+                (conversation_id, session_id, user_id, user_input, final_answer, node_history, log_timestamp)
+                VALUES ($1, $2, $3, $4, $5, $6::jsonb, $7)
+                ON CONFLICT (conversation_id) DO UPDATE SET
+                    final_answer = EXCLUDED.final_answer,
+                    node_history = EXCLUDED.node_history,
+                    log_timestamp = EXCLUDED.log_timestamp
+            """, turns)
+        if messages:
+            await conn.executemany("""
+                INSERT INTO andika.andika_messages
+                (message_id, conversation_id, session_id, user_id, role, content,
+                 sources, follow_up_questions, created_at)
+                VALUES ($1::uuid, $2, $3, $4, $5, $6, $7::jsonb, $8::jsonb, $9)
+                ON CONFLICT (message_id) DO NOTHING
+            """, messages)
+
+
+def message_from_row(row) -> Dict[str, Any]:
+    """Shape a message row like the entries of state["conversation_history"]"""
+    return {
+        "message_id": str(row["message_id"]),
+        "role": row["role"],
+        "content": row["content"],
+        "sources": row["sources"],
+        "follow_up_questions": row["follow_up_questions"],
+        "timestamp": row["created_at"].isoformat(),
+    }
@@ -0,0 +1,210 @@
+import sys
+import json
+import asyncio
+from typing import Dict, Any, List, Optional, Tuple
+from backend.shared_services.logger_setup import setup_logger
+from backend.shared_services import message_store, session_summary
+from backend.shared_services.get_conversation_history import (
+    HISTORY_FROM_SNAPSHOTS_SQL, RECENT_MESSAGES_SQL, RECENT_NODES_SQL
+)
+from backend.services.session_service import (
+    CHAT_SESSIONS_SQL, SESSION_SNAPSHOT_SQL, SESSION_MESSAGES_SQL
+)
+
+logger = setup_logger()
+
+# Arbitrary key for pg_advisory_lock so only one process migrates at a time
+MIGRATION_LOCK_ID = 8_431_207
+
+MIGRATIONS_TABLE_SQL = """
+CREATE SCHEMA IF NOT EXISTS andika;
+CREATE TABLE IF NOT EXISTS andika.schema_migrations (
+    version INTEGER PRIMARY KEY,
+    description TEXT NOT NULL,
+    applied_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# (version, description, sql) - append only, never edit an applied migration
+MIGRATIONS: List[Tuple[int, str, str]] = [
+    (1, "conversation snapshot table", """
+        CREATE TABLE IF NOT EXISTS andika.andika_conversations (
+            id SERIAL PRIMARY KEY,
+            log_timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            user_id VARCHAR(255),
+            session_id VARCHAR(255),
+            conversation_id VARCHAR(255),
+            user_input TEXT,
+            state JSONB,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        );
+    """),
+    (2, "generated session/user columns and hot-path indexes on snapshots", """
+        ALTER TABLE andika.andika_conversations
+            ADD COLUMN IF NOT EXISTS state_session_id VARCHAR(255)
+                GENERATED ALWAYS AS (state->>'session_id') STORED,
+            ADD COLUMN IF NOT EXISTS state_user_id VARCHAR(255)
+                GENERATED ALWAYS AS (state->>'user_id') STORED;
+
+        CREATE INDEX IF NOT EXISTS andika_conversations_user_ts_idx
+            ON andika.andika_conversations (state_user_id, log_timestamp DESC);
+        CREATE INDEX IF NOT EXISTS andika_conversations_session_ts_idx
+            ON andika.andika_conversations (state_session_id, log_timestamp);
+    """),
+    (3, "normalized turn and message tables", message_store.MESSAGE_STORE_SCHEMA),
+    (4, "backfill turns and messages from snapshots", message_store.BACKFILL_SQL),
+    (5, "chat session summary table", session_summary.SESSION_SUMMARY_SCHEMA),
+    (6, "backfill chat session summaries from snapshots", session_summary.BACKFILL_SQL),
+    (7, "chat session sidebar index with session_id tie-breaker", """
+        CREATE INDEX IF NOT EXISTS andika_chat_sessions_user_updated_id_idx
+            ON andika.andika_chat_sessions (user_id, last_updated DESC, session_id DESC);
+        DROP INDEX IF EXISTS andika.andika_chat_sessions_user_updated_idx;
+    """),
+]
+
+# Hot queries with sample parameters; each must be served by an index on its table
+HOT_QUERIES: List[Dict[str, Any]] = [
+    {
+        "name": "conversation history (snapshots)",
+        "sql": HISTORY_FROM_SNAPSHOTS_SQL,
+        "params": ("plan_check_user", 10),
+        "table": "andika_conversations",
+    },
+    {
+        "name": "session by id (snapshots)",
+        "sql": SESSION_SNAPSHOT_SQL,
+        "params": ("plan_check_session",),
+        "table": "andika_conversations",
+    },
+    {
+        "name": "conversation history (messages)",
+        "sql": RECENT_MESSAGES_SQL,
+        "params": ("plan_check_user", 10),
+        "table": "andika_messages",
+    },
+    {
+        "name": "conversation history (turns)",
+        "sql": RECENT_NODES_SQL,
+        "params": ("plan_check_user", 10),
+        "table": "andika_turns",
+    },
+    {
+        "name": "session by id (messages)",
+        "sql": SESSION_MESSAGES_SQL,
+        "params": ("plan_check_session",),
+        "table": "andika_messages",
+    },
+    {
+        "name": "chat session sidebar",
+        "sql": CHAT_SESSIONS_SQL,
+        "params": ("plan_check_user", None, None, 50),
+        "table": "andika_chat_sessions",
+    },
+]
+
+
+async def get_applied_versions(conn) -> List[int]:
+    """Versions already recorded in andika.schema_migrations"""
+    await conn.execute(MIGRATIONS_TABLE_SQL)
+    rows = await conn.fetch("SELECT version FROM andika.schema_migrations ORDER BY version")
+    return [row["version"] for row in rows]
+
+
+async def run_migrations(conn, target: Optional[int] = None) -> List[int]:
+    """
+    Apply pending migrations in order, each in its own transaction.
+    Returns the versions applied by this call.
+    """
+    applied_now = []
+    await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_ID)
+    try:
+        applied = set(await get_applied_versions(conn))
+        for version, description, sql in MIGRATIONS:
+            if version in applied or (target is not None and version > target):
+                continue
+            logger.info(f"Applying migration {version}: {description}")
+            async with conn.transaction():
+                await conn.execute(sql)
+                await conn.execute(
+                    "INSERT INTO andika.schema_migrations (version, description) VALUES ($1, $2)",
+                    version, description
+                )
+            applied_now.append(version)
+
+        if applied_now:
+            logger.info(f"Applied migrations: {applied_now}")
+        else:
+            logger.info("Database schema is up to date")
+        return applied_now
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_ID)
+
+
+async def check_schema_version(conn) -> None:
+    """Raise if migrations are pending; the hot-path queries need every applied version"""
+    applied = set(await get_applied_versions(conn))
+    pending = [version for version, _, _ in MIGRATIONS if version not in applied]
+    if pending:
+        raise RuntimeError(
+            f"Database schema is behind: migrations {pending} are pending. "
+            f"Run python -m backend.shared_services.migrations or set RUN_MIGRATIONS_ON_STARTUP=true"
+        )
+
+
+def _plan_nodes(plan: Dict[str, Any]):
+    """Yield every node of an EXPLAIN (FORMAT JSON) plan tree"""
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+async def check_query_plans(conn) -> List[Dict[str, Any]]:
+    """
+    EXPLAIN each hot query and report whether its table is reached through an index.
+    Sequential scans are disabled for the check so a tiny table doesn't mask a missing index.
+    """
+    results = []
+    for query in HOT_QUERIES:
+        async with conn.transaction():
+            await conn.execute("SET LOCAL enable_seqscan = off")
+            raw_plan = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {query['sql']}", *query["params"])
+
+        plan = (json.loads(raw_plan) if isinstance(raw_plan, str) else raw_plan)[0]["Plan"]
+        scans = [
+            node["Node Type"] for node in _plan_nodes(plan)
+            if node.get("Relation Name") == query["table"]
+        ]
+        uses_index = bool(scans) and all(scan != "Seq Scan" for scan in scans)
+        results.append({"query": query["name"], "table": query["table"], "scans": scans, "uses_index": uses_index})
+
+        if uses_index:
+            logger.info(f"Plan check OK: {query['name']} -> {scans}")
+        else:
+            logger.error(f"Plan check FAILED: {query['name']} scans {query['table']} with {scans}")
+    return results
+
+
+async def _main(argv: List[str]) -> int:
+    from backend.shared_services.db import acquire_connection, close_db_pool
+
+    try:
+        async with acquire_connection() as conn:
+            if "--status" in argv:
+                applied = set(await get_applied_versions(conn))
+                for version, description, _ in MIGRATIONS:
+                    print(f"{'applied' if version in applied else 'pending':8} {version:3}  {description}")
+                return 0
+
+            await run_migrations(conn)
+
+            if "--check-plans" in argv:
+                results = await check_query_plans(conn)
+                return 0 if all(result["uses_index"] for result in results) else 1
+            return 0
+    finally:
+        await close_db_pool()
+
+
+if __name__ == "__main__":
+    # python -m backend.shared_services.migrations [--status] [--check-plans]
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
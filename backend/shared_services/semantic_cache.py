@@ -0,0 +1,240 @@
+import os
+import re
+import time
+import uuid
+from typing import Dict, Any, List, Optional
+import numpy as np
+from backend.shared_services.embeddings import get_embedder, EMBEDDING_MODEL
+from backend.shared_services.document_corpus import get_corpus_version
+from backend.shared_services.handoffs import handoff_to_respond_to_human
+from backend.shared_services.shared_types import MainState
+from backend.shared_services.logger_setup import setup_logger
+
+logger = setup_logger()
+
+# Semantic answer cache configuration (override via environment)
+# Off by default unless a sentence-transformers model is configured: the hashing embedder is
+# lexical, so questions differing only in the bank or amount score above the threshold
+SEMANTIC_CACHE_ENABLED = os.getenv(
+    "SEMANTIC_CACHE_ENABLED", "true" if EMBEDDING_MODEL else "false"
+).lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+SEMANTIC_CACHE_TTL_SECONDS = int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+SEMANTIC_CACHE_MIN_WORDS = int(os.getenv("SEMANTIC_CACHE_MIN_WORDS", "3"))
+
+# Only answers grounded by a tool (or a one-shot answer citing documents) are reusable;
+# chitchat and answers drawn from a session's own history depend on the conversation
+CACHEABLE_TOOLS = {"extract_docs_tool", "tavily_tool"}
+CACHEABLE_NODES = {"one_shot"}
+
+
+def _normalize_question(text: str) -> str:
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+# Words that change the answer while barely moving the embedding
+QUALIFIER_TERMS = {
+    "max", "maximum", "min", "minimum", "highest", "lowest", "daily", "weekly",
+    "monthly", "quarterly", "annual", "annually", "yearly",
+}
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def _key_terms(text: str) -> set:
+    """Numbers, qualifiers and names (capitalized after the first word, or all caps)"""
+    terms = set(_NUMBER_RE.findall(text.replace(",", "")))
+    words = re.findall(r"\w+", text)
+    for position, word in enumerate(words):
+        lowered = word.lower()
+        if lowered in QUALIFIER_TERMS:
+            terms.add(lowered)
+        elif (word.isupper() and len(word) > 1) or (position > 0 and word[0].isupper() and word != "I"):
+            terms.add(lowered)
+    return terms
+
+
+def key_terms_match(question: str, cached_question: str) -> bool:
+    """
+    False when a number, qualifier or name in either question is missing from the other,
+    e.g. "...to KCB account" vs "...to Equity account", or max vs min balance
+    """
+    words = set(_normalize_question(question).split()) | set(_NUMBER_RE.findall(question.replace(",", "")))
+    cached_words = set(_normalize_question(cached_question).split()) | set(_NUMBER_RE.findall(cached_question.replace(",", "")))
+    return all((term in words) == (term in cached_words) for term in _key_terms(question) | _key_terms(cached_question))
+
+
+class SemanticAnswerCache:
+    """
+    Answers keyed by question meaning: questions are embedded on CPU and kept in a
+    NumPy matrix; a lookup is one matrix-vector product against every live entry.
+    Entries expire after a TTL and the whole cache is dropped when the document
+    corpus version changes.
+    """
+
+    def __init__(
+        self,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        ttl_seconds: int = SEMANTIC_CACHE_TTL_SECONDS,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES
+    ):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._embedder = None
+        self._matrix: Optional[np.ndarray] = None
+        self._created_at = np.zeros(0, dtype=np.float64)
+        self._entries: List[Dict[str, Any]] = []
+        self._corpus_version: Optional[str] = None
+        self.metrics = {"lookups": 0, "hits": 0, "misses": 0, "key_term_rejections": 0, "stores": 0, "invalidations": 0}
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            self._embedder = get_embedder()
+        return self._embedder
+
+    def _check_version(self, corpus_version: str) -> None:
+        if self._corpus_version != corpus_version:
+            if self._entries:
+                logger.info("Document corpus changed, clearing semantic answer cache")
+                self.metrics["invalidations"] += 1
+            self._matrix = None
+            self._created_at = np.zeros(0, dtype=np.float64)
+            self._entries = []
+            self._corpus_version = corpus_version
+
+    def _embed(self, question: str) -> np.ndarray:
+        return self.embedder.embed([_normalize_question(question)])[0]
+
+    def lookup(self, question: str, corpus_version: str) -> Optional[Dict[str, Any]]:
+        """Return the cached answer for the closest live question above the threshold"""
+        self.metrics["lookups"] += 1
+        self._check_version(corpus_version)
+        if not self._entries or len(_normalize_question(question).split()) < SEMANTIC_CACHE_MIN_WORDS:
+            self.metrics["misses"] += 1
+            return None
+
+        scores = self._matrix[:len(self._entries)] @ self._embed(question)
+        scores[time.time() - self._created_at > self.ttl_seconds] = -1.0
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            self.metrics["misses"] += 1
+            return None
+
+        entry = self._entries[best]
+        if not key_terms_match(question, entry["question"]):
+            self.metrics["misses"] += 1
+            self.metrics["key_term_rejections"] += 1
+            logger.info(f"Semantic cache near miss ({scores[best]:.3f}): '{question}' differs from '{entry['question']}' in key terms")
+            return None
+
+        self.metrics["hits"] += 1
+        logger.info(f"Semantic cache hit ({scores[best]:.3f}) for '{question}' -> '{entry['question']}'")
+        return {**entry, "score": float(scores[best])}
+
+    def store(self, question: str, answer: Dict[str, Any], corpus_version: str) -> None:
+        """Remember an answered question"""
+        if len(_normalize_question(question).split()) < SEMANTIC_CACHE_MIN_WORDS:
+            return
+        self._check_version(corpus_version)
+        self._compact()
+
+        vector = self._embed(question)
+        count = len(self._entries)
+        if self._matrix is None:
+            self._matrix = np.zeros((64, vector.shape[0]), dtype=np.float32)
+        elif count == self._matrix.shape[0]:
+            # Grow geometrically so appends stay amortized O(1)
+            grown = np.zeros((count * 2, self._matrix.shape[1]), dtype=np.float32)
+            grown[:count] = self._matrix
+            self._matrix = grown
+
+        self._matrix[count] = vector
+        self._created_at = np.append(self._created_at, time.time())
+        self._entries.append({"question": question, **answer})
+        self.metrics["stores"] += 1
+
+    def _compact(self) -> None:
+        """Drop expired entries, and the oldest ones beyond max_entries"""
+        if not self._entries:
+            return
+        keep = np.flatnonzero(time.time() - self._created_at <= self.ttl_seconds)
+        if len(keep) >= self.max_entries:
+            keep = keep[len(keep) - self.max_entries + 1:]
+        if len(keep) == len(self._entries):
+            return
+        self._matrix = np.ascontiguousarray(self._matrix[keep])
+        self._created_at = self._created_at[keep]
+        self._entries = [self._entries[i] for i in keep]
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.metrics["lookups"]
+        return {
+            "enabled": SEMANTIC_CACHE_ENABLED,
+            "entries": len(self._entries),
+            "threshold": self.threshold,
+            "corpus_version": self._corpus_version,
+            **self.metrics,
+            "hit_rate": round(self.metrics["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Create a singleton instance
+semantic_cache = SemanticAnswerCache()
+
+
+def answer_from_semantic_cache(state: MainState) -> bool:
+    """
+    If a semantically equivalent question was answered before, queue the stored
+    answer for respond_to_human and return True.
+    """
+    if not SEMANTIC_CACHE_ENABLED:
+        return False
+    try:
+        cached = semantic_cache.lookup(state.get("user_input", ""), get_corpus_version())
+    except Exception as e:
+        logger.error(f"Error reading semantic cache: {str(e)}")
+        return False
+    if cached is None:
+        return False
+
+    handoff_to_respond_to_human(
+        state,
+        cached["final_answer"],
+        cached.get("sources", []),
+        cached.get("follow_up_questions", []),
+        str(uuid.uuid4()),
+        "semantic_cache"
+    )
+    return True
+
+
+def remember_answer(state: MainState) -> None:
+    """Cache the turn's answer if it was grounded by a document or web tool, or one-shot cited documents"""
+    if not SEMANTIC_CACHE_ENABLED or not state.get("final_answer"):
+        return
+    node_history = state.get("node_history", [])
+    used_tool = any(
+        tool.get("tool") in CACHEABLE_TOOLS
+        for entry in node_history
+        if isinstance(entry.get("content"), dict) and entry["content"].get("response_type") == "tool_call"
+        for tool in entry["content"].get("tools", [])
+    ) or (
+        # One-shot also answers chitchat and from the conversation history; only cache it when it cites documents
+        any(entry.get("node") in CACHEABLE_NODES for entry in node_history) and bool(state.get("sources"))
+    )
+    if not used_tool:
+        return
+    try:
+        semantic_cache.store(
+            state["user_input"],
+            {
+                "final_answer": state["final_answer"],
+                "sources": state.get("sources", []),
+                "follow_up_questions": state.get("follow_up_questions", []),
+            },
+            get_corpus_version()
+        )
+    except Exception as e:
+        logger.error(f"Error writing semantic cache: {str(e)}")
@@ -0,0 +1,203 @@
+import os
+import json
+import time
+import heapq
+import asyncio
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+from backend.shared_services.logger_setup import setup_logger
+
+logger = setup_logger()
+
+# Session store configuration (override via environment)
+SESSION_STORE_BACKEND = os.getenv("SESSION_STORE", "memory").strip().lower()
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(24 * 60 * 60)))  # Sessions expire after 24 hours
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+SESSION_EXPIRY_INTERVAL = float(os.getenv("SESSION_EXPIRY_INTERVAL", "60"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+
+class SessionStore(ABC):
+    """
+    Storage for per-session working state (user_id, last_active, recent history).
+    Records are plain JSON-serializable dicts; every set() refreshes the TTL.
+    """
+
+    @abstractmethod
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return the live record for a session, or None if missing/expired"""
+
+    @abstractmethod
+    async def set(self, session_id: str, record: Dict[str, Any]) -> None:
+        """Write a session record and reset its TTL"""
+
+    @abstractmethod
+    async def delete(self, session_id: str) -> None:
+        """Drop a session"""
+
+    async def expire(self) -> List[str]:
+        """Evict expired sessions, returning their ids. Backends with native TTL don't need this."""
+        return []
+
+    async def close(self) -> None:
+        """Release backend resources"""
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": type(self).__name__}
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Process-local store with LRU eviction (bounded entry count) and TTL expiry.
+    Expiry times sit in a min-heap so expire() only touches sessions that are due.
+    """
+
+    def __init__(self, ttl_seconds: int = SESSION_TTL_SECONDS, max_entries: int = SESSION_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._records: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._expires_at: Dict[str, float] = {}
+        self._expiry_heap: List[tuple] = []
+        self.metrics = {"hits": 0, "misses": 0, "evicted_lru": 0, "expired": 0}
+
+    def _is_expired(self, session_id: str, now: float) -> bool:
+        return self._expires_at.get(session_id, 0) <= now
+
+    def _remove(self, session_id: str) -> None:
+        self._records.pop(session_id, None)
+        self._expires_at.pop(session_id, None)
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        record = self._records.get(session_id)
+        if record is None or self._is_expired(session_id, time.monotonic()):
+            if record is not None:
+                self._remove(session_id)
+                self.metrics["expired"] += 1
+            self.metrics["misses"] += 1
+            return None
+        self._records.move_to_end(session_id)
+        self.metrics["hits"] += 1
+        return record
+
+    async def set(self, session_id: str, record: Dict[str, Any]) -> None:
+        expires_at = time.monotonic() + self.ttl_seconds
+        self._records[session_id] = record
+        self._records.move_to_end(session_id)
+        self._expires_at[session_id] = expires_at
+        heapq.heappush(self._expiry_heap, (expires_at, session_id))
+
+        while len(self._records) > self.max_entries:
+            evicted, _ = self._records.popitem(last=False)
+            self._expires_at.pop(evicted, None)
+            self.metrics["evicted_lru"] += 1
+
+        # Stale heap entries are skipped lazily; rebuild if they pile up
+        if len(self._expiry_heap) > 2 * max(len(self._records), 1024):
+            self._expiry_heap = [(expires, sid) for sid, expires in self._expires_at.items()]
+            heapq.heapify(self._expiry_heap)
+
+    async def delete(self, session_id: str) -> None:
+        self._remove(session_id)
+
+    async def expire(self) -> List[str]:
+        now = time.monotonic()
+        expired = []
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, session_id = heapq.heappop(self._expiry_heap)
+            # Only act on the entry matching the session's current deadline
+            if self._expires_at.get(session_id) == expires_at:
+                self._remove(session_id)
+                expired.append(session_id)
+        self.metrics["expired"] += len(expired)
+        return expired
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "sessions": len(self._records),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            **self.metrics,
+        }
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Store backed by any Redis-protocol server, shared by all workers.
+    TTL is enforced by the server (SET ... EX), so expire() has nothing to do.
+    Pass `client` to use an existing redis.asyncio-compatible client (e.g. a local stand-in).
+    """
+
+    def __init__(
+        self,
+        url: str = REDIS_URL,
+        ttl_seconds: int = SESSION_TTL_SECONDS,
+        prefix: str = "chat:session:",
+        client=None
+    ):
+        if client is None:
+            import redis.asyncio as redis  # Optional dependency, only needed for this backend
+            client = redis.from_url(url, decode_responses=True)
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self.metrics = {"hits": 0, "misses": 0, "errors": 0}
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}"
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            raw = await self.client.get(self._key(session_id))
+        except Exception as e:
+            self.metrics["errors"] += 1
+            logger.error(f"Error reading session {session_id} from Redis: {str(e)}")
+            return None
+        if raw is None:
+            self.metrics["misses"] += 1
+            return None
+        self.metrics["hits"] += 1
+        return json.loads(raw)
+
+    async def set(self, session_id: str, record: Dict[str, Any]) -> None:
+        try:
+            await self.client.set(self._key(session_id), json.dumps(record, default=str), ex=self.ttl_seconds)
+        except Exception as e:
+            self.metrics["errors"] += 1
+            logger.error(f"Error writing session {session_id} to Redis: {str(e)}")
+
+    async def delete(self, session_id: str) -> None:
+        try:
+            await self.client.delete(self._key(session_id))
+        except Exception as e:
+            self.metrics["errors"] += 1
+            logger.error(f"Error deleting session {session_id} from Redis: {str(e)}")
+
+    async def close(self) -> None:
+        close = getattr(self.client, "aclose", None) or getattr(self.client, "close", None)
+        if close is not None:
+            await close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": "redis", "ttl_seconds": self.ttl_seconds, **self.metrics}
+
+
+def create_session_store() -> SessionStore:
+    """Build the store selected by SESSION_STORE (memory | redis)"""
+    if SESSION_STORE_BACKEND == "redis":
+        logger.info(f"Using Redis session store at {REDIS_URL}")
+        return RedisSessionStore()
+    return InMemorySessionStore()
+
+
+async def run_expiry_loop(store: SessionStore, interval: float = SESSION_EXPIRY_INTERVAL) -> None:
+    """Background task that evicts expired sessions outside the request path"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            expired = await store.expire()
+            if expired:
+                logger.info(f"Expired {len(expired)} idle sessions")
+        except Exception as e:
+            logger.error(f"Error expiring sessions: {str(e)}")
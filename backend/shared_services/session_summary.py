@@ -0,0 +1,100 @@
+from datetime import datetime
+from typing import Dict, Any, List
+from backend.shared_services.logger_setup import setup_logger
+from backend.shared_services.message_store import parse_timestamp
+
+logger = setup_logger()
+
+SESSION_SUMMARY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS andika.andika_chat_sessions (
+    session_id VARCHAR(255) PRIMARY KEY,
+    user_id VARCHAR(255) NOT NULL,
+    first_message TEXT,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    last_updated TIMESTAMP WITH TIME ZONE NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS andika_chat_sessions_user_updated_idx
+    ON andika.andika_chat_sessions (user_id, last_updated DESC);
+"""
+
+# One summary row per session from the legacy snapshots (run by migrations.py): each snapshot is one turn
+# (a user message plus, when it finished, an assistant answer).
+BACKFILL_SQL = """
+INSERT INTO andika.andika_chat_sessions
+    (session_id, user_id, first_message, created_at, last_updated, message_count)
+SELECT
+    session_id,
+    (ARRAY_AGG(user_id ORDER BY log_timestamp))[1],
+    (ARRAY_AGG(state->>'user_input' ORDER BY log_timestamp)
+        FILTER (WHERE state->>'user_input' IS NOT NULL))[1],
+    MIN(log_timestamp),
+    MAX(log_timestamp),
+    (COUNT(state->>'user_input') + COUNT(state->>'final_answer'))::int
+FROM andika.andika_conversations
+WHERE session_id IS NOT NULL
+GROUP BY session_id
+ON CONFLICT (session_id) DO NOTHING;
+"""
+
+UPSERT_SQL = """
+INSERT INTO andika.andika_chat_sessions AS s
+    (session_id, user_id, first_message, created_at, last_updated, message_count)
+SELECT *
+FROM unnest($1::text[], $2::text[], $3::text[], $4::timestamptz[], $5::timestamptz[], $6::int[])
+ON CONFLICT (session_id) DO UPDATE SET
+    first_message = CASE
+        WHEN s.first_message IS NULL OR EXCLUDED.created_at < s.created_at
+        THEN COALESCE(EXCLUDED.first_message, s.first_message)
+        ELSE s.first_message
+    END,
+    created_at = LEAST(s.created_at, EXCLUDED.created_at),
+    last_updated = GREATEST(s.last_updated, EXCLUDED.last_updated),
+    message_count = s.message_count + EXCLUDED.message_count
+"""
+
+
+def build_session_summary(state: Dict[str, Any], logged_at: datetime) -> Dict[str, Any]:
+    """Summary delta contributed by one turn"""
+    new_messages = len(state.get("conversation_history", [])[state.get("history_offset", 0):])
+    if state.get("user_input"):
+        new_messages += 1
+    return {
+        "session_id": state["session_id"],
+        "user_id": state["user_id"],
+        "first_message": state.get("user_input"),
+        "created_at": parse_timestamp(state.get("turn_started_at"), logged_at),
+        "last_updated": logged_at,
+        "message_count": new_messages,
+    }
+
+
+def _merge_by_session(summaries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Fold several turns of the same session into one row (one upsert per session per batch)"""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for summary in sorted(summaries, key=lambda s: s["created_at"]):
+        current = merged.get(summary["session_id"])
+        if current is None:
+            merged[summary["session_id"]] = dict(summary)
+            continue
+        current["first_message"] = current["first_message"] or summary["first_message"]
+        current["last_updated"] = max(current["last_updated"], summary["last_updated"])
+        current["message_count"] += summary["message_count"]
+    return list(merged.values())
+
+
+async def upsert_session_summaries(conn, summaries: List[Dict[str, Any]]) -> None:
+    """Incrementally update andika_chat_sessions for a batch of turns"""
+    rows = _merge_by_session(summaries)
+    if not rows:
+        return
+    await conn.execute(
+        UPSERT_SQL,
+        [row["session_id"] for row in rows],
+        [row["user_id"] for row in rows],
+        [row["first_message"] for row in rows],
+        [row["created_at"] for row in rows],
+        [row["last_updated"] for row in rows],
+        [row["message_count"] for row in rows],
+    )
@@ -7,6 +7,9 @@ class MainState(TypedDict):
     conversation_id: str
     user_input: str
     conversation_history: list
+    history_offset: int
+    turn_started_at: str
+    stream: bool
     node_history: list
     document_history: list
     strategy_history: list
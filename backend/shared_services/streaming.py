@@ -1,25 +1,52 @@
-from typing import List, Dict
-import logging
+from typing import List, Dict, Any, Optional, Tuple
+import json
+import time
 from backend.shared_services.llm import call_llm_api_stream
-from backend.shared_services.websocket_manager import websocket_manager
+from backend.shared_services.extract_and_parse_json import IncrementalJSONParser, is_agent_response
+from backend.shared_services.logger_setup import setup_logger
 
-logger = logging.getLogger(__name__)
+logger = setup_logger()
 
-async def stream_response_to_user(messages: List[Dict[str, str]], session_id: str) -> str:
-    """Stream the response to the user via WebSocket"""
+
+async def stream_response_to_user(
+    messages: List[Dict[str, str]],
+    manager: Any,
+    session_id: str,
+    field: str = "message_to_user"
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    Stream an agent's JSON response from the LLM through IncrementalJSONParser,
+    forwarding the text of `field` to the session's WebSocket as {"type": "stream"}
+    frames as it is generated. Reading stops as soon as the object closes.
+    Returns the raw response and the parsed object (None if it never completed).
+    """
     try:
         full_response = []
-        
-        # Use the existing streaming function
-        async for content in call_llm_api_stream(messages):
-            if content:
-                # Send the chunk to the frontend via WebSocket
-                await websocket_manager.send_message(content, session_id)
-                full_response.append(content)
-        
-        # Return the complete response
-        return "".join(full_response)
-        
+        parser = IncrementalJSONParser(stream_fields=(field,), accept=is_agent_response)
+        started = time.perf_counter()
+        first_token_at = None
+        stream = call_llm_api_stream(messages, json_mode=True)
+
+        async for content in stream:
+            if not content:
+                continue
+            full_response.append(content)
+            for event in parser.feed(content):
+                if event["event"] == "partial":
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                        logger.info(f"First streamed token for session {session_id} after {(first_token_at - started) * 1000:.0f}ms")
+                    await manager.send_message(json.dumps({"type": "stream", "content": event["delta"]}), session_id)
+                elif event["event"] == "value" and event["key"] == "agent_name":
+                    logger.info(f"Streamed response for session {session_id} routes to {event['value']}")
+            if parser.done:
+                # Anything after the object is prose we would discard anyway
+                await stream.aclose()
+                break
+
+        logger.info(f"Streamed response for session {session_id} in {(time.perf_counter() - started) * 1000:.0f}ms")
+        return "".join(full_response), parser.result
+
     except Exception as e:
         logger.error(f"Error in stream_response_to_user: {str(e)}", exc_info=True)
-        raise 
\ No newline at end of file
+        raise
@@ -3,104 +3,55 @@ from datetime import datetime, timezone
 import json
 import uuid
 import os
+import asyncio
 from backend.shared_services.shared_types import MainState
 from backend.shared_services.logger_setup import setup_logger
 from backend.shared_services.handoff_parameters import get_unanalyzed_handoffs, mark_handoffs_as_analyzed
-from backend.shared_services.handoffs import handoff_to_answer_user, handoff_to_welcome_user
+from backend.shared_services.handoffs import handoff_chunks_to_answer_user, handoff_to_welcome_user
+from backend.shared_services.bm25_index import RETRIEVAL_TOP_K
+from backend.shared_services.dense_index import retrieve_documents
 
 logger = setup_logger()
 
-def load_documents(relevant_docs: list) -> dict:
-    """ 
-    Load specified documents from the parsed directory
+async def extract_docs_tool(state: MainState) -> MainState:
     """
-    docs = {}
-    docs_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "parsed")  # Go up one level to backend
-    
-    try:
-        logger.info(f"Looking for documents in: {docs_path}")
-        if not os.path.exists(docs_path):
-            logger.error(f"Parsed directory not found at: {docs_path}")
-            return {}
-            
-        for doc_name in relevant_docs:
-            file_path = os.path.join(docs_path, doc_name)
-            logger.info(f"Attempting to load document from: {file_path}")
-            if os.path.exists(file_path):
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    docs[doc_name] = file.read()
-                    logger.info(f"Successfully loaded document: {doc_name}")
-            else:
-                logger.warning(f"Document not found: {file_path}")
-        return docs
-    except Exception as e:
-        logger.error(f"Error loading documents: {str(e)}")
-        return {}
-
-def load_all_documents() -> dict:
-    """
-    Load all documents from the parsed directory
+    Tool that retrieves the most relevant document chunks for the query and hands
+    them, with document/page citations, to answer_user
     """
-    docs = {}
-    docs_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "parsed")  # Go up one level to backend
-    
+    response_id = str(uuid.uuid4())
     try:
-        logger.info(f"Looking for all documents in: {docs_path}")
-        if not os.path.exists(docs_path):
-            logger.error(f"Parsed directory not found at: {docs_path}")
-            return {}
-            
-        files_found = os.listdir(docs_path)
-        logger.info(f"Files found in directory: {files_found}")
-        
-        for filename in files_found:
-            if filename.endswith(('.txt', '.md', '.json')):
-                file_path = os.path.join(docs_path, filename)
-                logger.info(f"Attempting to load document from: {file_path}")
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as file:
-                        docs[filename] = file.read()
-                        logger.info(f"Successfully loaded document: {filename}")
-                except Exception as e:
-                    logger.error(f"Error loading file {filename}: {str(e)}")
-                    
-        if not docs:
-            logger.warning(f"No documents loaded from {docs_path}")
-        return docs
-    except Exception as e:
-        logger.error(f"Error loading all documents: {str(e)}")
-        return {}
+        handoff_parameters = get_unanalyzed_handoffs(state, "extract_docs_tool")
+        params = handoff_parameters[-1] if handoff_parameters else {}
+        query = params.get("query") or state.get("user_input", "")
+        comprehensive_question = params.get("comprehensive_question", "")
+        relevant_docs = params.get("relevant_docs") or None
 
-def extract_docs_tool(state: MainState) -> MainState:
-    """
-    Tool that verifies document paths and returns relevant directory or file paths
-    """
-    try:
-        last_node = state["node_history"][-1]
-        params = last_node.get("content", {}).get("parameters", {})
-        query = params.get("query", "")
-        
-        # Base path for documents
-        docs_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "parsed")
-        
-        # You might have different folders for different document types
-        relevant_paths = {
-            "docs_path": "parsed",  # Relative path from backend
-            "specific_files": []    # If you want to point to specific files
-        }
-        
-        return handoff_to_answer_user(
-            state,
-            query=query,
-            doc_paths=relevant_paths
-        )
+        state = mark_handoffs_as_analyzed(state, "extract_docs_tool")
+
+        # Index loading/search is CPU work; keep it off the event loop
+        search_text = f"{query} {comprehensive_question}".strip()
+        chunks = await asyncio.to_thread(retrieve_documents, search_text, RETRIEVAL_TOP_K, relevant_docs)
+        if not chunks and relevant_docs:
+            # relevant_docs is the router's guess; retry across the whole corpus
+            chunks = await asyncio.to_thread(retrieve_documents, search_text, RETRIEVAL_TOP_K)
+
+        if not chunks:
+            logger.info(f"No document passages matched: {search_text}")
+            return handoff_to_welcome_user(
+                state,
+                "No relevant document passages found",
+                response_id,
+                "extract_docs_tool"
+            )
+
+        logger.info(f"Retrieved {len(chunks)} document passages: {[chunk['citation'] for chunk in chunks]}")
+        return handoff_chunks_to_answer_user(state, query, chunks, response_id, "extract_docs_tool")
 
     except Exception as e:
         logger.error(f"Error in extract_docs_tool: {str(e)}")
         return handoff_to_welcome_user(
             state,
             f"Error accessing documents: {str(e)}",
-            str(uuid.uuid4()),
+            response_id,
             "extract_docs_tool"
         )
-
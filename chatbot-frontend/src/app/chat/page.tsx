@@ -14,8 +14,9 @@ import { Message as ChatMessage } from '@/types/chat'
 import { sessionService } from '@/services/sessionService'
 
 interface WebSocketMessage {
-  type: 'message' | 'connection_status'
+  type: 'message' | 'stream' | 'connection_status'
   message?: string
+  content?: string
   formatted_message?: string
   sources?: string[]
   follow_up_questions?: string[]
@@ -34,6 +35,7 @@ export default function ChatPage() {
   const ws = useRef<WebSocket | null>(null)
   const messagesEndRef = useRef<HTMLDivElement>(null)
   const reconnectAttempts = useRef(0)
+  const isStreaming = useRef(false)
   const maxReconnectAttempts = 3
 
   const scrollToBottom = () => {
@@ -64,15 +66,30 @@ export default function ChatPage() {
 
       ws.current.onmessage = (event) => {
         try {
-          const data = JSON.parse(event.data)
+          const data: WebSocketMessage = JSON.parse(event.data)
           
-          if (data.type === 'message') {
-            setMessages(prev => [...prev, {
+          if (data.type === 'stream') {
+            // Grow the assistant message token by token; the first chunk creates it
+            const chunk = data.content ?? ''
+            const startsMessage = !isStreaming.current
+            isStreaming.current = true
+            setMessages(prev => startsMessage
+              ? [...prev, { role: 'assistant', content: chunk }]
+              : [...prev.slice(0, -1), { ...prev[prev.length - 1], content: prev[prev.length - 1].content + chunk }])
+            setIsLoading(false)
+          } else if (data.type === 'message') {
+            // The final frame carries the complete answer, sources and follow-ups
+            const finalMessage: ChatMessage = {
               role: 'assistant',
-              content: data.message,
+              content: data.message ?? '',
               sources: data.sources,
               follow_up_questions: data.follow_up_questions
-            }])
+            }
+            const replacesStream = isStreaming.current
+            isStreaming.current = false
+            setMessages(prev => replacesStream
+              ? [...prev.slice(0, -1), finalMessage]
+              : [...prev, finalMessage])
             setIsLoading(false)
           }
         } catch (error) {
@@ -157,11 +174,13 @@ export default function ChatPage() {
     setMessages(prev => [...prev, newMessage])
     setInput('')
     setIsLoading(true)
+    isStreaming.current = false
 
     ws.current.send(JSON.stringify({
       user_id: localStorage.getItem('nickname'),
       user_input: input,
-      session_id: sessionId
+      session_id: sessionId,
+      stream: true
     }))
   }
 
@@ -17,21 +17,33 @@ export const sessionService = {
         throw new SessionError('No user ID found');
       }
 
-      const response = await fetch(`${API_BASE_URL}/api/chat-sessions?user_id=${encodeURIComponent(userId)}`, {
-        credentials: 'include',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-      });
-      
-      if (!response.ok) {
-        throw new SessionError(
-          'Failed to fetch sessions', 
-          response.status
-        );
-      }
-      const data = await response.json();
-      return data.sessions || []; // Return empty array if no sessions
+      // The API returns one page at a time; follow next_before until the last page
+      const sessions: Session[] = [];
+      let cursor: { last_updated: string; session_id: string } | null = null;
+      do {
+        const params = new URLSearchParams({ user_id: userId });
+        if (cursor) {
+          params.set('before', cursor.last_updated);
+          params.set('before_session_id', cursor.session_id);
+        }
+        const response = await fetch(`${API_BASE_URL}/api/chat-sessions?${params.toString()}`, {
+          credentials: 'include',
+          headers: {
+            'Content-Type': 'application/json',
+          },
+        });
+
+        if (!response.ok) {
+          throw new SessionError(
+            'Failed to fetch sessions',
+            response.status
+          );
+        }
+        const data = await response.json();
+        sessions.push(...(data.sessions || []));
+        cursor = data.next_before || null;
+      } while (cursor);
+      return sessions;
     } catch (error) {
       console.error('Error fetching sessions:', error);
       // Return empty array instead of throwing error for no sessions